@@ -15,11 +15,133 @@ class Settings(BaseSettings):
     
     VECTOR_DB_URL: str = "http://localhost:8000"
     VECTOR_DB_API_KEY: str = ""
+    VECTOR_DB_PATH: str = "./chroma_db"
     GEMINI_API_KEY: str
     SECRET_KEY: str
     CORS_ORIGINS: List[str] = ["http://localhost:3000"]
     ENVIRONMENT: str = "development"
     
+    # Gemini SDK transport ("grpc" keeps one multiplexed HTTP/2 channel) and startup warm-up
+    GEMINI_TRANSPORT: str = "grpc"
+    GEMINI_PREWARM: bool = True
+    
+    # Gemini execution - thread pool size and per-endpoint concurrency limits
+    GEMINI_MAX_WORKERS: int = 16
+    GEMINI_ENDPOINT_CONCURRENCY: Dict[str, int] = {
+        "chat": 8,
+        "image": 4,
+        "video": 2,
+        "transcribe": 4,
+        "tts": 4,
+    }
+    
+    # Gemini chat sessions - hot-session cache budget and upstream history window
+    GEMINI_CHAT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    GEMINI_CHAT_HISTORY_WINDOW: int = 40
+    GEMINI_CHAT_HISTORY_MAX_CHARS: int = 60000
+    GEMINI_CHAT_PERSIST: bool = True
+    
+    # Retrieval-augmented chat - chunks per turn, context token budget, per-session retrieval cache
+    GEMINI_RAG_TOP_K: int = 5
+    GEMINI_RAG_MAX_CONTEXT_TOKENS: int = 2000
+    GEMINI_RAG_CACHE_SIZE: int = 32
+    GEMINI_RAG_CACHE_TTL: int = 300
+    
+    # Gemini response cache (opt-in) - per-endpoint TTLs in seconds, 0 disables an endpoint
+    GEMINI_CACHE_ENABLED: bool = False
+    GEMINI_CACHE_DIR: str = "./gemini_cache"
+    GEMINI_CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024
+    GEMINI_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024
+    GEMINI_CACHE_TTLS: Dict[str, int] = {
+        "tts": 7 * 24 * 3600,
+        "transcribe": 7 * 24 * 3600,
+        "image": 24 * 3600,
+    }
+    
+    # Gemini batch endpoint - job cap, per-batch concurrency and per-model concurrency
+    GEMINI_BATCH_MAX_JOBS: int = 100
+    GEMINI_BATCH_MAX_CONCURRENCY: int = 8
+    GEMINI_BATCH_MODEL_CONCURRENCY: Dict[str, int] = {}
+    GEMINI_BATCH_DEFAULT_MODEL_CONCURRENCY: int = 4
+    
+    # Gemini quota handling - per-model requests/minute, fail-fast wait budget, retries, breaker
+    GEMINI_RATE_LIMITS: Dict[str, float] = {}
+    GEMINI_DEFAULT_RPM: float = 60
+    GEMINI_RATE_BURST: int = 10
+    GEMINI_RATE_MAX_WAIT: float = 2.0
+    GEMINI_RETRY_ATTEMPTS: int = 3
+    GEMINI_RETRY_BASE_DELAY: float = 0.5
+    GEMINI_RETRY_MAX_DELAY: float = 8.0
+    GEMINI_BREAKER_THRESHOLD: int = 5
+    GEMINI_BREAKER_RESET_SECONDS: float = 30.0
+    
+    # Largest audio accepted for transcription; Gemini caps inline request data at 20 MB
+    GEMINI_MAX_AUDIO_BYTES: int = 20 * 1024 * 1024
+    
+    # Background jobs (video / HQ image generation)
+    GEMINI_JOBS_WORKERS: int = 2
+    GEMINI_JOBS_MAX_QUEUED: int = 1000
+    GEMINI_JOBS_PERSIST: bool = True
+    
+    # Vector bulk ingestion - documents per embedding batch and parallel embedding workers
+    VECTOR_INGEST_BATCH_SIZE: int = 128
+    VECTOR_INGEST_WORKERS: int = 4
+    VECTOR_SEARCH_MAX_QUERIES: int = 100
+    
+    # Vector collections - default collection and HNSW index parameters for new collections
+    VECTOR_DEFAULT_COLLECTION: str = "durgasos_embeddings"
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 100
+    VECTOR_HNSW_EF_SEARCH: int = 10
+    
+    # Embedding provider ("onnx" = local CPU model, "gemini" = hosted) and its persistent cache
+    VECTOR_EMBEDDING_PROVIDER: str = "onnx"
+    VECTOR_GEMINI_EMBEDDING_MODEL: str = "models/text-embedding-004"
+    VECTOR_EMBEDDING_CACHE: bool = True
+    VECTOR_EMBEDDING_CACHE_PATH: str = "./embedding_cache/embeddings.sqlite3"
+    
+    # Hybrid search - candidates taken from each ranking before fusion, and the RRF constant
+    VECTOR_HYBRID_CANDIDATES: int = 50
+    VECTOR_RRF_K: int = 60
+    
+    # Vector store maintenance - snapshot directory, and warm-up at startup (gates /ready)
+    VECTOR_SNAPSHOT_DIR: str = "./vector_snapshots"
+    VECTOR_WARM_UP: bool = False
+    
+    # File storage - content store root, streaming chunk size, resumable upload expiry (seconds)
+    # and how long an unreferenced blob must sit untouched before garbage collection removes it
+    FILES_STORAGE_PATH: str = "./file_store"
+    FILES_CHUNK_SIZE: int = 1024 * 1024
+    FILES_UPLOAD_EXPIRY: int = 24 * 3600
+    FILES_GC_GRACE: int = 3600
+    
+    # File previews - thumbnails, WAV waveforms and text snippets made in a process pool after
+    # upload; longest thumbnail edge in pixels, and larger sources than this are not previewed
+    FILES_PREVIEWS: bool = True
+    FILES_PREVIEW_WORKERS: int = 2
+    FILES_THUMBNAIL_SIZE: int = 256
+    FILES_PREVIEW_MAX_BYTES: int = 100 * 1024 * 1024
+    
+    # File indexing (opt-in) - embed uploaded text files into a vector collection in the
+    # background; chunk size and overlap in characters, files allowed to wait, largest file indexed
+    FILES_INDEX: bool = False
+    FILES_INDEX_COLLECTION: str = "files"
+    FILES_INDEX_CHUNK_SIZE: int = 1000
+    FILES_INDEX_CHUNK_OVERLAP: int = 200
+    FILES_INDEX_MAX_QUEUED: int = 1000
+    FILES_INDEX_MAX_BYTES: int = 10 * 1024 * 1024
+    
+    # File tree - write-through to file_items, and the default / maximum listing page size
+    FILES_TREE_PERSIST: bool = True
+    FILES_LIST_LIMIT: int = 1000
+    
+    @property
+    def database_configured(self) -> bool:
+        """Whether database settings are present; persistence is skipped without them"""
+        return bool(self.DATABASE_URL.strip()) or all([
+            self.DATABASE_HOST, self.DATABASE_NAME, self.DATABASE_USER, self.DATABASE_PASSWORD
+        ])
+    
     @model_validator(mode='before')
     @classmethod
     def parse_cors_origins_before(cls, data: Any) -> Any:
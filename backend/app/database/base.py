@@ -2,6 +2,10 @@ from app.config.database import Base, engine
 
 # Import all models here to ensure they're registered
 # from app.modules.auth.models import User
+from app.modules.gemini.models import (
+    ChatSessionModel, ChatMessageModel, GeminiImageGenerationModel, GeminiVideoGenerationModel
+)
+from app.modules.files.models import FileItemModel
 
 def init_db():
     """Initialize database tables"""
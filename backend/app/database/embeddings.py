@@ -0,0 +1,188 @@
+"""Embedding providers and a persistent embedding cache for the vector database"""
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+import numpy as np
+from app.config.settings import settings
+from typing import Any, Dict, List, Optional
+import abc
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider(EmbeddingFunction[Documents], abc.ABC):
+    """Base class for embedding backends.
+    
+    ``name`` identifies the model (and anything else that changes its
+    vectors); it is part of every cache key, so switching providers never
+    serves stale vectors. Models that embed search queries differently from
+    the documents they search override ``embed_queries``.
+    """
+    
+    name: str = ""
+    
+    @abc.abstractmethod
+    def embed_documents(self, input: Documents) -> Embeddings:
+        """Embed texts to be stored and searched"""
+    
+    def embed_queries(self, input: Documents) -> Embeddings:
+        """Embed search queries"""
+        return self.embed_documents(input)
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.embed_documents(input)
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """all-MiniLM-L6-v2 run locally with ONNX Runtime on the CPU (no network calls)"""
+    
+    name = "onnx/all-MiniLM-L6-v2"
+    
+    def __init__(self):
+        self._model = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+    
+    def embed_documents(self, input: Documents) -> Embeddings:
+        return self._model(input)
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Gemini hosted embedding model (``embed_content``), sent in batches of ``batch_size``"""
+    
+    def __init__(self, model_name: str, batch_size: int = 100):
+        self.model_name = model_name
+        self.name = f"gemini/{model_name}"
+        self.batch_size = batch_size
+    
+    def embed_documents(self, input: Documents) -> Embeddings:
+        return self._embed(input, "retrieval_document")
+    
+    def embed_queries(self, input: Documents) -> Embeddings:
+        return self._embed(input, "retrieval_query")
+    
+    def _embed(self, input: Documents, task_type: str) -> Embeddings:
+        import google.generativeai as genai
+        from app.modules.gemini.registry import model_registry
+        
+        model_registry.configure()
+        embeddings = []
+        for start in range(0, len(input), self.batch_size):
+            result = genai.embed_content(
+                model=self.model_name,
+                content=list(input[start:start + self.batch_size]),
+                task_type=task_type,
+            )
+            embeddings.extend(result["embedding"])
+        return embeddings
+
+
+class EmbeddingCache:
+    """SQLite-backed map from (model, sha256(text)) to a float32 vector"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+    
+    def put_many(self, items: Dict[str, List[float]]):
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+            self._conn.commit()
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Wraps a provider so only texts it has never embedded reach the model"""
+    
+    def __init__(self, provider: EmbeddingProvider, cache: Optional[EmbeddingCache]):
+        self.provider = provider
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def name(self) -> str:
+        return self.provider.name
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        return self._cached(input, self.provider.embed_documents, self.provider.name)
+    
+    def embed_queries(self, input: Documents) -> Embeddings:
+        """Embed search queries; cached apart from documents, since they may differ"""
+        return self._cached(input, self.provider.embed_queries, self.provider.name + "#query")
+    
+    def _cached(self, input: Documents, embed, namespace: str) -> Embeddings:
+        if self.cache is None:
+            self.misses += len(input)
+            return embed(input)
+        
+        keys = [EmbeddingCache.key(namespace, text) for text in input]
+        found = self.cache.get_many(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in found:
+                missing.setdefault(key, text)
+        
+        if missing:
+            vectors = embed(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+        self.hits += len(input) - len(missing)
+        self.misses += len(missing)
+        return [found[key] for key in keys]
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "cache_enabled": self.cache is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_embedding_function() -> CachedEmbeddingFunction:
+    """Build the configured provider behind the embedding cache"""
+    if settings.VECTOR_EMBEDDING_PROVIDER == "gemini":
+        provider = GeminiEmbeddingProvider(settings.VECTOR_GEMINI_EMBEDDING_MODEL)
+    elif settings.VECTOR_EMBEDDING_PROVIDER == "onnx":
+        provider = OnnxEmbeddingProvider()
+    else:
+        raise ValueError(f"Unknown embedding provider: {settings.VECTOR_EMBEDDING_PROVIDER}")
+    
+    cache = None
+    if settings.VECTOR_EMBEDDING_CACHE:
+        cache = EmbeddingCache(settings.VECTOR_EMBEDDING_CACHE_PATH)
+    return CachedEmbeddingFunction(provider, cache)
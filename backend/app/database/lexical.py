@@ -0,0 +1,157 @@
+"""In-memory BM25 index kept alongside each vector collection"""
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+import re
+import threading
+
+TOKEN_RE = re.compile(r"\w[\w.\-]*")
+SPLIT_RE = re.compile(r"[._\-]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens that keep identifiers intact.
+    
+    ``report-2024.pdf`` and ``ERR_CONN_RESET`` are indexed whole and also as
+    their parts, so both exact and partial identifier queries match.
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.rstrip(".-")
+        tokens.append(token)
+        parts = [part for part in SPLIT_RE.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: each list contributes 1 / (k + rank) per ID"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index, updated one document at a time.
+    
+    Also keeps each document's text and metadata so lexical-only queries can
+    be answered without touching Chroma. Queries use the threshold algorithm
+    over per-term postings sorted by impact, so a query stops after the top
+    of each list instead of scoring every document that contains a common
+    term. Sorted lists are cached and dropped when a term's postings change.
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self._total_length = 0
+        # term -> (average length used, [(impact, doc_id), ...] highest first)
+        self._ranked: Dict[str, Tuple[float, List[Tuple[float, str]]]] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._lengths)
+    
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing any previous version with the same ID"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+                self._ranked.pop(term, None)
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._documents[doc_id] = (text, metadata)
+    
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+    
+    def get(self, doc_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Stored (text, metadata); empty if the document was removed meanwhile"""
+        return self._documents.get(doc_id, ("", None))
+    
+    def search(self, query: str, limit: int,
+               allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Top ``limit`` (id, score) pairs, optionally restricted to ``allowed`` IDs"""
+        with self._lock:
+            count = len(self._lengths)
+            if not count or limit <= 0:
+                return []
+            average_length = self._total_length / count
+            terms = []
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if postings:
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    terms.append((idf, postings, self._ranked_postings(term, average_length)))
+            
+            scores: Dict[str, float] = {}
+            top: List[float] = []
+            depth = 0
+            while True:
+                threshold = 0.0
+                exhausted = True
+                for idf, _, ranked in terms:
+                    if depth >= len(ranked):
+                        continue
+                    exhausted = False
+                    impact, doc_id = ranked[depth]
+                    threshold += idf * impact
+                    if doc_id in scores or (allowed is not None and doc_id not in allowed):
+                        continue
+                    length = self._lengths[doc_id]
+                    score = sum(
+                        weight * self._impact(postings[doc_id], length, average_length)
+                        for weight, postings, _ in terms if doc_id in postings
+                    )
+                    scores[doc_id] = score
+                    if len(top) < limit:
+                        heapq.heappush(top, score)
+                    elif score > top[0]:
+                        heapq.heapreplace(top, score)
+                depth += 1
+                # Nothing deeper in any list can beat the current top ``limit``
+                if exhausted or (len(top) >= limit and top[0] >= threshold):
+                    break
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    
+    def _impact(self, frequency: int, length: int, average_length: float) -> float:
+        norm = self.k1 * (1 - self.b + self.b * length / average_length)
+        return frequency * (self.k1 + 1) / (frequency + norm)
+    
+    def _ranked_postings(self, term: str, average_length: float) -> List[Tuple[float, str]]:
+        cached = self._ranked.get(term)
+        # Impacts depend on the average length; re-sort once it has drifted noticeably
+        if cached is None or abs(cached[0] - average_length) > 0.1 * average_length:
+            ranked = sorted(
+                (
+                    (self._impact(frequency, self._lengths[doc_id], average_length), doc_id)
+                    for doc_id, frequency in self._postings[term].items()
+                ),
+                reverse=True
+            )
+            cached = self._ranked[term] = (average_length, ranked)
+        return cached[1]
+    
+    def _remove(self, doc_id: str):
+        if doc_id not in self._lengths:
+            return
+        text, _ = self._documents.pop(doc_id)
+        for term in set(tokenize(text)):
+            self._ranked.pop(term, None)
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
@@ -1,57 +1,684 @@
 """Vector Database Client (ChromaDB)"""
 import chromadb
+from chromadb.api.client import SharedSystemClient
 from app.config.settings import settings
-from typing import List, Dict, Any
+from app.database.embeddings import CachedEmbeddingFunction, create_embedding_function
+from app.database.lexical import BM25Index
+from app.shared.exceptions import NotFoundError, ValidationError
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+import hashlib
+import json
 import logging
 import os
+import re
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import time
 
 # Disable ChromaDB telemetry to suppress warnings
 os.environ["CHROMA_TELEMETRY_DISABLED"] = "1"
 
 logger = logging.getLogger(__name__)
 
+# Chroma metadata keys for the HNSW index parameters
+HNSW_KEYS = {
+    "M": "hnsw:M",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+}
 
-class VectorDBClient:
-    """ChromaDB client wrapper"""
+# Metadata key holding the hash used for change detection
+CONTENT_HASH_KEY = "_content_hash"
+
+# Collection metadata key holding the user a collection belongs to; names can't be
+# parsed back into an owner ("a__b__c" is ambiguous, long names are hashed)
+OWNER_KEY = "durgasos:owner"
+
+# Chroma's SQLite database inside the persist directory
+SQLITE_FILE = "chroma.sqlite3"
+
+# Records read per call when scanning a whole collection
+PAGE_SIZE = 5000
+
+
+def document_id(document: str) -> str:
+    """Stable ID derived from a document's text"""
+    return "doc_" + hashlib.sha256(document.encode("utf-8")).hexdigest()[:32]
+
+
+def content_hash(document: str, metadata: Optional[Dict] = None) -> str:
+    """Hash of everything stored for a document; a change means it must be rewritten"""
+    metadata = {key: value for key, value in (metadata or {}).items() if key != CONTENT_HASH_KEY}
+    data = json.dumps([document, metadata], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def collection_name(name: Optional[str] = None, user_id: Optional[str] = None) -> str:
+    """Physical Chroma collection for a logical collection, optionally scoped to a user.
+    
+    Chroma names must be 3-63 characters of ``[A-Za-z0-9_-]``; anything else
+    is replaced, and over-long names are shortened with a hash suffix.
+    """
+    base = name or settings.VECTOR_DEFAULT_COLLECTION
+    full = f"{base}__{user_id}" if user_id else base
+    full = re.sub(r"[^A-Za-z0-9_-]", "-", full).strip("-_") or "collection"
+    if len(full) < 3:
+        full = full.ljust(3, "_")
+    if len(full) > 63:
+        full = full[:50] + "-" + hashlib.sha256(full.encode("utf-8")).hexdigest()[:12]
+    return full
+
+
+class _WriteGate:
+    """Admits any number of shared holders at once, or a single exclusive holder.
+    
+    Writes hold one shared, and snapshot, restore and compaction hold it
+    exclusively so they see (and leave behind) a store that no write is
+    halfway through. A second gate does the same for searches, held
+    exclusively only while the client or a collection is being swapped.
+    """
     
     def __init__(self):
-        # Use PersistentClient for local file-based storage (new ChromaDB API)
-        persist_directory = "./chroma_db"
-        # Ensure directory exists
-        os.makedirs(persist_directory, exist_ok=True)
-        
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection(
-            name="durgasos_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
+        self._condition = threading.Condition()
+        self._writers = 0
+        self._exclusive = False
+    
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            while self._exclusive:
+                self._condition.wait()
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writers -= 1
+                self._condition.notify_all()
+    
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            while self._exclusive:
+                self._condition.wait()
+            # Set first so no new writer gets in while current ones drain
+            self._exclusive = True
+            while self._writers:
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+class VectorDBClient:
+    """ChromaDB client wrapper.
+    
+    Documents live in named collections, each with its own HNSW index, so a
+    query only walks the (smaller) index it is routed to. The Chroma client
+    and embedding function are created on first use rather than at import.
+    
+    Each collection also gets an in-memory BM25 index for keyword queries.
+    It is built from the stored documents the first time it is searched and
+    kept in step by every write and delete made through this client.
+    """
+    
+    def __init__(self, persist_directory: str = None):
+        self.persist_directory = persist_directory or settings.VECTOR_DB_PATH
+        self._client = None
+        self._embedding_function: Optional[CachedEmbeddingFunction] = None
+        self._collections: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # Serialises collection creation; ingest workers may race on a new collection
+        self._collections_lock = threading.RLock()
+        self._lexical: Dict[str, BM25Index] = {}
+        # Held while a lexical index is built, and by writers from their Chroma write until
+        # the index has it: a build never pages a collection that is changing under it
+        self._lexical_lock = threading.Lock()
+        self._gate = _WriteGate()
+        self._readers = _WriteGate()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # Use PersistentClient for local file-based storage (new ChromaDB API)
+                    os.makedirs(self.persist_directory, exist_ok=True)
+                    self._client = chromadb.PersistentClient(path=self.persist_directory)
+        return self._client
+    
+    @property
+    def embedding_function(self) -> CachedEmbeddingFunction:
+        if self._embedding_function is None:
+            with self._lock:
+                if self._embedding_function is None:
+                    self._embedding_function = create_embedding_function()
+        return self._embedding_function
+    
+    @property
+    def collection(self):
+        """The default collection"""
+        return self.get_collection()
+    
+    def default_hnsw(self) -> Dict[str, int]:
+        return {
+            "M": settings.VECTOR_HNSW_M,
+            "ef_construction": settings.VECTOR_HNSW_EF_CONSTRUCTION,
+            "ef_search": settings.VECTOR_HNSW_EF_SEARCH,
+        }
     
-    def add_documents(self, documents: List[str], ids: List[str] = None, metadatas: List[Dict] = None):
-        """Add documents to the vector database"""
+    def get_collection(self, name: str = None, create: bool = True, owner: str = None):
+        """Get a collection by physical name, creating it with default settings if allowed.
+        
+        The default collection is always created on demand; any other missing
+        collection raises ``NotFoundError`` when ``create`` is False. ``owner``
+        is recorded on a collection this call creates.
+        """
+        name = name or settings.VECTOR_DEFAULT_COLLECTION
+        collection = self._collections.get(name)
+        if collection is not None:
+            return collection
+        
+        if create or name == settings.VECTOR_DEFAULT_COLLECTION:
+            return self.create_collection(name, owner=owner)
+        try:
+            collection = self.client.get_collection(
+                name, embedding_function=self.embedding_function
+            )
+        except ValueError:
+            raise NotFoundError(f"Vector collection '{name}' not found")
+        with self._collections_lock:
+            return self._collections.setdefault(name, collection)
+    
+    def create_collection(self, name: str, hnsw: Dict[str, int] = None, space: str = "cosine",
+                          owner: str = None):
+        """Create a collection with the given HNSW parameters, owned by ``owner`` if set.
+        
+        Index parameters and owner are fixed at creation: an existing
+        collection is returned unchanged.
+        """
+        with self._collections_lock:
+            try:
+                collection = self.client.get_collection(
+                    name, embedding_function=self.embedding_function
+                )
+            except ValueError:
+                params = {**self.default_hnsw(), **(hnsw or {})}
+                metadata = {"hnsw:space": space}
+                metadata.update({HNSW_KEYS[key]: value for key, value in params.items() if value})
+                if owner:
+                    metadata[OWNER_KEY] = owner
+                collection = self.client.create_collection(
+                    name=name,
+                    metadata=metadata,
+                    embedding_function=self.embedding_function
+                )
+            self._collections[name] = collection
+            return collection
+    
+    def list_collections(self) -> List[Dict[str, Any]]:
+        """Every collection with its owner, document count and index settings"""
+        collections = []
+        with self._readers.shared():
+            for collection in self.client.list_collections():
+                metadata = collection.metadata or {}
+                collections.append({
+                    "name": collection.name,
+                    "owner": metadata.get(OWNER_KEY),
+                    "count": collection.count(),
+                    "space": metadata.get("hnsw:space", "l2"),
+                    "hnsw": {
+                        key: metadata.get(chroma_key) for key, chroma_key in HNSW_KEYS.items()
+                    },
+                })
+        return collections
+    
+    def drop_collection(self, name: str):
+        """Delete a collection and its index"""
+        with self._gate.shared(), self._lexical_lock, self._collections_lock:
+            self._collections.pop(name, None)
+            self._lexical.pop(name, None)
+            try:
+                self.client.delete_collection(name)
+            except ValueError:
+                raise NotFoundError(f"Vector collection '{name}' not found")
+    
+    def add_documents(self, documents: List[str], ids: List[str] = None,
+                      metadatas: List[Dict] = None, collection: str = None) -> int:
+        """Upsert documents, skipping any that are stored unchanged.
+        
+        Documents without an ID get one derived from their text, so adding
+        the same corpus twice is a no-op. Returns how many were written.
+        """
         if ids is None:
-            ids = [f"doc_{i}" for i in range(len(documents))]
+            ids = [document_id(document) for document in documents]
         if metadatas is None:
-            metadatas = [{}] * len(documents)
+            metadatas = [None] * len(documents)
         
-        self.collection.add(
-            documents=documents,
-            ids=ids,
-            metadatas=metadatas
-        )
+        with self._gate.shared():
+            changed = self.changed(ids, documents, metadatas, collection)
+            if changed:
+                changed_ids = [ids[i] for i in changed]
+                changed_documents = [documents[i] for i in changed]
+                changed_metadatas = [metadatas[i] for i in changed]
+                # Embedded first, so other writers don't wait for the model
+                embeddings = self.embed(changed_documents)
+                target = self.get_collection(collection)
+                with self._lexical_lock:
+                    target.upsert(
+                        documents=changed_documents,
+                        embeddings=embeddings,
+                        ids=changed_ids,
+                        metadatas=self._stamp(changed_documents, changed_metadatas)
+                    )
+                    self._index_lexical(
+                        collection, changed_ids, changed_documents, changed_metadatas
+                    )
+        return len(changed)
     
-    def search(self, query_texts: List[str], n_results: int = 5) -> Dict[str, Any]:
+    def changed(self, ids: List[str], documents: List[str], metadatas: List[Optional[Dict]],
+                collection: str = None) -> List[int]:
+        """Positions of documents that are new or differ from the stored version.
+        
+        Only one position per ID is returned (the last), since Chroma rejects
+        duplicate IDs within a single write.
+        """
+        latest = {doc_id: index for index, doc_id in enumerate(ids)}
+        stored = self.get_collection(collection).get(ids=list(latest), include=["metadatas"])
+        stored_hashes = {
+            doc_id: (metadata or {}).get(CONTENT_HASH_KEY)
+            for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+        }
+        return [
+            index for doc_id, index in latest.items()
+            if stored_hashes.get(doc_id) != content_hash(documents[index], metadatas[index])
+        ]
+    
+    def _stamp(self, documents: List[str], metadatas: List[Optional[Dict]]) -> List[Dict]:
+        return [
+            {**(metadata or {}), CONTENT_HASH_KEY: content_hash(document, metadata)}
+            for document, metadata in zip(documents, metadatas)
+        ]
+    
+    def embed(self, documents: List[str]) -> List[List[float]]:
+        """Compute embeddings without touching the collection (safe to call from worker threads)"""
+        return self.embedding_function(documents)
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Compute embeddings for search queries rather than stored documents"""
+        return self.embedding_function.embed_queries(queries)
+    
+    def upsert(self, ids: List[str], documents: List[str], embeddings: List[List[float]],
+               metadatas: List[Dict] = None, collection: str = None):
+        """Insert or replace documents whose embeddings are already computed"""
+        metadatas = metadatas or [None] * len(documents)
+        with self._gate.shared():
+            target = self.get_collection(collection)
+            with self._lexical_lock:
+                target.upsert(
+                    ids=ids,
+                    documents=documents,
+                    embeddings=embeddings,
+                    metadatas=self._stamp(documents, metadatas)
+                )
+                self._index_lexical(collection, ids, documents, metadatas)
+    
+    def search(self, query_texts: List[str], n_results: int = 5,
+               collection: str = None) -> Dict[str, Any]:
         """Search for similar documents"""
-        results = self.collection.query(
-            query_texts=query_texts,
-            n_results=n_results
-        )
+        embeddings = self.embed_queries(query_texts)
+        with self._readers.shared():
+            results = self.get_collection(collection, create=False).query(
+                query_embeddings=embeddings,
+                n_results=n_results
+            )
+        return results
+    
+    def search_many(self, queries: List[Dict[str, Any]], include: List[str],
+                    collection: str = None) -> List[Dict[str, list]]:
+        """Run several queries with a single embedding batch.
+        
+        Each query is a dict with ``text``, ``n_results`` and optional
+        ``where`` / ``where_document`` filters. Queries that share the same
+        filters go to Chroma in one call. Returns, per query, a dict of
+        ``ids`` plus whichever ``include`` fields were requested.
+        """
+        with self._readers.shared():
+            target = self.get_collection(collection, create=False)
+            embeddings = self.embed_queries([query["text"] for query in queries])
+            
+            groups: Dict[str, List[int]] = {}
+            for index, query in enumerate(queries):
+                filters = json.dumps(
+                    [query.get("where"), query.get("where_document")], sort_keys=True
+                )
+                groups.setdefault(filters, []).append(index)
+            
+            results: List[Dict[str, list]] = [None] * len(queries)
+            for indexes in groups.values():
+                first = queries[indexes[0]]
+                response = target.query(
+                    query_embeddings=[embeddings[i] for i in indexes],
+                    n_results=max(queries[i]["n_results"] for i in indexes),
+                    where=first.get("where") or None,
+                    where_document=first.get("where_document") or None,
+                    include=include
+                )
+                for position, index in enumerate(indexes):
+                    limit = queries[index]["n_results"]
+                    results[index] = {
+                        field: list(response[field][position])[:limit]
+                        for field in ["ids", *include]
+                    }
+        return results
+    
+    def delete(self, ids: List[str] = None, where: Dict[str, Any] = None,
+               where_document: Dict[str, Any] = None, collection: str = None) -> List[str]:
+        """Delete documents by IDs and/or metadata / document filters; returns the deleted IDs"""
+        target = self.get_collection(collection, create=False)
+        with self._gate.shared():
+            matched = target.get(
+                ids=ids, where=where or None, where_document=where_document or None, include=[]
+            )["ids"]
+            if matched:
+                with self._lexical_lock:
+                    target.delete(ids=matched)
+                    index = self._lexical.get(target.name)
+                    if index is not None:
+                        for doc_id in matched:
+                            index.remove(doc_id)
+        return matched
+    
+    def lexical_index(self, collection: str = None) -> BM25Index:
+        """The BM25 index for a collection, built from its stored documents on first use"""
+        name = collection or settings.VECTOR_DEFAULT_COLLECTION
+        index = self._lexical.get(name)
+        if index is not None:
+            return index
+        
+        with self._lexical_lock:
+            index = self._lexical.get(name)
+            if index is None:
+                target = self.get_collection(name, create=False)
+                index = BM25Index()
+                offset = 0
+                while True:
+                    page = target.get(
+                        include=["documents", "metadatas"], limit=PAGE_SIZE, offset=offset
+                    )
+                    for doc_id, document, metadata in zip(
+                        page["ids"], page["documents"], page["metadatas"]
+                    ):
+                        index.add(doc_id, document or "", self._unstamp(metadata))
+                    if len(page["ids"]) < PAGE_SIZE:
+                        break
+                    offset += PAGE_SIZE
+                self._lexical[name] = index
+                logger.info(f"Built lexical index for '{name}' ({len(index)} documents)")
+        return index
+    
+    def _index_lexical(self, collection: Optional[str], ids: List[str], documents: List[str],
+                       metadatas: List[Optional[Dict]]):
+        # Until a collection's index is first searched there is nothing to keep in step.
+        # Callers hold _lexical_lock, so an index being built is never skipped.
+        index = self._lexical.get(collection or settings.VECTOR_DEFAULT_COLLECTION)
+        if index is not None:
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                index.add(doc_id, document, metadata)
+    
+    def _unstamp(self, metadata: Optional[Dict]) -> Optional[Dict]:
+        if not metadata:
+            return None
+        metadata = {key: value for key, value in metadata.items() if key != CONTENT_HASH_KEY}
+        return metadata or None
+    
+    def search_lexical(self, queries: List[Dict[str, Any]], include: List[str],
+                       collection: str = None) -> List[Dict[str, list]]:
+        """BM25 keyword search; same query and result shape as ``search_many``.
+        
+        No embeddings are computed. Results carry ``scores`` (higher is
+        better) and, if requested, documents and metadata from the in-memory
+        index; ``distances`` are None. Queries with ``where`` /
+        ``where_document`` filters resolve the matching IDs through Chroma
+        first; unfiltered queries never leave memory.
+        """
+        with self._readers.shared():
+            target = self.get_collection(collection, create=False)
+            index = self.lexical_index(target.name)
+            
+            results = []
+            for query in queries:
+                allowed = None
+                if query.get("where") or query.get("where_document"):
+                    allowed = set(target.get(
+                        where=query.get("where") or None,
+                        where_document=query.get("where_document") or None,
+                        include=[]
+                    )["ids"])
+                hits = index.search(query["text"], query["n_results"], allowed)
+                
+                result: Dict[str, list] = {
+                    "ids": [doc_id for doc_id, _ in hits],
+                    "scores": [score for _, score in hits],
+                }
+                stored = [index.get(doc_id) for doc_id, _ in hits]
+                if "documents" in include:
+                    result["documents"] = [document for document, _ in stored]
+                if "metadatas" in include:
+                    result["metadatas"] = [metadata for _, metadata in stored]
+                if "distances" in include:
+                    result["distances"] = [None] * len(hits)
+                if "embeddings" in include:
+                    embeddings = {}
+                    if hits:
+                        found = target.get(ids=result["ids"], include=["embeddings"])
+                        embeddings = dict(zip(found["ids"], found["embeddings"]))
+                    result["embeddings"] = [embeddings.get(doc_id) for doc_id in result["ids"]]
+                results.append(result)
         return results
     
-    def delete(self, ids: List[str]):
-        """Delete documents by IDs"""
-        self.collection.delete(ids=ids)
+    
+    def warm_up(self) -> Dict[str, Any]:
+        """Load the embedding model and every collection's HNSW and BM25 indexes.
+        
+        Chroma reads an HNSW index from disk on the first query against it, so
+        without this the first search of each collection after a start pays
+        for the load.
+        """
+        started = time.perf_counter()
+        try:
+            self.embed(["warm up"])
+        except Exception as e:
+            logger.warning(f"Embedding model warm-up failed: {e}")
+        
+        with self._readers.shared():
+            names = [collection.name for collection in self.client.list_collections()]
+            for name in names:
+                target = self.get_collection(name, create=False)
+                sample = target.get(limit=1, include=["embeddings"])
+                if sample["ids"]:
+                    target.query(
+                        query_embeddings=[sample["embeddings"][0]], n_results=1, include=[]
+                    )
+                self.lexical_index(name)
+        seconds = round(time.perf_counter() - started, 3)
+        logger.info(f"Vector store warmed up ({len(names)} collections) in {seconds}s")
+        return {"collections": names, "seconds": seconds}
+    
+    def snapshot(self, path: str) -> Dict[str, Any]:
+        """Write a consistent ``.tar.gz`` snapshot of the whole store to ``path``.
+        
+        Writes wait while the files are copied (searches carry on); compressing
+        the copy happens afterwards, outside the gate.
+        """
+        started = time.perf_counter()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Opens the store, creating it if nothing has been written yet
+        self.client
+        with tempfile.TemporaryDirectory(prefix=".snapshot-", dir=directory) as staging:
+            with self._gate.exclusive():
+                self._copy_store(staging)
+            partial = path + ".partial"
+            with tarfile.open(partial, "w:gz") as tar:
+                for name in os.listdir(staging):
+                    tar.add(os.path.join(staging, name), arcname=name)
+            os.replace(partial, path)
+        return {
+            "path": path,
+            "size": os.path.getsize(path),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    
+    def restore(self, path: str) -> Dict[str, Any]:
+        """Replace the whole store with a snapshot taken by ``snapshot``.
+        
+        The snapshot is unpacked next to the store first, so a bad archive
+        leaves the current store untouched. Cached collections and lexical
+        indexes are dropped and rebuilt on next use. Searches wait while the
+        files are swapped.
+        """
+        started = time.perf_counter()
+        store = os.path.abspath(self.persist_directory)
+        staging = tempfile.mkdtemp(prefix=".restore-", dir=os.path.dirname(store))
+        try:
+            try:
+                with tarfile.open(path, "r:gz") as tar:
+                    tar.extractall(staging, filter="data")
+            except (tarfile.TarError, OSError) as e:
+                raise ValidationError(f"Unreadable vector store snapshot: {e}")
+            if not os.path.isfile(os.path.join(staging, SQLITE_FILE)):
+                raise ValidationError("Not a vector store snapshot")
+            
+            with self._gate.exclusive(), self._readers.exclusive():
+                self._close()
+                previous = store + ".previous"
+                shutil.rmtree(previous, ignore_errors=True)
+                if os.path.exists(store):
+                    os.replace(store, previous)
+                os.replace(staging, store)
+                shutil.rmtree(previous, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return {"path": path, "seconds": round(time.perf_counter() - started, 3)}
+    
+    def compact(self, name: str = None) -> Dict[str, Any]:
+        """Rebuild HNSW indexes from the stored records, then VACUUM the database.
+        
+        Deleted vectors stay in an HNSW graph (and its files) until the index
+        is rebuilt, and SQLite keeps freed pages until vacuumed. Rebuilds
+        ``name`` or every collection. Writes wait until it finishes; searches
+        only wait while a collection is swapped for its rebuilt copy.
+        """
+        started = time.perf_counter()
+        before = self._store_bytes()
+        names = [name] if name else [c.name for c in self.client.list_collections()]
+        with self._gate.exclusive():
+            for collection in names:
+                self._rebuild(collection)
+            self._vacuum()
+        return {
+            "collections": names,
+            "bytes_before": before,
+            "bytes_after": self._store_bytes(),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    
+    def _rebuild(self, name: str):
+        source = self.get_collection(name, create=False)
+        temp_name = collection_name(f"{name[:50]}-rebuild")
+        try:
+            # Left over from an interrupted rebuild
+            self.client.delete_collection(temp_name)
+        except ValueError:
+            pass
+        rebuilt = self.client.create_collection(
+            temp_name, metadata=source.metadata, embedding_function=self.embedding_function
+        )
+        offset = 0
+        while True:
+            page = source.get(
+                include=["embeddings", "documents", "metadatas"], limit=PAGE_SIZE, offset=offset
+            )
+            if page["ids"]:
+                rebuilt.add(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"]
+                )
+            if len(page["ids"]) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        
+        with self._readers.exclusive(), self._collections_lock:
+            self.client.delete_collection(name)
+            rebuilt.modify(name=name)
+            self._collections[name] = rebuilt
+    
+    def _vacuum(self):
+        db = sqlite3.connect(os.path.join(self.persist_directory, SQLITE_FILE))
+        try:
+            db.execute("VACUUM")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Vector store VACUUM skipped: {e}")
+        finally:
+            db.close()
+    
+    def _copy_store(self, destination: str):
+        for entry in os.scandir(self.persist_directory):
+            target = os.path.join(destination, entry.name)
+            if entry.name == SQLITE_FILE:
+                # The backup API yields a consistent copy, WAL contents included
+                source, copy = sqlite3.connect(entry.path), sqlite3.connect(target)
+                try:
+                    source.backup(copy)
+                finally:
+                    source.close()
+                    copy.close()
+            elif entry.name.startswith(SQLITE_FILE):
+                continue
+            elif entry.is_dir():
+                shutil.copytree(entry.path, target)
+            else:
+                shutil.copy2(entry.path, target)
+    
+    def _close(self):
+        """Stop the Chroma client so its files can be replaced; the next use reopens them.
+        
+        Chroma has no public way to close a persistent client: it keeps one
+        running System per path and hands it to every new client. Stopping
+        and forgetting that System uses internals of the chromadb version
+        pinned in requirements.txt; if they change, fail before any file is
+        touched rather than swap files under a running System.
+        """
+        with self._lexical_lock, self._collections_lock, self._lock:
+            if self._client is not None:
+                systems = getattr(SharedSystemClient, "_identifer_to_system", None)
+                identifier = getattr(self._client, "_identifier", None)
+                if systems is None or identifier not in systems:
+                    raise RuntimeError(
+                        f"Cannot close the vector store with chromadb {chromadb.__version__}"
+                    )
+                systems.pop(identifier).stop()
+                self._client = None
+            self._collections.clear()
+            self._lexical.clear()
+    
+    def _store_bytes(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.persist_directory):
+            for name in files:
+                total += os.path.getsize(os.path.join(root, name))
+        return total
 
 
-# Global instance
+# Global instance (connects lazily on first use)
 vector_db = VectorDBClient()
-
@@ -1,12 +1,23 @@
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config.settings import settings
 from app.modules.gemini.controller import router as gemini_router
 from app.modules.files.controller import router as files_router
+from app.modules.files.indexing import file_indexer
+from app.modules.files.previews import preview_pipeline
+from app.modules.files.tree import file_tree
 from app.modules.settings.controller import router as settings_router
 from app.modules.notifications.websocket import websocket_endpoint
 from app.modules.vector.controller import router as vector_router
 from app.modules.desktop.controller import router as desktop_router
+from app.modules.gemini.executor import gemini_executor
+from app.modules.gemini.sessions import chat_sessions
+from app.modules.gemini.service import gemini_service
+from app.modules.gemini.jobs import job_queue
+from app.modules.vector.ingest import ingest_pipeline
+from app.modules.vector.service import vector_service
+from app.shared.readiness import readiness
 
 app = FastAPI(
     title="DurgasOS API",
@@ -30,6 +41,29 @@ app.include_router(settings_router, prefix="/api/v1/settings", tags=["settings"]
 app.include_router(vector_router, prefix="/api/v1/vector", tags=["vector"])
 app.include_router(desktop_router, prefix="/api/v1/desktop", tags=["desktop"])
 
+
+@app.on_event("startup")
+async def startup():
+    await job_queue.start()
+    await file_indexer.start()
+    if settings.GEMINI_PREWARM:
+        gemini_service.warm_up()
+    if settings.VECTOR_WARM_UP:
+        # Runs in the background; /ready reports 503 until it finishes
+        vector_service.warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await file_indexer.stop()
+    gemini_executor.shutdown()
+    chat_sessions.shutdown()
+    ingest_pipeline.shutdown()
+    file_tree.shutdown()
+    preview_pipeline.shutdown()
+
+
 # WebSocket endpoint - register directly to handle /ws (without trailing slash)
 @app.websocket("/ws")
 async def ws_endpoint(websocket: WebSocket):
@@ -45,3 +79,10 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 503 until startup warm-up (or a restore) has finished"""
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
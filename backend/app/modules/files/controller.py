@@ -1,22 +1,147 @@
 """Files controller"""
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Query, Request, Response
+from app.config.settings import settings
+from app.modules.files.previews import THUMBNAIL_CACHE_CONTROL, THUMBNAIL_MEDIA_TYPE
+from app.modules.files.responses import file_response
 from app.modules.files.service import file_service
-from app.modules.files.schemas import FileListResponse
+from app.modules.files.schemas import (
+    FileItem, FileListResponse, FileUploadResponse, FolderCreateRequest, FileMoveRequest,
+    FileSearchRequest, FileSearchResponse, GarbageCollectResponse, HashUploadRequest,
+    PreviewResponse, StorageUsageResponse, UploadCreateRequest, UploadStatusResponse,
+    UploadCompleteRequest
+)
+from typing import Optional
 
 router = APIRouter()
 
 
 @router.get("/", response_model=FileListResponse)
-async def list_files(parent_id: str = "c_drive"):
-    """List files"""
-    return await file_service.list_files(parent_id)
+async def list_files(parent_id: str = "c_drive", limit: Optional[int] = Query(None, ge=1),
+                     cursor: Optional[str] = None):
+    """List files, folders first, a page at a time"""
+    return await file_service.list_files(parent_id, limit, cursor)
 
 
-@router.post("/upload")
+@router.post("/search", response_model=FileSearchResponse)
+async def search_files(request: FileSearchRequest):
+    """Search by name (substring, prefix or fuzzy), type, mime type, size and date"""
+    return await file_service.search_files(request)
+
+
+@router.post("/folders", response_model=FileItem)
+async def create_folder(request: FolderCreateRequest):
+    """Create folder"""
+    return await file_service.create_folder(request)
+
+
+@router.post("/upload", response_model=FileUploadResponse)
 async def upload_file(file: UploadFile = File(...), parent_id: str = "c_drive"):
     """Upload file"""
-    content = await file.read()
-    return await file_service.upload_file(file.filename, content, parent_id)
+    async def chunks():
+        # The multipart parser spools to disk, so neither side holds the whole file
+        while chunk := await file.read(settings.FILES_CHUNK_SIZE):
+            yield chunk
+    
+    return await file_service.upload_file(file.filename, chunks(), parent_id, file.content_type)
+
+
+@router.post("/upload/by-hash", response_model=FileUploadResponse)
+async def upload_by_hash(request: HashUploadRequest):
+    """Add a file from already-stored content; 404 means upload it normally"""
+    return await file_service.upload_by_hash(request)
+
+
+@router.head("/blobs/{sha256}")
+async def has_blob(sha256: str):
+    """200 if content with this SHA-256 is stored, 404 if not"""
+    return Response(status_code=200 if await file_service.has_blob(sha256) else 404)
+
+
+@router.post("/uploads", response_model=UploadStatusResponse)
+async def create_upload(request: UploadCreateRequest):
+    """Start a resumable upload"""
+    return await file_service.create_upload(request)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload(upload_id: str):
+    """Resumable upload progress: send the next chunk from ``offset``"""
+    return await file_service.get_upload(upload_id)
+
+
+@router.patch("/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def append_upload(upload_id: str, request: Request, upload_offset: int = Header(...)):
+    """Append the raw request body at the ``Upload-Offset`` header, streamed to disk"""
+    return await file_service.append_upload(upload_id, upload_offset, request.stream())
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=FileUploadResponse)
+async def complete_upload(upload_id: str, request: UploadCompleteRequest):
+    """Finish a resumable upload (verifying ``sha256`` if given) and add the file"""
+    return await file_service.complete_upload(upload_id, request.sha256)
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Cancel a resumable upload"""
+    await file_service.abort_upload(upload_id)
+    return {"success": True}
+
+
+@router.get("/admin/storage", response_model=StorageUsageResponse)
+async def storage_usage():
+    """Logical vs. stored bytes"""
+    return await file_service.storage_usage()
+
+
+@router.post("/admin/gc", response_model=GarbageCollectResponse)
+async def collect_garbage():
+    """Delete unreferenced stored content"""
+    return await file_service.collect_garbage()
+
+
+@router.api_route("/{file_id}/content", methods=["GET", "HEAD"])
+async def download_file(file_id: str, request: Request, download: bool = False):
+    """File content, with Range (206), If-None-Match (304) and If-Range support.
+    
+    ``download=true`` asks the browser to save it rather than display it.
+    """
+    item = await file_service.get_file(file_id)
+    return file_response(
+        request,
+        file_service.content_path(item),
+        etag=f'"{item.sha256}"',
+        media_type=item.mime_type or "application/octet-stream",
+        filename=item.name,
+        attachment=download,
+    )
+
+
+@router.get("/{file_id}/preview", response_model=PreviewResponse)
+async def get_preview(file_id: str):
+    """Preview metadata: image size, audio waveform or text snippet"""
+    return await file_service.get_preview(file_id)
+
+
+@router.get("/{file_id}/thumbnail")
+async def get_thumbnail(file_id: str, request: Request):
+    """Small JPEG for icons and grids; 202 with Retry-After while it is being made"""
+    item, path = await file_service.get_thumbnail(file_id)
+    if path is None:
+        return Response(status_code=202, headers={"Retry-After": "1"})
+    return file_response(
+        request,
+        path,
+        etag=f'"{item.sha256}-thumbnail"',
+        media_type=THUMBNAIL_MEDIA_TYPE,
+        cache_control=THUMBNAIL_CACHE_CONTROL,
+    )
+
+
+@router.post("/{file_id}/move", response_model=FileItem)
+async def move_file(file_id: str, request: FileMoveRequest):
+    """Move and/or rename a file or folder"""
+    return await file_service.move_file(file_id, request)
 
 
 @router.delete("/{file_id}")
@@ -26,4 +151,3 @@ async def delete_file(file_id: str):
     if not success:
         raise HTTPException(status_code=404, detail="File not found")
     return {"success": True}
-
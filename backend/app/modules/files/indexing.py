@@ -0,0 +1,190 @@
+"""Background vector indexing of uploaded text files"""
+from app.config.settings import settings
+from app.database.vector_db import collection_name, vector_db
+from app.modules.files.previews import preview_kind
+from app.modules.files.tree import file_tree
+from app.modules.vector.ingest import ingest_pipeline
+from app.modules.vector.schemas import VectorDocument
+from app.shared.exceptions import NotFoundError
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional
+import asyncio
+import codecs
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+
+def chunk_text(blocks: Iterable[str], size: int, overlap: int) -> Iterator[str]:
+    """Cut a stream of text into chunks of at most ``size`` characters.
+    
+    Consecutive chunks share ``overlap`` characters (less than half a chunk),
+    so a sentence cut at a boundary is still whole in one of them. Cuts
+    prefer whitespace in the second half of a chunk over splitting a word.
+    Only about one chunk of text is held at a time.
+    """
+    # Cuts land at size // 2 or later, so this keeps every step moving forward
+    overlap = max(0, min(overlap, size // 2 - 1))
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        while len(buffer) > size:
+            cut = max(buffer.rfind(" ", size // 2, size), buffer.rfind("\n", size // 2, size))
+            cut = cut if cut > 0 else size
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            buffer = buffer[cut - overlap:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def read_text(path: str) -> Iterator[str]:
+    """A UTF-8 file's text, block by block; undecodable bytes are dropped"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    with open(path, "rb") as file:
+        while block := file.read(READ_SIZE):
+            yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+async def read_chunks(path: str, size: int, overlap: int) -> AsyncIterator[str]:
+    """``chunk_text`` over a file, each step (read and cut) run in a worker thread"""
+    chunks = chunk_text(read_text(path), size, overlap)
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        yield chunk
+
+
+def chunk_id(file_id: str, index: int) -> str:
+    return f"file_{file_id}_{index}"
+
+
+class FileIndexer:
+    """Embeds uploaded text files into the vector store after upload.
+    
+    Uploads only enqueue work; one worker task reads each file, chunks it and
+    feeds the chunks to the vector ingest pipeline, which embeds and upserts
+    them batch by batch. At most ``max_queued`` files wait to be indexed;
+    beyond that new uploads are not indexed (and counted as dropped) rather
+    than slowing uploads down or growing memory. Every chunk's metadata holds
+    its ``file_id``, and removals share the queue, so a file deleted while
+    waiting or being indexed still loses all its vectors.
+    """
+    
+    def __init__(self, collection: str, chunk_size: int, chunk_overlap: int, max_queued: int,
+                 max_bytes: int, enabled: bool):
+        self.collection = collection
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_queued = max_queued
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._waiting = 0
+        self._indexed = 0
+        self._dropped = 0
+        self._failed = 0
+    
+    async def start(self):
+        """Start the worker task"""
+        if self.enabled:
+            # Removals are never refused, so only index jobs count against max_queued
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._worker())
+    
+    async def stop(self):
+        """Cancel the worker; files still waiting are not indexed"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def join(self):
+        """Wait until all queued work is done"""
+        if self._queue is not None:
+            await self._queue.join()
+    
+    def index(self, file_id: str, mime_type: Optional[str], path: str):
+        """Queue a file for indexing if it is text and the queue has room"""
+        if self._queue is None or preview_kind(mime_type) != "text":
+            return
+        if self._waiting >= self.max_queued:
+            self._dropped += 1
+            logger.warning(f"File index queue is full; not indexing {file_id}")
+            return
+        self._waiting += 1
+        self._queue.put_nowait(("index", file_id, path))
+    
+    def remove(self, file_id: str):
+        """Queue removal of a file's vectors"""
+        if self._queue is not None:
+            self._queue.put_nowait(("remove", file_id, None))
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "indexed": self._indexed,
+            "dropped": self._dropped,
+            "failed": self._failed,
+        }
+    
+    async def _worker(self):
+        while True:
+            action, file_id, path = await self._queue.get()
+            try:
+                if action == "index":
+                    self._waiting -= 1
+                    await self._index(file_id, path)
+                else:
+                    await asyncio.to_thread(self._delete, file_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"File indexing ({action}) failed for {file_id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def _index(self, file_id: str, path: str):
+        try:
+            node = file_tree.get(file_id)
+        except NotFoundError:
+            # Deleted while waiting
+            return
+        if await asyncio.to_thread(os.path.getsize, path) > self.max_bytes:
+            return
+        
+        async def documents():
+            index = 0
+            async for chunk in read_chunks(path, self.chunk_size, self.chunk_overlap):
+                yield VectorDocument(
+                    document=chunk,
+                    id=chunk_id(file_id, index),
+                    metadata={"file_id": file_id, "sha256": node.sha256, "chunk": index},
+                )
+                index += 1
+        
+        async for _ in ingest_pipeline.run(documents(), self.collection):
+            pass
+        self._indexed += 1
+    
+    def _delete(self, file_id: str):
+        try:
+            vector_db.delete(where={"file_id": file_id}, collection=self.collection)
+        except NotFoundError:
+            # Nothing was ever indexed
+            pass
+
+
+file_indexer = FileIndexer(
+    collection=collection_name(settings.FILES_INDEX_COLLECTION),
+    chunk_size=settings.FILES_INDEX_CHUNK_SIZE,
+    chunk_overlap=settings.FILES_INDEX_CHUNK_OVERLAP,
+    max_queued=settings.FILES_INDEX_MAX_QUEUED,
+    max_bytes=settings.FILES_INDEX_MAX_BYTES,
+    enabled=settings.FILES_INDEX,
+)
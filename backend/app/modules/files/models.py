@@ -1,2 +1,22 @@
-# File models placeholder
+"""Files module models (database models)"""
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, String, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.config.database import Base
 
+
+class FileItemModel(Base):
+    """Row in ``file_items``"""
+    __tablename__ = "file_items"
+    
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    name = Column(String(500), nullable=False)
+    type = Column(String(50), nullable=False)
+    size = Column(BigInteger)
+    date_modified = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    parent_id = Column(UUID(as_uuid=False), ForeignKey("file_items.id", ondelete="CASCADE"))
+    user_id = Column(UUID(as_uuid=False))
+    file_path = Column(Text)
+    mime_type = Column(String(255))
+    content_hash = Column(String(64))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
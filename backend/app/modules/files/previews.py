@@ -0,0 +1,208 @@
+"""Thumbnails, audio waveforms and text snippets, generated in the background"""
+from concurrent.futures import ProcessPoolExecutor
+from app.config.settings import settings
+from typing import Any, Dict, Optional
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger(__name__)
+
+# Thumbnails for a file never change (its content is fixed), so browsers may keep them
+THUMBNAIL_CACHE_CONTROL = "private, max-age=31536000, immutable"
+THUMBNAIL_MEDIA_TYPE = "image/jpeg"
+WAVEFORM_BINS = 100
+SNIPPET_CHARS = 500
+TEXT_MIME_TYPES = {"application/json", "application/xml", "application/javascript",
+                   "application/x-yaml", "application/sql"}
+WAV_MIME_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+
+
+def preview_kind(mime_type: Optional[str]) -> Optional[str]:
+    """What kind of preview a mime type gets, or None if it gets none"""
+    mime_type = (mime_type or "").lower()
+    if mime_type.startswith("image/") and mime_type != "image/svg+xml":
+        return "image"
+    if mime_type in WAV_MIME_TYPES:
+        return "audio"
+    if mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES:
+        return "text"
+    return None
+
+
+def _image(source: str, thumbnail: str, size: int) -> Dict[str, Any]:
+    from PIL import Image, ImageOps
+    
+    with Image.open(source) as image:
+        width, height = image.size
+        # JPEG decodes straight to a reduced scale, far cheaper than full size
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "L"):
+            # Transparent areas go white rather than black
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        image.save(thumbnail + ".tmp", "JPEG", quality=80, optimize=True)
+    os.replace(thumbnail + ".tmp", thumbnail)
+    return {"width": width, "height": height, "thumbnail": True}
+
+
+def _audio(source: str) -> Dict[str, Any]:
+    import numpy as np
+    import wave
+    
+    with wave.open(source) as audio:
+        frames, rate = audio.getnframes(), audio.getframerate()
+        channels, width = audio.getnchannels(), audio.getsampwidth()
+        metadata = {"duration": round(frames / rate, 3) if rate else 0.0,
+                    "sample_rate": rate, "channels": channels}
+        if width not in (1, 2, 4) or not frames:
+            return metadata
+        
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        full_scale = float(2 ** (8 * width - 1))
+        per_bin = -(-frames // WAVEFORM_BINS)
+        waveform = []
+        # One bin at a time, so memory stays small whatever the length
+        while block := audio.readframes(per_bin):
+            samples = np.frombuffer(block, dtype=dtype).astype(np.float64)
+            if width == 1:
+                samples -= 128
+            waveform.append(round(min(1.0, float(np.abs(samples).max()) / full_scale), 3))
+        metadata["waveform"] = waveform
+    return metadata
+
+
+def _text(source: str) -> Dict[str, Any]:
+    with open(source, "rb") as file:
+        # Enough bytes for the snippet even if every character is 4 bytes of UTF-8
+        head = file.read(SNIPPET_CHARS * 4)
+    text = head.decode("utf-8", errors="ignore")
+    return {"snippet": text[:SNIPPET_CHARS]}
+
+
+def generate(kind: str, source: str, target: str, size: int) -> Dict[str, Any]:
+    """Build one preview; runs in a worker process.
+    
+    ``target`` is the path prefix for ``.jpg`` (thumbnail) and ``.json``
+    (metadata). Failures are recorded in the metadata, so they are not
+    retried on every request.
+    """
+    try:
+        if kind == "image":
+            metadata = _image(source, target + ".jpg", size)
+        elif kind == "audio":
+            metadata = _audio(source)
+        else:
+            metadata = _text(source)
+    except Exception as e:
+        metadata = {"error": str(e) or type(e).__name__}
+    metadata["kind"] = kind
+    with open(target + ".json.tmp", "w") as file:
+        json.dump(metadata, file)
+    os.replace(target + ".json.tmp", target + ".json")
+    return metadata
+
+
+class PreviewPipeline:
+    """Generates previews after upload without holding up the response.
+    
+    Decoding and resizing run in a process pool (``workers`` processes,
+    started on first use), so a burst of uploads neither blocks the event
+    loop nor contends for the GIL. Previews are keyed by content hash and
+    stored under ``root``, so identical uploads share one preview and a
+    preview is made at most once however often it is requested.
+    """
+    
+    def __init__(self, root: str, workers: int, size: int, max_bytes: int, enabled: bool):
+        self.root = root
+        self.workers = workers
+        self.size = size
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._images = importlib.util.find_spec("PIL") is not None
+        if enabled and not self._images:
+            logger.info("Pillow is not installed; image thumbnails are disabled")
+    
+    def supports(self, mime_type: Optional[str]) -> bool:
+        kind = preview_kind(mime_type)
+        return self.enabled and kind is not None and (kind != "image" or self._images)
+    
+    def schedule(self, sha256: str, mime_type: Optional[str], source: str):
+        """Start generating a preview for a blob unless it exists or is under way"""
+        if sha256 in self._pending or not self.supports(mime_type) or self.get(sha256):
+            return
+        try:
+            if os.path.getsize(source) > self.max_bytes:
+                return
+        except OSError:
+            return
+        os.makedirs(os.path.dirname(self._target(sha256)), exist_ok=True)
+        if self._pool is None:
+            # Spawned, not forked: forking a process that runs threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        future = asyncio.get_running_loop().run_in_executor(
+            self._pool, generate, preview_kind(mime_type), source, self._target(sha256), self.size
+        )
+        self._pending[sha256] = future
+        future.add_done_callback(lambda done: self._finished(sha256, done))
+    
+    def pending(self, sha256: str) -> bool:
+        return sha256 in self._pending
+    
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Stored preview metadata, or None if there is none yet"""
+        try:
+            with open(self._target(sha256) + ".json") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+    
+    def thumbnail_path(self, sha256: str) -> str:
+        return self._target(sha256) + ".jpg"
+    
+    def discard(self, sha256: str):
+        """Delete a blob's previews along with it"""
+        for extension in (".json", ".jpg"):
+            try:
+                os.remove(self._target(sha256) + extension)
+            except FileNotFoundError:
+                pass
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "images": self._images,
+            "pending": len(self._pending),
+        }
+    
+    def _finished(self, sha256: str, future: asyncio.Future):
+        self._pending.pop(sha256, None)
+        if not future.cancelled() and future.exception():
+            logger.error(f"Preview for {sha256} failed: {future.exception()}")
+    
+    def _target(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+
+preview_pipeline = PreviewPipeline(
+    root=os.path.join(settings.FILES_STORAGE_PATH, "previews"),
+    workers=settings.FILES_PREVIEW_WORKERS,
+    size=settings.FILES_THUMBNAIL_SIZE,
+    max_bytes=settings.FILES_PREVIEW_MAX_BYTES,
+    enabled=settings.FILES_PREVIEWS,
+)
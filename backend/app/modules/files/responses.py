@@ -0,0 +1,128 @@
+"""HTTP responses for file content: byte ranges, ETags and zero-copy sends"""
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.shared.exceptions import RangeNotSatisfiableError
+from email.utils import formatdate
+from typing import Optional, Tuple
+from urllib.parse import quote
+import mmap
+import os
+
+# Content never changes under a given ETag, but clients must revalidate (cheap 304s)
+CACHE_CONTROL = "private, no-cache"
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single ``bytes=`` range, or None to send the whole file.
+    
+    Malformed and multi-range headers are ignored, as RFC 9110 allows; a
+    range that starts past the end raises ``RangeNotSatisfiableError``.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiableError(size)
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise RangeNotSatisfiableError(size)
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class RangedFileResponse(Response):
+    """A file, or a byte range of it, sent without reading it through Python buffers.
+    
+    When the server offers the ASGI ``http.response.zerocopy`` extension the
+    open file is handed over for ``sendfile``; otherwise the range is
+    memory-mapped and sent in ``chunk_size`` slices.
+    """
+    
+    chunk_size = 1024 * 1024
+    
+    def __init__(self, path: str, size: int, start: int, end: int, status_code: int = 200,
+                 headers: dict = None, media_type: str = None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(end - start + 1 if size else 0)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code,
+                    "headers": self.raw_headers})
+        count = int(self.headers["content-length"])
+        if scope["method"].upper() == "HEAD" or not count:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        with open(self.path, "rb") as file:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+            
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(self.start, self.end + 1, self.chunk_size):
+                    stop = min(offset + self.chunk_size, self.end + 1)
+                    await send({
+                        "type": "http.response.body",
+                        "body": mapped[offset:stop],
+                        "more_body": stop <= self.end,
+                    })
+
+
+def file_response(request: Request, path: str, etag: str, media_type: Optional[str] = None,
+                  filename: Optional[str] = None, attachment: bool = False,
+                  cache_control: str = CACHE_CONTROL) -> Response:
+    """Serve ``path`` honouring ``If-None-Match`` (304), ``Range`` (206) and ``If-Range``"""
+    stat = os.stat(path)
+    headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    if filename:
+        disposition = "attachment" if attachment else "inline"
+        headers["content-disposition"] = f"{disposition}; filename*=utf-8''{quote(filename)}"
+    
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    # If-Range: only honour the range if the client's copy is still current
+    if range_header and size and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        return RangedFileResponse(path, size, 0, size - 1, headers=headers, media_type=media_type)
+    
+    start, end = byte_range
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return RangedFileResponse(path, size, start, end, status_code=206, headers=headers,
+                              media_type=media_type)
@@ -1,5 +1,10 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
+
+# "substring" = anywhere in the name, "prefix" = start of the name,
+# "fuzzy" = every query word starts a name word, allowing a typo or two
+SearchMatch = Literal["substring", "prefix", "fuzzy"]
 
 
 class FileItem(BaseModel):
@@ -9,14 +14,113 @@ class FileItem(BaseModel):
     size: Optional[str] = None
     date_modified: str
     parent_id: Optional[str] = None
+    mime_type: Optional[str] = None
+    sha256: Optional[str] = None
 
 
 class FileListResponse(BaseModel):
     files: List[FileItem]
+    # Opaque; pass as ``cursor`` for the next page. None on the last page
+    next_cursor: Optional[str] = None
+
+
+class FolderCreateRequest(BaseModel):
+    name: str
+    parent_id: str = "c_drive"
+
+
+class FileMoveRequest(BaseModel):
+    parent_id: str
+    # New name; keeps the current one if omitted
+    name: Optional[str] = None
 
 
 class FileUploadResponse(BaseModel):
     file_id: str
     filename: str
     size: int
+    sha256: str
+    # The content was already stored, so the upload used no extra space
+    deduplicated: bool = False
+
+
+class HashUploadRequest(BaseModel):
+    # SHA-256 (hex) of content the server may already have
+    sha256: str
+    filename: str
+    parent_id: str = "c_drive"
+    mime_type: Optional[str] = None
+
+
+class StorageUsageResponse(BaseModel):
+    files: int
+    blobs: int
+    # Sum of file sizes, counting every copy
+    logical_bytes: int
+    # Bytes actually on disk
+    stored_bytes: int
+
+
+class GarbageCollectResponse(BaseModel):
+    deleted: int
+    freed_bytes: int
+
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    parent_id: str = "c_drive"
+    # Total bytes, if known; completing checks it
+    size: Optional[int] = None
+    mime_type: Optional[str] = None
+
+
+class UploadStatusResponse(BaseModel):
+    upload_id: str
+    filename: str
+    offset: int
+    size: Optional[int] = None
+
+
+class UploadCompleteRequest(BaseModel):
+    # Expected SHA-256 (hex) of the whole file, checked before it is stored
+    sha256: Optional[str] = None
+
+
+
+class FileSearchRequest(BaseModel):
+    query: Optional[str] = None
+    match: SearchMatch = "substring"
+    type: Optional[Literal["file", "folder"]] = None
+    # Exact ("image/png") or a whole family ("image/*")
+    mime_type: Optional[str] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    modified_after: Optional[datetime] = None
+    modified_before: Optional[datetime] = None
+    # Only items somewhere below this folder
+    parent_id: Optional[str] = None
+    limit: int = 50
+    offset: int = 0
+
+
+class FileSearchResponse(BaseModel):
+    files: List[FileItem]
+    total: int
+
 
+class PreviewResponse(BaseModel):
+    status: Literal["ready", "pending", "failed", "unsupported"]
+    # "image", "audio" or "text"
+    kind: Optional[str] = None
+    # Images: original dimensions; the thumbnail is at /files/{id}/thumbnail
+    width: Optional[int] = None
+    height: Optional[int] = None
+    thumbnail: bool = False
+    # WAV audio: peak level (0-1) per slice of the recording
+    duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    waveform: Optional[List[float]] = None
+    # Text: the first few hundred characters
+    snippet: Optional[str] = None
+    error: Optional[str] = None
@@ -0,0 +1,345 @@
+"""Incremental name and metadata index for file search"""
+from app.modules.files.schemas import FileSearchRequest
+from array import array
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import heapq
+import re
+
+if TYPE_CHECKING:
+    from app.modules.files.tree import FileNode
+
+WORD_RE = re.compile(r"[^\W_]+")
+SEPARATOR_RE = re.compile(r"[\W_]+")
+
+# Dead slots tolerated before postings are rebuilt without them
+COMPACT_AFTER = 10000
+# Fuzzy candidates below which further query words are checked, not intersected
+INTERSECT_UNTIL = 1000
+
+
+def word_trigrams(word: str) -> Set[str]:
+    """Trigrams of a word, padded like pg_trgm ("  r", " re", "rep", ..., "rt ")"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prefix_trigrams(word: str) -> Set[str]:
+    """Trigrams every word starting with ``word`` has"""
+    return {f"  {word}"[i:i + 3] for i in range(len(word))}
+
+
+def query_trigrams(query: str, prefix: bool) -> Set[str]:
+    """Trigrams every name containing ``query`` (casefolded) must have.
+    
+    Word boundaries are only padded where the query shows them: after a
+    separator, before one, or at the start of the name for prefix queries.
+    """
+    parts = SEPARATOR_RE.split(query)
+    grams = set()
+    for i, part in enumerate(parts):
+        if not part:
+            continue
+        text = ("  " if i or prefix else "") + part + (" " if i < len(parts) - 1 else "")
+        grams.update(text[j:j + 3] for j in range(len(text) - 2))
+    return grams
+
+
+def allowed_edits(word: str) -> int:
+    """Typos tolerated in a fuzzy query word; numbers and short words must match exactly"""
+    if len(word) < 4 or not word.isalpha():
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def prefix_distance(word: str, text: str, limit: int) -> int:
+    """Fewest edits turning ``word`` into a prefix of ``text``, capped at limit + 1.
+    
+    Optimal string alignment: an adjacent swap counts as one edit.
+    """
+    text = text[:len(word) + limit]
+    # Every character of ``word`` missing from the prefix costs at least one edit
+    if len(text) < len(word) - limit or len(set(word).difference(text)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(text) + 1))
+    for i in range(1, len(word) + 1):
+        current = [i] + [0] * len(text)
+        for j in range(1, len(text) + 1):
+            cost = word[i - 1] != text[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and word[i - 1] == text[j - 2] and word[i - 2] == text[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(min(previous), limit + 1)
+
+
+def _month(date_modified: str) -> Optional[str]:
+    return _utc(datetime.fromisoformat(date_modified)).strftime("%Y-%m") if date_modified else None
+
+
+def _utc(value: datetime) -> datetime:
+    # Naive datetimes in requests are taken as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _mime_term(mime_type: str) -> str:
+    mime_type = mime_type.lower()
+    family = mime_type[:-2] if mime_type.endswith("/*") else mime_type
+    return f"mime:{family}" if "/" in family else f"mime:{family}/*"
+
+
+def _terms(node: "FileNode") -> List[str]:
+    terms = [f"type:{node.type}"]
+    if node.mime_type:
+        terms.append(_mime_term(node.mime_type))
+        terms.append(_mime_term(node.mime_type.split("/")[0]))
+    if node.size is not None:
+        terms.append(f"size:{node.size.bit_length()}")
+    month = _month(node.date_modified)
+    if month:
+        terms.append(f"month:{month}")
+    return terms
+
+
+class FileIndex:
+    """Trigram, word and metadata postings over every file and folder.
+    
+    Each item gets a slot number; postings are append-only arrays of slots,
+    4 bytes per entry (about 250 bytes per indexed item in all). Deletes
+    and renames leave a dead slot that is skipped on read, and the postings
+    are rebuilt once dead slots outnumber live ones. Size and modified date
+    are bucketed (powers of two, months) so ranges read a few postings.
+    
+    A search reads only its most selective postings list (the rarest query
+    trigram, a mime family, a size or date range...) and checks every
+    condition on those candidates, so results are exact. Fuzzy queries are
+    matched against the vocabulary of distinct words, which is far smaller
+    than the number of names, then read through those words' postings.
+    """
+    
+    def __init__(self):
+        self._reset()
+    
+    def _reset(self):
+        self._slots: List[Optional["FileNode"]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._trigrams: Dict[str, array] = {}
+        self._terms: Dict[str, array] = {}
+        # Alphabetic words -> slots, and their trigrams -> words, for fuzzy matching
+        self._words: Dict[str, array] = {}
+        self._word_trigrams: Dict[str, Set[str]] = {}
+        self._dead = 0
+    
+    def __len__(self) -> int:
+        return len(self._slot_of)
+    
+    def add(self, node: "FileNode"):
+        slot = len(self._slots)
+        self._slots.append(node)
+        self._slot_of[node.id] = slot
+        grams = set()
+        for word in set(WORD_RE.findall(node.name.casefold())):
+            grams.update(word_trigrams(word))
+            if word.isalpha():
+                if word not in self._words:
+                    self._words[word] = array("I")
+                    for gram in word_trigrams(word):
+                        self._word_trigrams.setdefault(gram, set()).add(word)
+                self._words[word].append(slot)
+        for gram in grams:
+            self._trigrams.setdefault(gram, array("I")).append(slot)
+        for term in _terms(node):
+            self._terms.setdefault(term, array("I")).append(slot)
+    
+    def remove(self, node_id: str):
+        slot = self._slot_of.pop(node_id, None)
+        if slot is None:
+            return
+        self._slots[slot] = None
+        self._dead += 1
+        if self._dead > COMPACT_AFTER and self._dead > len(self._slot_of):
+            self._compact()
+    
+    def update(self, node: "FileNode"):
+        """Re-index an item after a rename, move or change"""
+        self.remove(node.id)
+        self.add(node)
+    
+    def search(self, request: FileSearchRequest,
+               within: Optional[Callable[["FileNode"], bool]] = None) -> Tuple[List, int]:
+        """The requested page of matches, best first, and the total number of matches"""
+        query = " ".join((request.query or "").casefold().split())
+        words = WORD_RE.findall(query) if request.match == "fuzzy" else []
+        # Fuzzy query word -> {vocabulary word: edits}; numbers are matched by prefix instead
+        similar = {word: self._similar_words(word) for word in words if word.isalpha()}
+        
+        sources = [self._metadata_postings(request)]
+        if words:
+            sources.append(self._fuzzy_postings(words, similar))
+        elif query:
+            grams = query_trigrams(query, prefix=request.match == "prefix")
+            if grams:
+                postings = (self._trigrams.get(gram, array("I")) for gram in grams)
+                sources.append([min(postings, key=len)])
+        sources = [postings for postings in sources if postings is not None]
+        
+        rank = self._ranker(request, query, words, similar, within)
+        matches = []
+        candidates = (
+            self._read(min(sources, key=lambda postings: sum(map(len, postings))))
+            if sources else (node for node in self._slots if node is not None)
+        )
+        for node in candidates:
+            key = rank(node)
+            if key is not None:
+                matches.append((key, node))
+        
+        page = heapq.nsmallest(request.offset + request.limit, matches, key=lambda match: match[0])
+        return [node for _, node in page[request.offset:]], len(matches)
+    
+    def _metadata_postings(self, request: FileSearchRequest) -> Optional[List[array]]:
+        """Most selective metadata postings for the request, None if it has no filters"""
+        options = []
+        if request.type:
+            options.append([self._terms.get(f"type:{request.type}", array("I"))])
+        if request.mime_type:
+            options.append([self._terms.get(_mime_term(request.mime_type), array("I"))])
+        if request.min_size is not None or request.max_size is not None:
+            low = (request.min_size or 0).bit_length()
+            high = request.max_size.bit_length() if request.max_size is not None else None
+            options.append([
+                postings for term, postings in self._terms.items()
+                if term.startswith("size:")
+                and low <= int(term[5:]) and (high is None or int(term[5:]) <= high)
+            ])
+        if request.modified_after or request.modified_before:
+            after, before = request.modified_after, request.modified_before
+            low = _utc(after).strftime("%Y-%m") if after else ""
+            high = _utc(before).strftime("%Y-%m") if before else "~"
+            options.append([
+                postings for term, postings in self._terms.items()
+                if term.startswith("month:") and low <= term[6:] <= high
+            ])
+        return min(options, key=lambda postings: sum(map(len, postings))) if options else None
+    
+    def _similar_words(self, word: str) -> Dict[str, int]:
+        """Vocabulary words starting with ``word`` give or take its allowed edits.
+        
+        ``k`` edits change at most ``4k`` of the ``n`` trigrams of "  word", so
+        a match shares at least ``n - 4k`` of them and therefore has at least
+        one of any ``4k + 1`` of them; the rarest are used. Words too short
+        for that bound are checked against the whole vocabulary.
+        """
+        edits = allowed_edits(word)
+        postings = sorted(
+            (self._word_trigrams.get(gram, set()) for gram in prefix_trigrams(word)), key=len
+        )
+        needed = len(postings) - 4 * edits
+        candidates = (
+            set().union(*postings[:len(postings) - needed + 1]) if needed > 0 else self._words
+        )
+        similar = {}
+        for candidate in candidates:
+            distance = prefix_distance(word, candidate, edits)
+            if distance <= edits:
+                similar[candidate] = distance
+        return similar
+    
+    def _fuzzy_postings(self, words: List[str],
+                        similar: Dict[str, Dict[str, int]]) -> List[array]:
+        """Slots with a match for every fuzzy query word, intersected smallest first"""
+        unions = []
+        for word in words:
+            if word in similar:
+                unions.append([self._words[match] for match in similar[word]])
+            else:
+                postings = (self._trigrams.get(gram, array("I")) for gram in prefix_trigrams(word))
+                unions.append([min(postings, key=len)])
+        unions.sort(key=lambda postings: sum(map(len, postings)))
+        slots = set().union(*unions[0])
+        for postings in unions[1:]:
+            # Past this point checking candidates is cheaper than building another set
+            if len(slots) <= INTERSECT_UNTIL:
+                break
+            slots.intersection_update(set().union(*postings))
+        return [array("I", slots)]
+    
+    def _ranker(self, request: FileSearchRequest, query: str, words: List[str],
+                similar: Dict[str, Dict[str, int]],
+                within: Optional[Callable[["FileNode"], bool]]):
+        """Function giving a node's sort key, or None if it does not match"""
+        mime = _mime_term(request.mime_type)[5:] if request.mime_type else None
+        # "image/*" matches by prefix, "image/png" exactly
+        family = mime[:-1] if mime and mime.endswith("/*") else None
+        after = _utc(request.modified_after) if request.modified_after else None
+        before = _utc(request.modified_before) if request.modified_before else None
+        
+        def rank(node: "FileNode") -> Optional[Tuple]:
+            if request.type and node.type != request.type:
+                return None
+            if mime:
+                node_mime = (node.mime_type or "").lower()
+                if not (node_mime.startswith(family) if family else node_mime == mime):
+                    return None
+            if request.min_size is not None or request.max_size is not None:
+                if node.size is None or node.size < (request.min_size or 0):
+                    return None
+                if request.max_size is not None and node.size > request.max_size:
+                    return None
+            if after or before:
+                modified = _utc(datetime.fromisoformat(node.date_modified))
+                if (after and modified < after) or (before and modified > before):
+                    return None
+            
+            name = node.name.casefold()
+            if words:
+                name_words = WORD_RE.findall(name)
+                score = 0
+                for word in words:
+                    if word in similar:
+                        edits = [similar[word][w] for w in name_words if w in similar[word]]
+                    else:
+                        edits = [0 for w in name_words if w.startswith(word)]
+                    if not edits:
+                        return None
+                    score += min(edits)
+            elif request.match == "prefix":
+                if not name.startswith(query):
+                    return None
+                score = 0
+            elif query:
+                position = name.find(query)
+                if position < 0:
+                    return None
+                # Whole name, then start of a word, then anywhere
+                score = 0 if position == 0 else 1 if not name[position - 1].isalnum() else 2
+            else:
+                score = 0
+            if within and not within(node):
+                return None
+            return (score, len(name), name, node.id)
+        
+        return rank
+    
+    def _read(self, postings: List[array]) -> Iterator["FileNode"]:
+        seen = set() if len(postings) > 1 else None
+        for slots in postings:
+            for slot in slots:
+                node = self._slots[slot]
+                if node is None:
+                    continue
+                if seen is not None:
+                    if slot in seen:
+                        continue
+                    seen.add(slot)
+                yield node
+    
+    def _compact(self):
+        live = [node for node in self._slots if node is not None]
+        self._reset()
+        for node in live:
+            self.add(node)
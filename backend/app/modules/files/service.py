@@ -1,45 +1,215 @@
 """File operations service"""
-from app.modules.files.schemas import FileItem, FileListResponse
-from typing import List
-import os
-import uuid
-from datetime import datetime
-
-# Mock file storage (in production, use proper storage)
-file_storage: List[FileItem] = [
-    FileItem(id="root", name="This PC", type="folder", date_modified="", parent_id=None),
-    FileItem(id="c_drive", name="Local Disk (C:)", type="drive", date_modified="", size="800 GB free", parent_id="root"),
-]
+from app.config.settings import settings
+from app.modules.files.schemas import (
+    FileItem, FileListResponse, FileUploadResponse, FolderCreateRequest, FileMoveRequest,
+    FileSearchRequest, FileSearchResponse, GarbageCollectResponse, HashUploadRequest,
+    PreviewResponse, StorageUsageResponse, UploadCreateRequest, UploadStatusResponse
+)
+from app.modules.files.indexing import file_indexer
+from app.modules.files.previews import preview_pipeline
+from app.modules.files.storage import StoredObject, UploadSession, content_store
+from app.modules.files.tree import file_tree
+from app.shared.exceptions import NotFoundError
+from typing import AsyncIterable, Optional, Tuple
+import asyncio
+import mimetypes
 
 
 class FileService:
     """Service for file operations"""
     
-    async def list_files(self, parent_id: str = "c_drive") -> FileListResponse:
-        """List files in a directory"""
-        files = [f for f in file_storage if f.parent_id == parent_id]
-        return FileListResponse(files=files)
-    
-    async def upload_file(self, filename: str, content: bytes, parent_id: str = "c_drive") -> dict:
-        """Upload a file"""
-        file_id = str(uuid.uuid4())
-        file_item = FileItem(
-            id=file_id,
-            name=filename,
-            type="file",
-            size=f"{len(content)} bytes",
-            date_modified=datetime.now().isoformat(),
-            parent_id=parent_id
+    async def list_files(self, parent_id: str = "c_drive", limit: Optional[int] = None,
+                         cursor: Optional[str] = None) -> FileListResponse:
+        """One page of a directory; pass ``next_cursor`` back to get the next"""
+        await file_tree.ready()
+        limit = min(limit or settings.FILES_LIST_LIMIT, settings.FILES_LIST_LIMIT)
+        nodes, next_cursor = file_tree.list(parent_id, limit, cursor)
+        return FileListResponse(files=[node.to_item() for node in nodes], next_cursor=next_cursor)
+    
+    async def get_file(self, file_id: str) -> FileItem:
+        """A stored file by ID"""
+        await file_tree.ready()
+        node = file_tree.get(file_id)
+        if not node.sha256:
+            raise NotFoundError(f"File {file_id} not found")
+        return node.to_item()
+    
+    async def search_files(self, request: FileSearchRequest) -> FileSearchResponse:
+        """Search names and metadata across the whole tree"""
+        await file_tree.ready()
+        request.limit = max(1, min(request.limit, settings.FILES_LIST_LIMIT))
+        request.offset = max(0, request.offset)
+        nodes, total = file_tree.search(request)
+        return FileSearchResponse(files=[node.to_item() for node in nodes], total=total)
+    
+    def content_path(self, item: FileItem) -> str:
+        """Where a file's content lives in the content store"""
+        return content_store.path(item.sha256)
+    
+    async def get_preview(self, file_id: str) -> PreviewResponse:
+        """A file's preview metadata, generating it now if it was never made"""
+        return self._preview(await self.get_file(file_id))
+    
+    async def get_thumbnail(self, file_id: str) -> Tuple[FileItem, Optional[str]]:
+        """A file and its thumbnail's path; None while it is being made.
+        
+        Raises NotFoundError if the file has no thumbnail and will not get one.
+        """
+        item = await self.get_file(file_id)
+        preview = self._preview(item)
+        if preview.thumbnail:
+            return item, preview_pipeline.thumbnail_path(item.sha256)
+        if preview.status == "pending":
+            return item, None
+        raise NotFoundError(f"File {file_id} has no thumbnail")
+    
+    async def create_folder(self, request: FolderCreateRequest) -> FileItem:
+        """Create an empty folder"""
+        await file_tree.ready()
+        return file_tree.add(request.name, "folder", request.parent_id).to_item()
+    
+    async def move_file(self, file_id: str, request: FileMoveRequest) -> FileItem:
+        """Move and/or rename a file or folder, with everything under it"""
+        await file_tree.ready()
+        return file_tree.move(file_id, request.parent_id, request.name).to_item()
+    
+    async def upload_file(self, filename: str, chunks: AsyncIterable[bytes],
+                          parent_id: str = "c_drive",
+                          mime_type: Optional[str] = None) -> FileUploadResponse:
+        """Upload a file, streaming its content into the content store"""
+        await file_tree.ready()
+        # Fail before receiving the body if it would have nowhere to go
+        file_tree.check_parent(parent_id)
+        stored = await content_store.put(chunks)
+        return self._add_file(filename, stored, parent_id, mime_type)
+    
+    async def upload_by_hash(self, request: HashUploadRequest) -> FileUploadResponse:
+        """Add a file whose content is already stored, without transferring it.
+        
+        Clients hash locally and try this first; a 404 means the content has
+        to be uploaded.
+        """
+        await file_tree.ready()
+        file_tree.check_parent(request.parent_id)
+        stored = content_store.claim(request.sha256)
+        if stored is None:
+            raise NotFoundError(f"No stored content with SHA-256 {request.sha256}")
+        return self._add_file(request.filename, stored, request.parent_id, request.mime_type)
+    
+    async def has_blob(self, sha256: str) -> bool:
+        """Whether content with this hash is stored, without refreshing its GC grace period"""
+        return content_store.exists(sha256)
+    
+    async def create_upload(self, request: UploadCreateRequest) -> UploadStatusResponse:
+        """Start a resumable upload"""
+        await file_tree.ready()
+        file_tree.check_parent(request.parent_id)
+        session = await content_store.create_upload(
+            request.filename, request.parent_id, request.size, request.mime_type
         )
-        file_storage.append(file_item)
-        return {"file_id": file_id, "filename": filename, "size": len(content)}
+        return self._upload_status(session)
+    
+    async def get_upload(self, upload_id: str) -> UploadStatusResponse:
+        """Progress of a resumable upload; clients resume from ``offset``"""
+        return self._upload_status(await content_store.get_upload(upload_id))
+    
+    async def append_upload(self, upload_id: str, offset: int,
+                            chunks: AsyncIterable[bytes]) -> UploadStatusResponse:
+        """Append the next chunk of a resumable upload at ``offset``"""
+        return self._upload_status(await content_store.append(upload_id, offset, chunks))
+    
+    async def complete_upload(self, upload_id: str,
+                              sha256: Optional[str] = None) -> FileUploadResponse:
+        """Finish a resumable upload and add the file"""
+        await file_tree.ready()
+        session, stored = await content_store.complete(upload_id, sha256)
+        return self._add_file(session.filename, stored, session.parent_id, session.mime_type)
+    
+    async def abort_upload(self, upload_id: str):
+        """Cancel a resumable upload"""
+        await content_store.abort(upload_id)
     
     async def delete_file(self, file_id: str) -> bool:
-        """Delete a file"""
-        global file_storage
-        file_storage = [f for f in file_storage if f.id != file_id]
+        """Delete a file, or a folder and everything in it; False if there is no such item"""
+        await file_tree.ready()
+        try:
+            removed = file_tree.remove(file_id)
+        except NotFoundError:
+            return False
+        # Identical uploads share one blob; drop it with its last file
+        for node in removed:
+            if node.sha256:
+                file_indexer.remove(node.id)
+                self._release(node.sha256)
         return True
+    
+    async def storage_usage(self) -> StorageUsageResponse:
+        """How much space deduplication saves"""
+        await file_tree.ready()
+        files, logical_bytes = file_tree.usage()
+        blobs, stored_bytes = await asyncio.to_thread(content_store.usage)
+        return StorageUsageResponse(
+            files=files, blobs=blobs, logical_bytes=logical_bytes, stored_bytes=stored_bytes
+        )
+    
+    async def collect_garbage(self) -> GarbageCollectResponse:
+        """Delete stored content no file references (left by crashes or failed deletes)"""
+        await file_tree.ready()
+        deleted, freed = await content_store.collect(
+            lambda sha256: file_tree.references(sha256) > 0, settings.FILES_GC_GRACE
+        )
+        for sha256 in deleted:
+            preview_pipeline.discard(sha256)
+        return GarbageCollectResponse(deleted=len(deleted), freed_bytes=freed)
+    
+    def _add_file(self, filename: str, stored: StoredObject, parent_id: str,
+                  mime_type: Optional[str] = None) -> FileUploadResponse:
+        try:
+            node = file_tree.add(
+                filename,
+                "file",
+                parent_id,
+                size=stored.size,
+                mime_type=mime_type or mimetypes.guess_type(filename)[0],
+                sha256=stored.sha256,
+            )
+        finally:
+            # Referenced now, or unwanted if adding failed
+            content_store.unpin(stored.sha256)
+            self._release(stored.sha256)
+        # In the background; the response does not wait for them
+        preview_pipeline.schedule(stored.sha256, node.mime_type, content_store.path(stored.sha256))
+        file_indexer.index(node.id, node.mime_type, content_store.path(stored.sha256))
+        return FileUploadResponse(
+            file_id=node.id,
+            filename=filename,
+            size=stored.size,
+            sha256=stored.sha256,
+            deduplicated=stored.deduplicated,
+        )
+    
+    def _preview(self, item: FileItem) -> PreviewResponse:
+        metadata = preview_pipeline.get(item.sha256)
+        if metadata is None:
+            # Files from before previews existed, or whose job was lost in a restart
+            preview_pipeline.schedule(item.sha256, item.mime_type, self.content_path(item))
+            status = "pending" if preview_pipeline.pending(item.sha256) else "unsupported"
+            return PreviewResponse(status=status)
+        return PreviewResponse(status="failed" if "error" in metadata else "ready", **metadata)
+    
+    def _release(self, sha256: str):
+        """Delete a blob once no file references it"""
+        if not file_tree.references(sha256) and not content_store.is_pinned(sha256):
+            content_store.delete(sha256)
+            preview_pipeline.discard(sha256)
+    
+    def _upload_status(self, session: UploadSession) -> UploadStatusResponse:
+        return UploadStatusResponse(
+            upload_id=session.id,
+            filename=session.filename,
+            offset=session.offset,
+            size=session.size
+        )
 
 
 file_service = FileService()
-
@@ -0,0 +1,369 @@
+"""Content store for uploaded files on the local filesystem"""
+from app.config.settings import settings
+from app.shared.exceptions import ConflictError, NotFoundError, ValidationError
+from datetime import datetime, timezone
+from typing import AsyncIterable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class StoredObject:
+    """A blob in the content store, addressed by the SHA-256 of its bytes"""
+    
+    def __init__(self, sha256: str, size: int, deduplicated: bool = False):
+        self.sha256 = sha256
+        self.size = size
+        # Already stored before this upload, so it took no extra space
+        self.deduplicated = deduplicated
+
+
+class UploadSession:
+    """A resumable upload whose bytes so far are in ``uploads/<id>.part``"""
+    
+    def __init__(self, upload_id: str, filename: str, parent_id: str,
+                 size: Optional[int] = None, mime_type: Optional[str] = None,
+                 created_at: Optional[str] = None, offset: int = 0):
+        self.id = upload_id
+        self.filename = filename
+        self.parent_id = parent_id
+        self.size = size
+        self.mime_type = mime_type
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat()
+        self.offset = offset
+        self.lock = asyncio.Lock()
+        # Hash of the first ``offset`` bytes; rebuilt from the part file after a restart
+        self.hasher = None
+    
+    def to_dict(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "parent_id": self.parent_id,
+            "size": self.size,
+            "mime_type": self.mime_type,
+            "created_at": self.created_at,
+        }
+
+
+class ContentStore:
+    """Blobs stored under ``objects/<sha[:2]>/<sha>``, written as they stream in.
+    
+    Uploads are written chunk by chunk to a temporary file while being
+    hashed, then renamed into place, so memory per upload is one chunk
+    whatever the file size and a failed upload never leaves a partial blob.
+    Identical content is stored once. Resumable uploads keep their bytes and
+    a small JSON record in ``uploads/`` until completed, aborted or expired.
+    
+    Blobs handed out by ``put``, ``complete`` and ``claim`` are pinned until
+    the caller ``unpin``s them, by which time a file references them; pinned
+    or recently touched blobs are never collected, so a blob cannot vanish
+    between being stored and being referenced.
+    """
+    
+    def __init__(self, root: str, chunk_size: int, upload_expiry: int):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.upload_expiry = upload_expiry
+        self.objects_dir = os.path.join(root, "objects")
+        self.uploads_dir = os.path.join(root, "uploads")
+        self._sessions: Dict[str, UploadSession] = {}
+        self._pins: Dict[str, int] = {}
+        # Serializes committing a blob against collecting it
+        self._blob_lock = threading.Lock()
+    
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+    
+    def exists(self, sha256: str) -> bool:
+        """Whether a blob is stored; unlike ``claim`` this neither pins nor touches it"""
+        return os.path.isfile(self.path(self._digest(sha256)))
+    
+    def delete(self, sha256: str):
+        """Remove a blob unless it is pinned"""
+        with self._blob_lock:
+            if sha256 in self._pins:
+                return
+            try:
+                os.remove(self.path(sha256))
+            except FileNotFoundError:
+                pass
+    
+    def claim(self, sha256: str) -> Optional[StoredObject]:
+        """The stored blob with this hash, pinned, or None if it is not stored"""
+        sha256 = self._digest(sha256)
+        with self._blob_lock:
+            try:
+                # Touched so a sweep already in progress treats it as fresh
+                os.utime(self.path(sha256))
+                size = os.path.getsize(self.path(sha256))
+            except FileNotFoundError:
+                return None
+            self.pin(sha256)
+        return StoredObject(sha256, size, deduplicated=True)
+    
+    def _digest(self, sha256: str) -> str:
+        # Hashes become paths, so anything but 64 hex digits is refused
+        sha256 = sha256.lower()
+        if not SHA256_RE.fullmatch(sha256):
+            raise ValidationError("sha256 must be 64 hexadecimal characters")
+        return sha256
+    
+    def pin(self, sha256: str):
+        self._pins[sha256] = self._pins.get(sha256, 0) + 1
+    
+    def unpin(self, sha256: str):
+        self._pins[sha256] -= 1
+        if not self._pins[sha256]:
+            del self._pins[sha256]
+    
+    def is_pinned(self, sha256: str) -> bool:
+        return sha256 in self._pins
+    
+    async def collect(self, referenced: Callable[[str], bool],
+                      grace: int) -> Tuple[List[str], int]:
+        """Delete blobs no file references, untouched for ``grace`` seconds.
+        
+        Returns the hashes deleted and the bytes freed.
+        """
+        blobs = await asyncio.to_thread(self._scan)
+        # Checked on the event loop, where references change
+        garbage = [path for sha256, path in blobs if not referenced(sha256)]
+        return await asyncio.to_thread(self._sweep, garbage, time.time() - grace)
+    
+    def usage(self) -> Tuple[int, int]:
+        """(blob count, bytes on disk)"""
+        count, size = 0, 0
+        for _, path in self._scan():
+            count += 1
+            size += os.path.getsize(path)
+        return count, size
+    
+    async def put(self, chunks: AsyncIterable[bytes]) -> StoredObject:
+        """Stream ``chunks`` into the store; the blob comes back pinned"""
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        temp = os.path.join(self.uploads_dir, f"{uuid.uuid4()}.tmp")
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp, "wb") as file:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await asyncio.to_thread(self._write_hashed, file, hasher, chunk)
+            sha256 = hasher.hexdigest()
+            deduplicated = await self._commit_pinned(temp, sha256)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        return StoredObject(sha256, size, deduplicated)
+    
+    async def create_upload(self, filename: str, parent_id: str, size: Optional[int] = None,
+                            mime_type: Optional[str] = None) -> UploadSession:
+        """Start a resumable upload"""
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        await asyncio.to_thread(self.purge_expired)
+        session = UploadSession(str(uuid.uuid4()), filename, parent_id, size, mime_type)
+        session.hasher = hashlib.sha256()
+        with open(self._part_path(session.id), "wb"):
+            pass
+        with open(self._record_path(session.id), "w") as file:
+            json.dump(session.to_dict(), file)
+        self._sessions[session.id] = session
+        return session
+    
+    async def get_upload(self, upload_id: str) -> UploadSession:
+        """A resumable upload by ID, reloaded from disk if this process has not seen it"""
+        session = self._sessions.get(upload_id)
+        if session is not None:
+            return session
+        
+        try:
+            # IDs become file names, so anything but a UUID is refused
+            uuid.UUID(upload_id)
+            with open(self._record_path(upload_id)) as file:
+                record = json.load(file)
+            offset = os.path.getsize(self._part_path(upload_id))
+        except (OSError, ValueError):
+            raise NotFoundError(f"Upload {upload_id} not found")
+        record["upload_id"] = upload_id
+        session = UploadSession(
+            record["upload_id"], record["filename"], record["parent_id"], record.get("size"),
+            record.get("mime_type"), record.get("created_at"), offset
+        )
+        return self._sessions.setdefault(upload_id, session)
+    
+    async def append(self, upload_id: str, offset: int,
+                     chunks: AsyncIterable[bytes]) -> UploadSession:
+        """Write the next part of an upload, which must start at the current offset.
+        
+        Whatever arrives before a dropped connection is kept, so the client
+        resumes from the offset reported by ``get_upload``.
+        """
+        session = await self.get_upload(upload_id)
+        async with session.lock:
+            if offset != session.offset:
+                raise ConflictError(
+                    f"Upload {upload_id} is at offset {session.offset}, not {offset}"
+                )
+            if session.hasher is None:
+                session.hasher = await self._rehash(upload_id)
+            
+            with open(self._part_path(upload_id), "ab") as file:
+                async for chunk in chunks:
+                    if session.size is not None and session.offset + len(chunk) > session.size:
+                        raise ValidationError(f"Upload {upload_id} exceeds its declared size")
+                    await self._write_part(file, session, chunk)
+        return session
+    
+    async def complete(self, upload_id: str,
+                       sha256: Optional[str] = None) -> Tuple[UploadSession, StoredObject]:
+        """Move a finished upload into the store, pinned, checking its size and checksum"""
+        session = await self.get_upload(upload_id)
+        async with session.lock:
+            if session.size is not None and session.offset != session.size:
+                raise ConflictError(
+                    f"Upload {upload_id} has {session.offset} of {session.size} bytes"
+                )
+            if session.hasher is None:
+                session.hasher = await self._rehash(upload_id)
+            digest = session.hasher.hexdigest()
+            if sha256 and sha256.lower() != digest:
+                raise ValidationError(f"Checksum mismatch: upload has SHA-256 {digest}")
+            
+            deduplicated = await self._commit_pinned(self._part_path(upload_id), digest)
+            self._forget(upload_id)
+        return session, StoredObject(digest, session.offset, deduplicated)
+    
+    async def abort(self, upload_id: str):
+        """Cancel an upload and delete what was received"""
+        session = await self.get_upload(upload_id)
+        async with session.lock:
+            self._forget(upload_id)
+    
+    def purge_expired(self):
+        """Delete resumable uploads untouched for longer than ``upload_expiry`` seconds"""
+        cutoff = time.time() - self.upload_expiry
+        for name in os.listdir(self.uploads_dir):
+            upload_id, extension = os.path.splitext(name)
+            if extension == ".part":
+                continue
+            # A resumable upload is as fresh as its last written byte
+            paths = [os.path.join(self.uploads_dir, name)]
+            if extension == ".json":
+                paths.append(self._part_path(upload_id))
+            modified = [os.path.getmtime(path) for path in paths if os.path.exists(path)]
+            if modified and max(modified) < cutoff:
+                if extension == ".json":
+                    self._forget(upload_id)
+                else:
+                    # Temporary file of an interrupted put()
+                    os.remove(paths[0])
+    
+    async def _commit_pinned(self, temp: str, sha256: str) -> bool:
+        self.pin(sha256)
+        try:
+            return await asyncio.to_thread(self._commit, temp, sha256)
+        except BaseException:
+            # Cancelled too: nobody will reference the blob, so it must stay collectable
+            self.unpin(sha256)
+            raise
+    
+    def _commit(self, temp: str, sha256: str) -> bool:
+        """Move ``temp`` into place; True if the content was already stored"""
+        target = self.path(sha256)
+        with self._blob_lock:
+            if os.path.exists(target):
+                # Same content already stored: the new copy is redundant
+                os.utime(target)
+                os.remove(temp)
+                return True
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp, target)
+            return False
+    
+    def _scan(self) -> List[Tuple[str, str]]:
+        blobs = []
+        if not os.path.isdir(self.objects_dir):
+            return blobs
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(directory):
+                if SHA256_RE.fullmatch(name):
+                    blobs.append((name, os.path.join(directory, name)))
+        return blobs
+    
+    def _sweep(self, paths: List[str], cutoff: float) -> Tuple[List[str], int]:
+        deleted, freed = [], 0
+        for path in paths:
+            with self._blob_lock:
+                try:
+                    stat = os.stat(path)
+                    if os.path.basename(path) in self._pins or stat.st_mtime >= cutoff:
+                        continue
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            deleted.append(os.path.basename(path))
+            freed += stat.st_size
+        return deleted, freed
+    
+    def _forget(self, upload_id: str):
+        self._sessions.pop(upload_id, None)
+        for path in (self._part_path(upload_id), self._record_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    async def _write_part(self, file, session: UploadSession, chunk: bytes):
+        # The write and the offset / hash update happen in one thread call. A
+        # cancelled request cannot stop that thread, so it waits for it (holding
+        # the session lock) and the offset always matches the part file.
+        write = asyncio.ensure_future(asyncio.to_thread(self._write_chunk, file, session, chunk))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            await write
+            raise
+    
+    def _write_chunk(self, file, session: UploadSession, chunk: bytes):
+        self._write_hashed(file, session.hasher, chunk)
+        session.offset += len(chunk)
+    
+    def _write_hashed(self, file, hasher, chunk: bytes):
+        # Hashing a chunk takes as long as writing it, so both stay off the event loop
+        file.write(chunk)
+        hasher.update(chunk)
+    
+    async def _rehash(self, upload_id: str):
+        return await asyncio.to_thread(self._hash_file, self._part_path(upload_id))
+    
+    def _hash_file(self, path: str):
+        hasher = hashlib.sha256()
+        with open(path, "rb") as file:
+            while chunk := file.read(self.chunk_size):
+                hasher.update(chunk)
+        return hasher
+    
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.uploads_dir, f"{upload_id}.part")
+    
+    def _record_path(self, upload_id: str) -> str:
+        return os.path.join(self.uploads_dir, f"{upload_id}.json")
+
+
+content_store = ContentStore(
+    root=settings.FILES_STORAGE_PATH,
+    chunk_size=settings.FILES_CHUNK_SIZE,
+    upload_expiry=settings.FILES_UPLOAD_EXPIRY,
+)
@@ -0,0 +1,345 @@
+"""Indexed in-memory file tree, written through to ``file_items``"""
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import settings
+from app.modules.files.schemas import FileItem, FileSearchRequest
+from app.modules.files.search import FileIndex
+from app.shared.exceptions import NotFoundError, ServiceUnavailableError, ValidationError
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import bisect
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Built-in nodes; never stored. Rows with no parent belong to the drive.
+ROOT_ID = "root"
+DRIVE_ID = "c_drive"
+BUILT_IN_IDS = {ROOT_ID, DRIVE_ID}
+
+# API item types and their file_items.type values
+_TYPE_TO_DB = {"folder": "directory"}
+_TYPE_FROM_DB = {"directory": "folder"}
+
+
+class FileNode:
+    """One file or folder; kept small since the tree holds every item"""
+    
+    __slots__ = ("id", "name", "type", "size", "date_modified", "parent_id", "mime_type",
+                 "sha256", "label")
+    
+    def __init__(self, node_id: str, name: str, type: str, parent_id: Optional[str],
+                 size: Optional[int] = None, date_modified: str = "",
+                 mime_type: Optional[str] = None, sha256: Optional[str] = None,
+                 label: Optional[str] = None):
+        self.id = node_id
+        self.name = name
+        self.type = type
+        self.size = size
+        self.date_modified = date_modified
+        self.parent_id = parent_id
+        self.mime_type = mime_type
+        self.sha256 = sha256
+        # Display size for built-ins ("800 GB free")
+        self.label = label
+    
+    @property
+    def is_container(self) -> bool:
+        return self.type != "file"
+    
+    def sort_key(self) -> Tuple[int, str, str]:
+        """Listing order: folders before files, then by name; the ID breaks ties"""
+        return (0 if self.is_container else 1, self.name.casefold(), self.id)
+    
+    def to_item(self) -> FileItem:
+        return FileItem(
+            id=self.id,
+            name=self.name,
+            type=self.type,
+            size=self.label or (f"{self.size} bytes" if self.size is not None else None),
+            date_modified=self.date_modified,
+            parent_id=self.parent_id,
+            mime_type=self.mime_type,
+            sha256=self.sha256,
+        )
+
+
+def encode_cursor(key: Tuple[int, str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str, str]:
+    try:
+        rank, name, node_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(rank), str(name), str(node_id)
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
+
+
+class FileTree:
+    """Every file and folder in memory, indexed by ID and by parent.
+    
+    Each folder keeps its children's sort keys in a sorted list, so a page of
+    a listing costs a binary search plus the page, however many items exist
+    elsewhere. Subtree deletes and moves touch only the subtree, and keep the
+    search index (``FileIndex``) up to date as they go. Changes are
+    written to ``file_items`` on a single background thread (deletes rely on
+    its ``ON DELETE CASCADE``); the table is read once, on first use, and
+    until that read succeeds every request gets a 503 rather than an empty tree.
+    """
+    
+    def __init__(self, persist: bool):
+        self.persist = persist
+        self._nodes: Dict[str, FileNode] = {}
+        self._children: Dict[str, List[Tuple[int, str, str]]] = {}
+        # Files per content hash, so a blob can be dropped with its last file
+        self._hashes: Dict[str, int] = {}
+        self.index = FileIndex()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="files-persist")
+        self._loaded = not persist
+        self._load_lock = asyncio.Lock()
+        self._insert(FileNode(ROOT_ID, "This PC", "folder", None))
+        self._insert(FileNode(DRIVE_ID, "Local Disk (C:)", "drive", ROOT_ID, label="800 GB free"))
+    
+    def __len__(self) -> int:
+        return len(self._nodes)
+    
+    async def ready(self):
+        """Load ``file_items`` on first use; a failed load is retried by the next call"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                nodes = await loop.run_in_executor(self._writer, self._load)
+            except Exception as e:
+                logger.error(f"File tree load error: {e}")
+                raise ServiceUnavailableError("File store is unavailable", retry_after=5)
+            for node in nodes:
+                self._insert(node)
+            self._loaded = True
+            logger.info(f"Loaded file tree ({len(self._nodes) - len(BUILT_IN_IDS)} items)")
+    
+    def get(self, node_id: str) -> FileNode:
+        node = self._nodes.get(node_id)
+        if node is None:
+            raise NotFoundError(f"File {node_id} not found")
+        return node
+    
+    def list(self, parent_id: str, limit: int,
+             cursor: Optional[str] = None) -> Tuple[List[FileNode], Optional[str]]:
+        """One page of a folder's children and the cursor for the next page (None at the end)"""
+        self.get(parent_id)
+        keys = self._children.get(parent_id, [])
+        start = bisect.bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+        page = keys[start:start + limit]
+        next_cursor = encode_cursor(page[-1]) if start + limit < len(keys) and page else None
+        return [self._nodes[key[2]] for key in page], next_cursor
+    
+    def add(self, name: str, type: str, parent_id: str, size: Optional[int] = None,
+            mime_type: Optional[str] = None, sha256: Optional[str] = None) -> FileNode:
+        """Create a file or folder under ``parent_id``"""
+        self.check_parent(parent_id)
+        if not name or "/" in name:
+            raise ValidationError("Invalid name")
+        node = FileNode(
+            str(uuid.uuid4()), name, type, parent_id, size, self._now(), mime_type, sha256
+        )
+        self._insert(node)
+        self._schedule(self._write_insert, self._row(node))
+        return node
+    
+    def remove(self, node_id: str) -> List[FileNode]:
+        """Delete an item and everything under it; returns the deleted nodes"""
+        node = self.get(node_id)
+        if node_id in BUILT_IN_IDS:
+            raise ValidationError(f"{node.name} cannot be deleted")
+        
+        removed = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            removed.append(current)
+            stack.extend(self._nodes[key[2]] for key in self._children.pop(current.id, []))
+        self._unlink(node)
+        for current in removed:
+            del self._nodes[current.id]
+            self.index.remove(current.id)
+            if current.sha256:
+                self._hashes[current.sha256] -= 1
+                if not self._hashes[current.sha256]:
+                    del self._hashes[current.sha256]
+        self._schedule(self._write_delete, node_id)
+        return removed
+    
+    def move(self, node_id: str, parent_id: str, name: Optional[str] = None) -> FileNode:
+        """Move (and optionally rename) an item; its subtree comes with it"""
+        node = self.get(node_id)
+        if node_id in BUILT_IN_IDS:
+            raise ValidationError(f"{node.name} cannot be moved")
+        self.check_parent(parent_id)
+        if name is not None and (not name or "/" in name):
+            raise ValidationError("Invalid name")
+        # Walk up from the destination; only a path through the node itself is a cycle
+        ancestor = parent_id
+        while ancestor is not None:
+            if ancestor == node_id:
+                raise ValidationError("Cannot move a folder into itself")
+            ancestor = self._nodes[ancestor].parent_id
+        
+        self._unlink(node)
+        node.parent_id = parent_id
+        node.name = name or node.name
+        node.date_modified = self._now()
+        bisect.insort(self._children.setdefault(parent_id, []), node.sort_key())
+        self.index.update(node)
+        self._schedule(self._write_update, self._row(node))
+        return node
+    
+    def search(self, request: FileSearchRequest) -> Tuple[List[FileNode], int]:
+        """Files and folders matching ``request``, optionally below ``request.parent_id``"""
+        within = None
+        if request.parent_id:
+            self.get(request.parent_id)
+            
+            def within(node: FileNode) -> bool:
+                ancestor = node.parent_id
+                while ancestor is not None and ancestor != request.parent_id:
+                    ancestor = self._nodes[ancestor].parent_id
+                return ancestor is not None
+        
+        return self.index.search(request, within)
+    
+    def references(self, sha256: str) -> int:
+        """How many files use the blob with this hash"""
+        return self._hashes.get(sha256, 0)
+    
+    def usage(self) -> Tuple[int, int]:
+        """(files, total bytes counting every copy)"""
+        files, size = 0, 0
+        for node in self._nodes.values():
+            if node.type == "file":
+                files += 1
+                size += node.size or 0
+        return files, size
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "items": len(self._nodes),
+            "folders": len(self._children),
+            "blobs": len(self._hashes),
+            "indexed": len(self.index),
+        }
+    
+    def shutdown(self):
+        """Flush queued writes"""
+        self._writer.shutdown(wait=True)
+    
+    def check_parent(self, parent_id: str):
+        """Raise unless new items can go under ``parent_id``"""
+        if not self.get(parent_id).is_container:
+            raise ValidationError("Parent is not a folder")
+        if parent_id == ROOT_ID:
+            raise ValidationError("Items go on a drive, not directly under This PC")
+    
+    def _insert(self, node: FileNode):
+        self._nodes[node.id] = node
+        if node.parent_id is not None:
+            bisect.insort(self._children.setdefault(node.parent_id, []), node.sort_key())
+        if node.sha256:
+            self._hashes[node.sha256] = self._hashes.get(node.sha256, 0) + 1
+        if node.id not in BUILT_IN_IDS:
+            self.index.add(node)
+    
+    def _unlink(self, node: FileNode):
+        siblings = self._children.get(node.parent_id)
+        if siblings is None:
+            return
+        key = node.sort_key()
+        index = bisect.bisect_left(siblings, key)
+        if index < len(siblings) and siblings[index] == key:
+            del siblings[index]
+        if not siblings:
+            del self._children[node.parent_id]
+    
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat()
+    
+    def _row(self, node: FileNode) -> Dict[str, Any]:
+        # Snapshot taken on the event loop; the node may change before the write runs
+        return {
+            "id": node.id,
+            "name": node.name,
+            "type": _TYPE_TO_DB.get(node.type, node.type),
+            "size": node.size,
+            "date_modified": datetime.fromisoformat(node.date_modified),
+            "parent_id": None if node.parent_id == DRIVE_ID else node.parent_id,
+            "mime_type": node.mime_type,
+            "content_hash": node.sha256,
+        }
+    
+    def _schedule(self, func, *args):
+        if self.persist:
+            self._writer.submit(func, *args)
+    
+    def _load(self) -> List[FileNode]:
+        # Errors propagate: an unreachable table must not look like an empty one.
+        # Imported lazily so the tree works without database settings when
+        # persistence is disabled.
+        from app.config.database import SessionLocal
+        from app.modules.files.models import FileItemModel
+        
+        db = SessionLocal()
+        try:
+            return [
+                FileNode(
+                    row.id,
+                    row.name,
+                    _TYPE_FROM_DB.get(row.type, row.type),
+                    row.parent_id or DRIVE_ID,
+                    row.size,
+                    row.date_modified.isoformat() if row.date_modified else "",
+                    row.mime_type,
+                    row.content_hash,
+                )
+                for row in db.query(FileItemModel).yield_per(10000)
+            ]
+        finally:
+            db.close()
+    
+    def _write_insert(self, row: Dict[str, Any]):
+        self._write(lambda db, model: db.add(model(**row)))
+    
+    def _write_update(self, row: Dict[str, Any]):
+        self._write(lambda db, model: db.query(model).filter(model.id == row["id"]).update(
+            {"name": row["name"], "parent_id": row["parent_id"],
+             "date_modified": row["date_modified"]}
+        ))
+    
+    def _write_delete(self, node_id: str):
+        self._write(lambda db, model: db.query(model).filter(model.id == node_id).delete())
+    
+    def _write(self, change):
+        try:
+            from app.config.database import SessionLocal
+            from app.modules.files.models import FileItemModel
+            db = SessionLocal()
+        except Exception as e:
+            logger.error(f"File tree persist error: {e}")
+            return
+        try:
+            change(db, FileItemModel)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"File tree persist error: {e}")
+        finally:
+            db.close()
+
+
+file_tree = FileTree(persist=settings.FILES_TREE_PERSIST and settings.database_configured)
@@ -0,0 +1,96 @@
+"""Batch execution of heterogeneous Gemini jobs"""
+from app.config.settings import settings
+from app.modules.gemini.service import GeminiService, gemini_service
+from app.modules.gemini.schemas import (
+    BatchJob, BatchRequest, BatchItemResult, ChatRequest, ImageRequest,
+    TranscribeRequest, TTSRequest
+)
+from typing import AsyncIterator, Dict
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _job_model(job_type: str, request) -> str:
+    """Upstream model a job will hit, used for per-model limits"""
+    if job_type == "chat":
+        return request.model
+    if job_type == "image":
+        return GeminiService.MODELS["IMAGE_GEN_HQ" if request.is_hq else "IMAGE_GEN_FAST"]
+    if job_type == "transcribe":
+        return GeminiService.MODELS["AUDIO_TRANSCRIBE"]
+    return GeminiService.MODELS["AUDIO_TTS"]
+
+
+class BatchRunner:
+    """Fans a list of jobs out with bounded concurrency.
+    
+    Each batch is capped at ``concurrency`` jobs in flight (never more than
+    ``max_concurrency``), and every model has a process-wide cap shared by all
+    batches, so one large batch cannot starve interactive requests for the
+    same model. Results are yielded in completion order; a failing job yields
+    an error item instead of aborting the batch.
+    """
+    
+    HANDLERS = {
+        "chat": (ChatRequest, gemini_service.chat),
+        "image": (ImageRequest, gemini_service.generate_image),
+        "transcribe": (TranscribeRequest, gemini_service.transcribe_audio),
+        "tts": (TTSRequest, gemini_service.text_to_speech),
+    }
+    
+    def __init__(self, max_jobs: int, max_concurrency: int,
+                 model_limits: Dict[str, int], default_model_limit: int):
+        self.max_jobs = max_jobs
+        self.max_concurrency = max_concurrency
+        self._model_limits = dict(model_limits)
+        self._default_model_limit = default_model_limit
+        self._model_slots: Dict[str, asyncio.Semaphore] = {}
+    
+    def _model_slot(self, model: str) -> asyncio.Semaphore:
+        if model not in self._model_slots:
+            limit = self._model_limits.get(model, self._default_model_limit)
+            self._model_slots[model] = asyncio.Semaphore(limit)
+        return self._model_slots[model]
+    
+    async def run(self, request: BatchRequest) -> AsyncIterator[BatchItemResult]:
+        """Run every job and yield each result as soon as it finishes"""
+        if len(request.jobs) > self.max_jobs:
+            raise ValueError(f"Batch exceeds the limit of {self.max_jobs} jobs")
+        
+        concurrency = min(request.concurrency or self.max_concurrency, self.max_concurrency)
+        batch_slot = asyncio.Semaphore(max(concurrency, 1))
+        
+        async def run_job(index: int, job: BatchJob) -> BatchItemResult:
+            job_id = job.id or str(index)
+            try:
+                schema, handler = self.HANDLERS[job.type]
+                job_request = schema(**job.payload)
+                async with batch_slot, self._model_slot(_job_model(job.type, job_request)):
+                    response = await handler(job_request)
+                return BatchItemResult(
+                    id=job_id, index=index, type=job.type, status="ok", result=response.model_dump()
+                )
+            except Exception as e:
+                logger.error(f"Batch job {job_id} error: {e}")
+                return BatchItemResult(
+                    id=job_id, index=index, type=job.type, status="error", error=str(e)
+                )
+        
+        tasks = [asyncio.create_task(run_job(i, job)) for i, job in enumerate(request.jobs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: drop whatever has not finished
+            for task in tasks:
+                task.cancel()
+
+
+batch_runner = BatchRunner(
+    max_jobs=settings.GEMINI_BATCH_MAX_JOBS,
+    max_concurrency=settings.GEMINI_BATCH_MAX_CONCURRENCY,
+    model_limits=settings.GEMINI_BATCH_MODEL_CONCURRENCY,
+    default_model_limit=settings.GEMINI_BATCH_DEFAULT_MODEL_CONCURRENCY,
+)
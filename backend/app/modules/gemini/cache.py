@@ -0,0 +1,205 @@
+"""Content-addressed cache for deterministic Gemini responses"""
+from collections import OrderedDict
+from app.config.settings import settings
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """Hit/miss counters for one endpoint"""
+    
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + disk) cache keyed by a hash of model, config and input.
+    
+    Values are raw bytes. Each endpoint has its own TTL; endpoints without a
+    positive TTL are never cached. The memory tier is bounded by
+    ``memory_max_bytes``; the disk tier by ``disk_max_bytes``, evicting the
+    least recently written files first.
+    """
+    
+    def __init__(self, enabled: bool, directory: str, memory_max_bytes: int,
+                 disk_max_bytes: int, ttls: Dict[str, int]):
+        self.enabled = enabled
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.ttls = dict(ttls)
+        self._memory: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self._disk_lock = threading.Lock()
+        self._stats: Dict[str, CacheStats] = {}
+    
+    @staticmethod
+    def key(endpoint: str, model: str, config: Optional[Dict[str, Any]], *inputs: Any) -> str:
+        """Canonical hash of everything that determines a response"""
+        digest = hashlib.sha256()
+        header = json.dumps([endpoint, model, config or {}], sort_keys=True, default=str)
+        digest.update(header.encode("utf-8"))
+        for value in inputs:
+            data = value if isinstance(value, bytes) else str(value).encode("utf-8")
+            # Length prefix keeps ("ab", "c") distinct from ("a", "bc")
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+    
+    def enabled_for(self, endpoint: str) -> bool:
+        return self.enabled and self.ttls.get(endpoint, 0) > 0
+    
+    async def get_or_compute(self, endpoint: str, key: str, compute: Callable[[], Awaitable[bytes]],
+                             use_cache: bool = True) -> bytes:
+        """Return the cached value for ``key`` or compute and store it"""
+        if not use_cache or not self.enabled_for(endpoint):
+            return await compute()
+        
+        stats = self._stats.setdefault(endpoint, CacheStats())
+        value = self._memory_get(key)
+        if value is not None:
+            stats.memory_hits += 1
+            return value
+        
+        ttl = self.ttls[endpoint]
+        value = await asyncio.to_thread(self._disk_get, key, ttl)
+        if value is not None:
+            stats.disk_hits += 1
+            self._memory_put(key, value, ttl)
+            return value
+        
+        stats.misses += 1
+        value = await compute()
+        self._memory_put(key, value, ttl)
+        await asyncio.to_thread(self._disk_put, key, value)
+        return value
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "memory_bytes": self._memory_bytes,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+            "endpoints": {name: stats.to_dict() for name, stats in self._stats.items()},
+        }
+    
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            self._memory_remove(key)
+            return None
+        self._memory.move_to_end(key)
+        return value
+    
+    def _memory_put(self, key: str, value: bytes, ttl: int):
+        if len(value) > self.memory_max_bytes:
+            return
+        self._memory_remove(key)
+        self._memory[key] = (time.time() + ttl, value)
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.memory_max_bytes:
+            oldest = next(iter(self._memory))
+            self._memory_remove(oldest)
+    
+    def _memory_remove(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._memory_bytes -= len(entry[1])
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+    
+    def _disk_get(self, key: str, ttl: int) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + ttl < time.time():
+                self._disk_remove(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def _disk_put(self, key: str, value: bytes):
+        if len(value) > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Response cache write failed: {e}")
+            return
+        
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(value)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+    
+    def _disk_remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+    
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+    
+    def _scan_disk_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+    
+    def _evict_disk(self):
+        # Trim to 90% of the budget so every write past the limit doesn't rescan
+        target = int(self.disk_max_bytes * 0.9)
+        for path, _, size in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._disk_bytes -= size
+            except OSError:
+                continue
+
+
+response_cache = ResponseCache(
+    enabled=settings.GEMINI_CACHE_ENABLED,
+    directory=settings.GEMINI_CACHE_DIR,
+    memory_max_bytes=settings.GEMINI_CACHE_MEMORY_MAX_BYTES,
+    disk_max_bytes=settings.GEMINI_CACHE_DISK_MAX_BYTES,
+    ttls=settings.GEMINI_CACHE_TTLS,
+)
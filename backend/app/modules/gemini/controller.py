@@ -1,11 +1,22 @@
 """Gemini AI Controller (Route Handlers)"""
-from fastapi import APIRouter, HTTPException
-from app.modules.gemini.service import gemini_service
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse
+from app.modules.gemini.service import gemini_service, wav_header, TTS_SAMPLE_RATE
+from app.modules.gemini.batch import batch_runner
+from app.modules.gemini.jobs import job_queue
 from app.modules.gemini.schemas import (
     ChatRequest, ChatResponse, ImageRequest, ImageResponse,
     VideoRequest, VideoResponse, TranscribeRequest, TranscribeResponse,
-    TTSRequest, TTSResponse
+    TTSRequest, TTSResponse, ChatSessionCreateRequest, ChatSessionResponse, BatchRequest,
+    JobSubmitResponse, JobResponse
 )
+from app.config.settings import settings
+from app.shared.exceptions import NotFoundError, PayloadTooLargeError
+from typing import AsyncIterable, Optional
+import json
+
+# Bytes read per step when receiving audio
+READ_SIZE = 64 * 1024
 
 router = APIRouter()
 
@@ -15,17 +26,68 @@ async def chat(request: ChatRequest):
     """Chat endpoint"""
     try:
         return await gemini_service.chat(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streaming chat endpoint (Server-Sent Events)"""
+    async def events():
+        async for frame in gemini_service.chat_stream(request):
+            yield f"event: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/chat/sessions", response_model=ChatSessionResponse)
+async def create_chat_session(request: ChatSessionCreateRequest):
+    """Start a server-side chat session"""
+    return await gemini_service.create_session(request)
+
+
+@router.get("/chat/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_chat_session(session_id: str):
+    """Get a chat session and its history"""
+    return await gemini_service.get_session(session_id)
+
+
+@router.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """Delete a chat session"""
+    success = await gemini_service.delete_session(session_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"success": True}
+
+
 @router.post("/image", response_model=ImageResponse)
 async def generate_image(request: ImageRequest):
     """Generate image endpoint"""
     try:
         return await gemini_service.generate_image(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/image/png")
+async def generate_image_binary(request: ImageRequest):
+    """Generate image endpoint returning the first image as raw bytes"""
+    try:
+        mime_type, data = await gemini_service.generate_image_bytes(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=data, media_type=mime_type)
 
 
 @router.post("/video", response_model=VideoResponse)
@@ -33,6 +95,8 @@ async def generate_video(request: VideoRequest):
     """Generate video endpoint"""
     try:
         return await gemini_service.generate_video(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -42,15 +106,133 @@ async def transcribe(request: TranscribeRequest):
     """Transcribe audio endpoint"""
     try:
         return await gemini_service.transcribe_audio(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/transcribe/upload", response_model=TranscribeResponse)
+async def transcribe_upload(
+    file: UploadFile = File(...),
+    mime_type: Optional[str] = Form(None),
+    use_cache: bool = Form(True)
+):
+    """Transcribe audio endpoint (multipart upload)"""
+    try:
+        if file.size is not None:
+            _check_audio_size(file.size)
+        
+        async def chunks():
+            while chunk := await file.read(READ_SIZE):
+                yield chunk
+        
+        audio_data = await _read_audio(chunks())
+        return await gemini_service.transcribe_bytes(
+            audio_data, mime_type or file.content_type or "audio/mp3", use_cache
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/transcribe/raw", response_model=TranscribeResponse)
+async def transcribe_raw(request: Request, use_cache: bool = True):
+    """Transcribe audio endpoint (raw request body, MIME type from Content-Type)"""
+    try:
+        length = request.headers.get("content-length")
+        if length and length.isdigit():
+            # Refuse before receiving anything
+            _check_audio_size(int(length))
+        audio_data = await _read_audio(request.stream())
+        mime_type = request.headers.get("content-type", "audio/mp3")
+        return await gemini_service.transcribe_bytes(audio_data, mime_type, use_cache)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _check_audio_size(size: int):
+    if size > settings.GEMINI_MAX_AUDIO_BYTES:
+        raise PayloadTooLargeError(
+            f"Audio exceeds the limit of {settings.GEMINI_MAX_AUDIO_BYTES} bytes"
+        )
+
+
+async def _read_audio(chunks: AsyncIterable[bytes]) -> bytes:
+    """Collect audio chunk by chunk, stopping as soon as it passes the size limit"""
+    audio = bytearray()
+    async for chunk in chunks:
+        audio += chunk
+        _check_audio_size(len(audio))
+    return bytes(audio)
+
+
 @router.post("/tts", response_model=TTSResponse)
 async def text_to_speech(request: TTSRequest):
     """Text to speech endpoint"""
     try:
         return await gemini_service.text_to_speech(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tts/audio")
+async def text_to_speech_binary(request: TTSRequest, format: str = "wav"):
+    """Text to speech endpoint streaming WAV (default) or raw PCM bytes"""
+    if format not in ("wav", "pcm"):
+        raise HTTPException(status_code=400, detail="format must be 'wav' or 'pcm'")
+    try:
+        pcm = await gemini_service.synthesize_speech(request.text, request.use_cache)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    chunks = [wav_header(len(pcm)), pcm] if format == "wav" else [pcm]
+    return StreamingResponse(
+        iter(chunks),
+        media_type="audio/wav" if format == "wav" else f"audio/pcm;rate={TTS_SAMPLE_RATE}",
+        headers={"Content-Length": str(sum(len(chunk) for chunk in chunks))}
+    )
+
+
+@router.post("/batch")
+async def batch(request: BatchRequest):
+    """Run many jobs with bounded concurrency, streaming results as NDJSON"""
+    if len(request.jobs) > batch_runner.max_jobs:
+        raise HTTPException(
+            status_code=400, detail=f"Batch exceeds the limit of {batch_runner.max_jobs} jobs"
+        )
+    
+    async def lines():
+        async for item in batch_runner.run(request):
+            yield item.model_dump_json() + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs/image", response_model=JobSubmitResponse, status_code=202)
+async def submit_image_job(request: ImageRequest):
+    """Queue an image generation (use for HQ images); poll ``GET /jobs/{job_id}`` for the result"""
+    job = await job_queue.submit("image", request)
+    return JobSubmitResponse(job_id=job.id, kind=job.kind, status=job.status)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status and result of a queued job"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise NotFoundError("Job not found")
+    return job.to_response()
+
 
+@router.get("/metrics")
+async def metrics():
+    """Gemini execution metrics (queue depth, in-flight calls)"""
+    return {**gemini_service.metrics(), "jobs": job_queue.metrics()}
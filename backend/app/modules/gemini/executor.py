@@ -0,0 +1,167 @@
+"""Bounded execution layer for blocking Gemini SDK calls"""
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import settings
+from typing import Any, AsyncIterator, Callable, Dict
+import asyncio
+import functools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Sentinel marking the end of a streamed iterator
+_DONE = object()
+
+
+class EndpointStats:
+    """Counters for a single Gemini endpoint"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class GeminiExecutor:
+    """Runs synchronous SDK calls off the event loop.
+    
+    Calls go to a dedicated thread pool, so a slow model call never blocks
+    unrelated routes or the websocket. Each endpoint has its own concurrency
+    limit; callers above the limit wait on a semaphore and show up as queued.
+    """
+    
+    def __init__(self, max_workers: int, endpoint_limits: Dict[str, int]):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+        self._max_workers = max_workers
+        self._default_limit = max_workers
+        self._limits = dict(endpoint_limits)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, EndpointStats] = {}
+    
+    def _slot(self, endpoint: str) -> asyncio.Semaphore:
+        if endpoint not in self._semaphores:
+            limit = self._limits.get(endpoint, self._default_limit)
+            self._semaphores[endpoint] = asyncio.Semaphore(limit)
+            self._stats[endpoint] = EndpointStats(limit)
+        return self._semaphores[endpoint]
+    
+    async def run(self, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)`` in the pool under the endpoint's limit"""
+        semaphore = self._slot(endpoint)
+        stats = self._stats[endpoint]
+        
+        stats.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.queued -= 1
+        
+        stats.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+            stats.completed += 1
+            return result
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            semaphore.release()
+    
+    async def stream(self, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> AsyncIterator[Any]:
+        """Iterate the blocking iterator returned by ``func`` in the pool.
+        
+        Items are handed back to the event loop as soon as the worker thread
+        receives them. Closing the generator (for example when the client
+        disconnects) stops the worker at the next item and closes the upstream
+        iterator, so the rest of the generation is not read.
+        """
+        semaphore = self._slot(endpoint)
+        stats = self._stats[endpoint]
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        
+        def emit(item: Any, error: Exception = None):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+            except RuntimeError:
+                # Event loop already closed
+                cancelled.set()
+        
+        def produce():
+            iterator = None
+            try:
+                iterator = iter(func(*args, **kwargs))
+                for item in iterator:
+                    if cancelled.is_set():
+                        break
+                    emit(item)
+                emit(_DONE)
+            except Exception as e:
+                emit(_DONE, e)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+        
+        def release(_):
+            stats.in_flight -= 1
+            semaphore.release()
+        
+        stats.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.queued -= 1
+        
+        stats.in_flight += 1
+        # The slot is held until the worker thread actually returns
+        loop.run_in_executor(self._pool, produce).add_done_callback(release)
+        
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is _DONE:
+                    if error:
+                        raise error
+                    break
+                yield item
+            stats.completed += 1
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            cancelled.set()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and in-flight calls per endpoint"""
+        endpoints = {name: stats.to_dict() for name, stats in self._stats.items()}
+        return {
+            "max_workers": self._max_workers,
+            "queued": sum(s.queued for s in self._stats.values()),
+            "in_flight": sum(s.in_flight for s in self._stats.values()),
+            "endpoints": endpoints,
+        }
+    
+    def shutdown(self):
+        """Stop accepting work and release pool threads"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+gemini_executor = GeminiExecutor(
+    max_workers=settings.GEMINI_MAX_WORKERS,
+    endpoint_limits=settings.GEMINI_ENDPOINT_CONCURRENCY,
+)
@@ -0,0 +1,278 @@
+"""Background job queue for long-running Gemini generation"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.config.settings import settings
+from app.modules.gemini.schemas import ImageRequest, JobResponse, VideoRequest
+from app.shared.exceptions import ServiceUnavailableError, TooManyRequestsError
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import copy
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Awaitable[Dict[str, Any]]]
+Notifier = Callable[[Dict[str, Any], Optional[str]], Awaitable[None]]
+
+
+class Job:
+    """A submitted generation job"""
+    
+    def __init__(self, kind: str, request: Any, connection_id: str = None, job_id: str = None):
+        self.id = job_id or str(uuid.uuid4())
+        self.kind = kind
+        self.request = request
+        self.connection_id = connection_id
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.completed_at: Optional[datetime] = None
+    
+    def to_response(self) -> JobResponse:
+        return JobResponse(
+            job_id=self.id,
+            kind=self.kind,
+            status=self.status,
+            result=self.result,
+            error=self.error,
+            created_at=self.created_at.isoformat(),
+            completed_at=self.completed_at.isoformat() if self.completed_at else None,
+        )
+
+
+class SQLJobStore:
+    """Persists jobs to ``gemini_image_generations`` / ``gemini_video_generations``"""
+    
+    def save(self, job: Job):
+        try:
+            from app.config.database import SessionLocal
+            db = SessionLocal()
+        except Exception as e:
+            logger.error(f"Job persist error: {e}")
+            return
+        try:
+            db.merge(self._to_row(job))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Job persist error: {e}")
+        finally:
+            db.close()
+    
+    def load(self, job_id: str) -> Optional[Job]:
+        from app.config.database import SessionLocal
+        from app.modules.gemini.models import GeminiImageGenerationModel, GeminiVideoGenerationModel
+        
+        db = SessionLocal()
+        try:
+            tables = (("image", GeminiImageGenerationModel), ("video", GeminiVideoGenerationModel))
+            for kind, model in tables:
+                row = db.get(model, job_id)
+                if row is not None:
+                    return self._from_row(kind, row)
+            return None
+        finally:
+            db.close()
+    
+    def _to_row(self, job: Job):
+        from app.modules.gemini.models import GeminiImageGenerationModel, GeminiVideoGenerationModel
+        
+        common = dict(
+            id=job.id,
+            prompt=job.request.prompt,
+            aspect_ratio=job.request.aspect_ratio,
+            status=job.status,
+            error=job.error,
+            created_at=job.created_at,
+            completed_at=job.completed_at,
+        )
+        if job.kind == "image":
+            return GeminiImageGenerationModel(
+                **common,
+                is_hq=job.request.is_hq,
+                image_urls=(job.result or {}).get("images"),
+            )
+        return GeminiVideoGenerationModel(
+            **common,
+            image_base64=job.request.image_base64,
+            video_url=(job.result or {}).get("video_url"),
+        )
+    
+    def _from_row(self, kind: str, row) -> Job:
+        if kind == "image":
+            request = ImageRequest(prompt=row.prompt, aspect_ratio=row.aspect_ratio, is_hq=row.is_hq)
+            result = {"images": row.image_urls} if row.image_urls is not None else None
+        else:
+            request = VideoRequest(
+                prompt=row.prompt, aspect_ratio=row.aspect_ratio, image_base64=row.image_base64
+            )
+            result = {"video_url": row.video_url} if row.video_url else None
+        job = Job(kind, request, job_id=row.id)
+        job.status = row.status
+        job.result = result
+        job.error = row.error
+        job.created_at = row.created_at
+        job.completed_at = row.completed_at
+        return job
+
+
+class JobQueue:
+    """In-process queue with a fixed pool of worker tasks.
+    
+    ``handlers`` maps a job kind to the coroutine that runs it, and
+    ``notifier`` pushes status updates to the connection that submitted the
+    job; jobs submitted without one (REST) are only polled, never broadcast,
+    since updates carry the results. Both are injected, so the queue can run
+    against a fake Gemini backend and a recording notifier.
+    ``store`` (optional) persists every status change. Store calls run one at a
+    time on a single writer thread, in the order they were made, so a job's
+    "queued" row is always written before its "running" one.
+    """
+    
+    def __init__(self, handlers: Dict[str, Handler], notifier: Notifier, store: SQLJobStore = None,
+                 workers: int = 2, max_queued: int = 1000, max_retained: int = 1000):
+        self.handlers = handlers
+        self.notifier = notifier
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._writer: Optional[ThreadPoolExecutor] = None
+    
+    async def start(self):
+        """Start the worker tasks"""
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-persist")
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self):
+        """Cancel the workers; queued jobs stay 'queued' in the store"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Flush queued writes
+        self._writer.shutdown(wait=True)
+    
+    async def join(self):
+        """Wait until every queued job has finished"""
+        await self._queue.join()
+    
+    async def submit(self, kind: str, request: Any, connection_id: str = None) -> Job:
+        """Queue a job and return immediately"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        
+        if self._queue.full():
+            raise TooManyRequestsError("Job queue is full", retry_after=30)
+        
+        job = Job(kind, request, connection_id)
+        # Queued with the writer before any worker can see the job
+        saved = self._persist(job)
+        self._queue.put_nowait(job)
+        self._retain(job)
+        await saved
+        return job
+    
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job, falling back to the store for older ones"""
+        job = self._jobs.get(job_id)
+        if job is None and self.store:
+            loop = asyncio.get_running_loop()
+            try:
+                job = await loop.run_in_executor(self._writer, self.store.load, job_id)
+            except Exception as e:
+                logger.error(f"Job load error: {e}")
+                raise ServiceUnavailableError("Job store is unavailable", retry_after=5)
+        return job
+    
+    def metrics(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "statuses": statuses,
+        }
+    
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+    
+    async def _run(self, job: Job):
+        job.status = "running"
+        await self._persist(job)
+        await self._notify(job)
+        
+        try:
+            job.result = await self.handlers[job.kind](job.request)
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+        job.completed_at = datetime.now(timezone.utc)
+        
+        await self._persist(job)
+        await self._notify(job)
+    
+    def _persist(self, job: Job) -> "asyncio.Future[None]":
+        """Queue a write of the job's current state; await the result to wait for it"""
+        loop = asyncio.get_running_loop()
+        if not self.store:
+            future = loop.create_future()
+            future.set_result(None)
+            return future
+        # A snapshot, so the row shows the state at this point rather than when written
+        return loop.run_in_executor(self._writer, self.store.save, copy.copy(job))
+    
+    async def _notify(self, job: Job):
+        if job.connection_id is None:
+            return
+        payload = {"type": "gemini_job_update", "data": job.to_response().model_dump()}
+        try:
+            await self.notifier(payload, job.connection_id)
+        except Exception as e:
+            logger.warning(f"Job {job.id} notification failed: {e}")
+    
+    def _retain(self, job: Job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_retained:
+            self._jobs.popitem(last=False)
+
+
+async def _image_job(request: ImageRequest) -> Dict[str, Any]:
+    from app.modules.gemini.service import gemini_service
+    
+    return (await gemini_service.generate_image(request)).model_dump()
+
+
+async def _push(payload: Dict[str, Any], connection_id: Optional[str]):
+    from app.modules.notifications.service import notification_service
+    
+    await notification_service.send_event(payload, connection_id)
+
+
+job_queue = JobQueue(
+    # No "video" handler until GeminiService.generate_video exists
+    handlers={"image": _image_job},
+    notifier=_push,
+    store=SQLJobStore() if settings.GEMINI_JOBS_PERSIST and settings.database_configured else None,
+    workers=settings.GEMINI_JOBS_WORKERS,
+    max_queued=settings.GEMINI_JOBS_MAX_QUEUED,
+)
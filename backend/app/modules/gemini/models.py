@@ -1,3 +1,63 @@
-"""Gemini module models (database models if needed)"""
-# Placeholder for future database models related to Gemini
+"""Gemini module models (database models)"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+from app.config.database import Base
 
+
+class ChatSessionModel(Base):
+    """Row in ``chat_sessions``"""
+    __tablename__ = "chat_sessions"
+    
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    title = Column(String(500))
+    model = Column(String(100), default="gemini-3-pro-preview")
+    user_id = Column(UUID(as_uuid=False))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ChatMessageModel(Base):
+    """Row in ``chat_messages``"""
+    __tablename__ = "chat_messages"
+    
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    session_id = Column(UUID(as_uuid=False), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False)
+    role = Column(String(50), nullable=False)
+    text = Column(Text, nullable=False)
+    grounding_metadata = Column(JSONB)
+    use_thinking = Column(Boolean, default=False)
+    use_grounding = Column(Boolean, default=False)
+    sequence_number = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class GeminiImageGenerationModel(Base):
+    """Row in ``gemini_image_generations``; also tracks background job status"""
+    __tablename__ = "gemini_image_generations"
+    
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    prompt = Column(Text, nullable=False)
+    aspect_ratio = Column(String(20), default="1:1")
+    is_hq = Column(Boolean, default=False)
+    image_urls = Column(ARRAY(Text))
+    user_id = Column(UUID(as_uuid=False))
+    status = Column(String(20), nullable=False, default="queued")
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))
+
+
+class GeminiVideoGenerationModel(Base):
+    """Row in ``gemini_video_generations``; also tracks background job status"""
+    __tablename__ = "gemini_video_generations"
+    
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    prompt = Column(Text, nullable=False)
+    aspect_ratio = Column(String(20), default="16:9")
+    image_base64 = Column(Text)
+    video_url = Column(Text)
+    user_id = Column(UUID(as_uuid=False))
+    status = Column(String(20), nullable=False, default="queued")
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))
@@ -0,0 +1,150 @@
+"""Retrieval-augmented chat: grounding context from the vector store"""
+from app.config.settings import settings
+from app.modules.gemini.schemas import RagChunk, RagMetadata, RagOptions
+from app.modules.gemini.sessions import ChatSession
+from app.modules.vector.schemas import VectorSearchRequest
+from app.modules.vector.service import vector_service
+from app.shared.singleflight import SingleFlight
+from typing import Any, Dict, List, Optional, Tuple
+import time
+
+PROMPT_TEMPLATE = (
+    "Use the numbered context from the user's documents below when it is relevant, "
+    "and cite it as [n]. If it does not cover the question, say so.\n\n"
+    "{context}\n\n"
+    "Question: {message}"
+)
+
+# Metadata keys tried, in order, to label a chunk's source
+SOURCE_KEYS = ("source", "filename", "file_name", "path", "title")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for the context budget"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def _source(hit: Dict[str, Any]) -> Optional[str]:
+    metadata = hit.get("metadata") or {}
+    for key in SOURCE_KEYS:
+        if metadata.get(key):
+            return str(metadata[key])
+    return None
+
+
+class Retriever:
+    """Fetches, dedupes and budgets vector store context for a chat turn.
+    
+    Only the context for the current turn is sent upstream; the session
+    history keeps the user's bare message, so earlier context is never
+    resent. Retrievals are cached per session (``cache_size`` entries,
+    ``cache_ttl`` seconds), so regenerating or repeating a question does not
+    search again.
+    """
+    
+    def __init__(self, top_k: int, max_context_tokens: int, cache_size: int, cache_ttl: int):
+        self.top_k = top_k
+        self.max_context_tokens = max_context_tokens
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.retrievals = 0
+        self.cache_hits = 0
+    
+    async def augment(self, message: str, options: RagOptions,
+                      session: Optional[ChatSession] = None) -> Tuple[str, RagMetadata]:
+        """The prompt to send upstream for ``message``, and what went into it"""
+        top_k = options.top_k or self.top_k
+        budget = options.max_context_tokens or self.max_context_tokens
+        started = time.perf_counter()
+        
+        hits, cached = await self._retrieve(message, options, top_k, session)
+        chunks, texts, dropped = self._select(hits, top_k, budget)
+        
+        metadata = RagMetadata(
+            retrieval_ms=round((time.perf_counter() - started) * 1000, 3),
+            cached=cached,
+            chunks=chunks,
+            context_tokens=sum(chunk.tokens for chunk in chunks),
+            dropped=dropped,
+        )
+        if not chunks:
+            return message, metadata
+        
+        context = "\n\n".join(
+            f"[{number}] {chunk.source or chunk.id}\n{text}"
+            for number, (chunk, text) in enumerate(zip(chunks, texts), start=1)
+        )
+        return PROMPT_TEMPLATE.format(context=context, message=message), metadata
+    
+    async def _retrieve(self, message: str, options: RagOptions, top_k: int,
+                        session: Optional[ChatSession]) -> Tuple[List[Dict[str, Any]], bool]:
+        self.retrievals += 1
+        key = SingleFlight.key(" ".join(message.split()), options.model_dump(), top_k)
+        cache = session.retrievals if session else None
+        if cache is not None and key in cache:
+            stored_at, hits = cache[key]
+            if time.monotonic() - stored_at < self.cache_ttl:
+                cache.move_to_end(key)
+                self.cache_hits += 1
+                return hits, True
+            del cache[key]
+        
+        # Fetch extra candidates so duplicates don't leave the context short
+        response = await vector_service.search(VectorSearchRequest(
+            query=message,
+            collection=options.collection,
+            user_id=options.user_id,
+            n_results=top_k * 2,
+            where=options.where,
+            include=["documents", "metadatas"],
+            mode=options.mode,
+        ))
+        hits = response.results
+        if cache is not None:
+            cache[key] = (time.monotonic(), hits)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return hits, False
+    
+    def _select(self, hits: List[Dict[str, Any]], top_k: int,
+                budget: int) -> Tuple[List[RagChunk], List[str], int]:
+        """Best-ranked unique chunks that fit in ``budget`` tokens"""
+        chunks: List[RagChunk] = []
+        texts: List[str] = []
+        seen = set()
+        used = 0
+        dropped = 0
+        for hit in hits:
+            if len(chunks) >= top_k:
+                break
+            text = (hit.get("document") or "").strip()
+            normalized = " ".join(text.lower().split())
+            if not text or hit["id"] in seen or normalized in seen:
+                dropped += 1
+                continue
+            seen.update((hit["id"], normalized))
+            
+            tokens = estimate_tokens(text)
+            if used + tokens > budget:
+                # A smaller chunk further down may still fit
+                dropped += 1
+                continue
+            used += tokens
+            chunks.append(RagChunk(id=hit["id"], source=_source(hit), tokens=tokens,
+                                   score=hit.get("score")))
+            texts.append(text)
+        return chunks, texts, dropped
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "retrievals": self.retrievals,
+            "cache_hits": self.cache_hits,
+        }
+
+
+rag_retriever = Retriever(
+    top_k=settings.GEMINI_RAG_TOP_K,
+    max_context_tokens=settings.GEMINI_RAG_MAX_CONTEXT_TOKENS,
+    cache_size=settings.GEMINI_RAG_CACHE_SIZE,
+    cache_ttl=settings.GEMINI_RAG_CACHE_TTL,
+)
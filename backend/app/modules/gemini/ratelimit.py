@@ -0,0 +1,228 @@
+"""Client-side rate limiting, retries and circuit breaking for Gemini calls"""
+from google.api_core import exceptions as google_exceptions
+from app.config.settings import settings
+from app.shared.exceptions import ServiceUnavailableError, TooManyRequestsError
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Quota errors; once retries run out these become 429s
+QUOTA_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+)
+
+# Upstream errors worth retrying: quota, overload and transient server failures; the
+# non-quota ones become 503s once retries run out
+RETRYABLE_ERRORS = QUOTA_ERRORS + (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.throttled = 0
+        self.rejected = 0
+    
+    def reserve(self, max_wait: float) -> float:
+        """Take a token, returning how long to wait for it.
+        
+        Raises ``TooManyRequestsError`` instead of reserving when the wait would
+        exceed ``max_wait``. Tokens may go negative; that is how queued callers
+        hold their place in line.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            self.rejected += 1
+            raise TooManyRequestsError("Gemini rate limit exceeded", retry_after=wait)
+        if wait > 0:
+            self.throttled += 1
+        self.tokens -= 1
+        return wait
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive upstream failures.
+    
+    While open every call fails fast. After ``reset_timeout`` seconds one
+    trial call is let through (half-open); its outcome closes or re-opens
+    the breaker.
+    """
+    
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.trips = 0
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def check(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_in_flight):
+            retry_after = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise ServiceUnavailableError("Gemini upstream is failing; try again later", retry_after)
+        if state == "half_open":
+            self.trial_in_flight = True
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+    
+    def record_failure(self):
+        self.failures += 1
+        half_open = self.trial_in_flight
+        self.trial_in_flight = False
+        if half_open or self.failures >= self.threshold:
+            if self.opened_at is None or half_open:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+class QuotaGuard:
+    """Per-model token buckets, jittered exponential retries and circuit breakers"""
+    
+    def __init__(self, rate_limits: Dict[str, float], default_rpm: float, burst: int,
+                 max_wait: float, max_attempts: int, base_delay: float, max_delay: float,
+                 breaker_threshold: int, breaker_reset: float):
+        self._rate_limits = dict(rate_limits)
+        self._default_rpm = default_rpm
+        self._burst = burst
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._breaker_threshold = breaker_threshold
+        self._breaker_reset = breaker_reset
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.retries = 0
+    
+    def _bucket(self, model: str) -> TokenBucket:
+        if model not in self._buckets:
+            rpm = self._rate_limits.get(model, self._default_rpm)
+            self._buckets[model] = TokenBucket(rpm / 60.0, self._burst)
+        return self._buckets[model]
+    
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(self._breaker_threshold, self._breaker_reset)
+        return self._breakers[model]
+    
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    async def admit(self, model: str):
+        """Wait for a token for ``model``, or fail fast if the breaker is open or the wait is too long"""
+        self.breaker(model).check()
+        try:
+            wait = self._bucket(model).reserve(self.max_wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException as e:
+            # Never admitted (rate limited or cancelled): free a half-open trial slot
+            self.record(model, e)
+            raise
+    
+    def record(self, model: str, error: Optional[BaseException] = None):
+        """Feed the outcome of an admitted call into the model's breaker"""
+        breaker = self.breaker(model)
+        if error is None:
+            breaker.record_success()
+        elif isinstance(error, RETRYABLE_ERRORS):
+            breaker.record_failure()
+        else:
+            # Bad requests say nothing about upstream health
+            breaker.trial_in_flight = False
+    
+    async def call(self, model: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run ``func`` under the model's limiter, retrying quota and transient errors"""
+        for attempt in range(self.max_attempts):
+            await self.admit(model)
+            try:
+                result = await func()
+            except Exception as e:
+                self.record(model, e)
+                if not isinstance(e, RETRYABLE_ERRORS):
+                    raise
+                delay = self.backoff(attempt)
+                if attempt + 1 >= self.max_attempts or delay > self.max_wait:
+                    logger.warning(f"Gemini {model} gave up after {attempt + 1} attempts: {e}")
+                    if isinstance(e, QUOTA_ERRORS):
+                        raise TooManyRequestsError(
+                            f"Gemini quota exhausted: {e}", retry_after=delay
+                        ) from e
+                    raise ServiceUnavailableError(
+                        f"Gemini upstream error: {e}", retry_after=delay
+                    ) from e
+                self.retries += 1
+                await asyncio.sleep(delay)
+            except BaseException as e:
+                # Cancelled: release a half-open trial slot without judging upstream
+                self.record(model, e)
+                raise
+            else:
+                self.record(model)
+                return result
+    
+    def metrics(self) -> Dict[str, Any]:
+        models = {}
+        for model in set(self._buckets) | set(self._breakers):
+            models[model] = {
+                "limiter": self._bucket(model).to_dict(),
+                "breaker": self.breaker(model).to_dict(),
+            }
+        return {"retries": self.retries, "models": models}
+
+
+quota_guard = QuotaGuard(
+    rate_limits=settings.GEMINI_RATE_LIMITS,
+    default_rpm=settings.GEMINI_DEFAULT_RPM,
+    burst=settings.GEMINI_RATE_BURST,
+    max_wait=settings.GEMINI_RATE_MAX_WAIT,
+    max_attempts=settings.GEMINI_RETRY_ATTEMPTS,
+    base_delay=settings.GEMINI_RETRY_BASE_DELAY,
+    max_delay=settings.GEMINI_RETRY_MAX_DELAY,
+    breaker_threshold=settings.GEMINI_BREAKER_THRESHOLD,
+    breaker_reset=settings.GEMINI_BREAKER_RESET_SECONDS,
+)
@@ -0,0 +1,86 @@
+"""Registry of reusable Gemini model handles"""
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+from app.config.settings import settings
+from typing import Any, Dict, Iterable, Optional
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(model_name: str, generation_config: Optional[Dict[str, Any]]) -> tuple:
+    if not generation_config:
+        return (model_name,)
+    try:
+        key = (model_name, tuple(sorted(generation_config.items())))
+        hash(key)
+        return key
+    except TypeError:
+        # Nested config values (e.g. speech_config) are not hashable
+        return (model_name, json.dumps(generation_config, sort_keys=True))
+
+
+class ModelRegistry:
+    """Caches ``GenerativeModel`` handles keyed by model name and generation config.
+    
+    The SDK is configured once, on first use, and every handle shares the same
+    default generative client. With the gRPC transport that client holds one
+    long-lived HTTP/2 channel, so requests after the first reuse the open
+    connection instead of paying for a new TLS handshake.
+    """
+    
+    def __init__(self, api_key: str, transport: str):
+        self._api_key = api_key
+        self._transport = transport
+        self._models: Dict[tuple, genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+        self._configured = False
+    
+    def configure(self):
+        """Configure the SDK and create the shared client (idempotent)"""
+        if self._configured:
+            return
+        with self._lock:
+            if self._configured:
+                return
+            genai.configure(api_key=self._api_key, transport=self._transport)
+            genai_client.get_default_generative_client()
+            self._configured = True
+    
+    def get(self, model_name: str, generation_config: Optional[Dict[str, Any]] = None) -> genai.GenerativeModel:
+        """Get (or build) the handle for a model and generation config"""
+        key = _cache_key(model_name, generation_config)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        
+        self.configure()
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                self._models[key] = model
+        return model
+    
+    def warm(self, model_names: Iterable[str], probe_model: Optional[str] = None):
+        """Build handles up front and optionally open the upstream connection.
+        
+        ``probe_model`` is sent a ``count_tokens`` request, which is free and
+        forces the channel (DNS, TLS, HTTP/2 setup) to be established before
+        the first user request arrives.
+        """
+        for name in model_names:
+            self.get(name)
+        if probe_model:
+            try:
+                self.get(probe_model).count_tokens("warmup")
+            except Exception as e:
+                logger.warning(f"Gemini warm-up probe failed: {e}")
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {"transport": self._transport, "models": len(self._models)}
+
+
+model_registry = ModelRegistry(api_key=settings.GEMINI_API_KEY, transport=settings.GEMINI_TRANSPORT)
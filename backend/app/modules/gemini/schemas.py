@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from app.modules.vector.schemas import SearchMode
+from typing import List, Optional, Any, Dict, Literal
 
 
 class ChatMessage(BaseModel):
@@ -7,23 +8,74 @@ class ChatMessage(BaseModel):
     text: str
 
 
+class RagOptions(BaseModel):
+    """Ground the reply in documents retrieved from the vector store"""
+    collection: Optional[str] = None
+    user_id: Optional[str] = None
+    mode: SearchMode = "hybrid"
+    where: Optional[Dict[str, Any]] = None
+    # Server defaults when unset
+    top_k: Optional[int] = None
+    max_context_tokens: Optional[int] = None
+
+
 class ChatRequest(BaseModel):
-    history: List[ChatMessage]
+    history: List[ChatMessage] = []
     message: str
+    session_id: Optional[str] = None
     model: Optional[str] = "gemini-3-pro-preview"
     use_thinking: Optional[bool] = False
     use_grounding: Optional[bool] = False
+    rag: Optional[RagOptions] = None
+
+
+class RagChunk(BaseModel):
+    id: str
+    source: Optional[str] = None
+    tokens: int
+    score: Optional[float] = None
+
+
+class RagMetadata(BaseModel):
+    retrieval_ms: float
+    cached: bool
+    chunks: List[RagChunk]
+    context_tokens: int
+    # Retrieved but left out as duplicates or over the token budget
+    dropped: int = 0
+
+
+class TokenUsage(BaseModel):
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    total_tokens: int = 0
 
 
 class ChatResponse(BaseModel):
     text: str
     grounding_metadata: Optional[Any] = None
+    session_id: Optional[str] = None
+    rag: Optional[RagMetadata] = None
+    usage: Optional[TokenUsage] = None
+
+
+class ChatSessionCreateRequest(BaseModel):
+    title: Optional[str] = None
+    model: Optional[str] = "gemini-3-pro-preview"
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    title: Optional[str] = None
+    model: str
+    messages: List[ChatMessage] = []
 
 
 class ImageRequest(BaseModel):
     prompt: str
     aspect_ratio: Optional[str] = "1:1"
     is_hq: Optional[bool] = False
+    use_cache: Optional[bool] = True
 
 
 class ImageResponse(BaseModel):
@@ -43,6 +95,7 @@ class VideoResponse(BaseModel):
 class TranscribeRequest(BaseModel):
     audio_base64: str
     mime_type: Optional[str] = "audio/mp3"
+    use_cache: Optional[bool] = True
 
 
 class TranscribeResponse(BaseModel):
@@ -51,8 +104,45 @@ class TranscribeResponse(BaseModel):
 
 class TTSRequest(BaseModel):
     text: str
+    use_cache: Optional[bool] = True
 
 
 class TTSResponse(BaseModel):
     audio_base64: str
 
+
+
+class BatchJob(BaseModel):
+    id: Optional[str] = None
+    type: Literal["chat", "image", "transcribe", "tts"]
+    payload: Dict[str, Any]
+
+
+class BatchRequest(BaseModel):
+    jobs: List[BatchJob]
+    concurrency: Optional[int] = None
+
+
+class BatchItemResult(BaseModel):
+    id: str
+    index: int
+    type: str
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    completed_at: Optional[str] = None
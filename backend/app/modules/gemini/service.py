@@ -1,19 +1,85 @@
 """Gemini AI Service"""
-import google.generativeai as genai
-from app.config.settings import settings
+from app.modules.gemini.cache import response_cache
+from app.modules.gemini.executor import gemini_executor
+from app.modules.gemini.rag import rag_retriever
+from app.modules.gemini.ratelimit import quota_guard
+from app.modules.gemini.registry import model_registry
+from app.modules.gemini.sessions import ChatSession, chat_sessions
 from app.modules.gemini.schemas import (
     ChatRequest, ChatResponse, ImageRequest, ImageResponse,
     VideoRequest, VideoResponse, TranscribeRequest, TranscribeResponse,
-    TTSRequest, TTSResponse
+    TTSRequest, TTSResponse, ChatMessage, ChatSessionCreateRequest, ChatSessionResponse,
+    RagMetadata, TokenUsage
 )
-from typing import List
+from app.shared.exceptions import NotFoundError
+from app.shared.singleflight import SingleFlight
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import base64
+import json
 import logging
+import struct
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-genai.configure(api_key=settings.GEMINI_API_KEY)
+# Gemini TTS returns 16-bit little-endian mono PCM at 24 kHz
+TTS_SAMPLE_RATE = 24000
+TTS_SAMPLE_WIDTH = 2
+TTS_CHANNELS = 1
+
+
+def wav_header(pcm_length: int) -> bytes:
+    """RIFF/WAVE header for ``pcm_length`` bytes of TTS output"""
+    byte_rate = TTS_SAMPLE_RATE * TTS_CHANNELS * TTS_SAMPLE_WIDTH
+    block_align = TTS_CHANNELS * TTS_SAMPLE_WIDTH
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + pcm_length, b"WAVE",
+        b"fmt ", 16, 1, TTS_CHANNELS, TTS_SAMPLE_RATE, byte_rate, block_align, TTS_SAMPLE_WIDTH * 8,
+        b"data", pcm_length,
+    )
+
+
+def _chunk_text(response) -> str:
+    """Text of a (partial) response, empty if it carries no text parts"""
+    try:
+        return response.text
+    except ValueError:
+        return ""
+
+
+def _stream_message(chat, message: str):
+    """Send a message with streaming, cancelling the upstream call if abandoned"""
+    response = chat.send_message(message, stream=True)
+    try:
+        yield from response
+    finally:
+        # No-op once the stream is exhausted; aborts the gRPC call otherwise
+        cancel = getattr(getattr(response, "_iterator", None), "cancel", None)
+        if cancel:
+            cancel()
+
+
+def _grounding_metadata(response) -> Optional[Dict[str, Any]]:
+    """Grounding metadata of the first candidate as plain JSON"""
+    candidates = getattr(response, "candidates", None) or []
+    metadata = getattr(candidates[0], "grounding_metadata", None) if candidates else None
+    if not metadata:
+        return None
+    return type(metadata).to_dict(metadata)
+
+
+def _usage(response) -> Optional[TokenUsage]:
+    """Upstream token counts reported with a response"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    return TokenUsage(
+        prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+        response_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        total_tokens=getattr(usage, "total_token_count", 0) or 0,
+    )
 
 
 class GeminiService:
@@ -28,52 +94,164 @@ class GeminiService:
         "VIDEO_VEO_FAST": "veo-3.1-fast-generate-preview",
         "VIDEO_VEO_HQ": "veo-3.1-generate-preview",
         "AUDIO_TTS": "gemini-2.5-flash-preview-tts",
+        "AUDIO_TRANSCRIBE": "gemini-2.5-flash",
     }
     
+    def __init__(self):
+        # Identical image/transcribe/TTS requests in flight share one upstream call
+        self._flights = SingleFlight("gemini")
+    
     async def chat(self, request: ChatRequest) -> ChatResponse:
         """Generate chat response"""
         try:
-            model = genai.GenerativeModel(request.model)
-            
-            # Build chat history
-            chat = model.start_chat(history=[
-                {"role": msg.role, "parts": [msg.text]} 
-                for msg in request.history
-            ])
-            
-            # Generate response
-            response = chat.send_message(request.message)
-            
-            return ChatResponse(
-                text=response.text,
-                grounding_metadata=getattr(response, 'grounding_metadata', None)
-            )
+            session = await self._get_session(request)
+            async with self._turn(session):
+                prompt, rag = await self._augment(request, session)
+                chat = self._start_chat(request, session)
+                
+                # Generate response
+                response = await self._call(
+                    "chat", self._model(request, session), chat.send_message, prompt
+                )
+                
+                if session:
+                    await self._record_turn(session, request.message, response.text)
+                
+                return ChatResponse(
+                    text=response.text,
+                    grounding_metadata=getattr(response, 'grounding_metadata', None),
+                    session_id=session.id if session else None,
+                    rag=rag,
+                    usage=_usage(response)
+                )
         except Exception as e:
             logger.error(f"Chat error: {e}")
             raise
     
+    async def chat_stream(self, request: ChatRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a chat response.
+        
+        Yields ``chunk`` frames with partial text as they arrive, then a single
+        ``done`` frame with grounding metadata, retrieval metadata (RAG mode)
+        and token usage, or an ``error`` frame.
+        """
+        try:
+            session = await self._get_session(request)
+            async with self._turn(session):
+                prompt, rag = await self._augment(request, session)
+                chat = self._start_chat(request, session)
+                
+                last_chunk = None
+                parts: List[str] = []
+                # Partial output can't be replayed, so streams are limited but never retried
+                model = self._model(request, session)
+                admitted = False
+                error = None
+                try:
+                    await quota_guard.admit(model)
+                    admitted = True
+                    async for chunk in gemini_executor.stream("chat", _stream_message, chat, prompt):
+                        last_chunk = chunk
+                        text = _chunk_text(chunk)
+                        if text:
+                            parts.append(text)
+                            yield {"type": "chunk", "text": text}
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    # admit() settles the breaker itself when it refuses
+                    if admitted:
+                        quota_guard.record(model, error)
+                
+                if session:
+                    await self._record_turn(session, request.message, "".join(parts))
+                
+                usage = _usage(last_chunk)
+                yield {
+                    "type": "done",
+                    "grounding_metadata": _grounding_metadata(last_chunk),
+                    "session_id": session.id if session else None,
+                    "rag": rag.model_dump() if rag else None,
+                    "usage": usage.model_dump() if usage else None,
+                }
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield {"type": "error", "detail": str(e), "status_code": getattr(e, "status_code", 500)}
+    
+    async def create_session(self, request: ChatSessionCreateRequest) -> ChatSessionResponse:
+        """Start a server-side chat session"""
+        session = await chat_sessions.create(request.model, request.title)
+        return self._session_response(session)
+    
+    async def get_session(self, session_id: str) -> ChatSessionResponse:
+        """Get a chat session with its full history"""
+        session = await chat_sessions.get(session_id)
+        if session is None:
+            raise NotFoundError(f"Chat session {session_id} not found")
+        return self._session_response(session)
+    
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a chat session"""
+        return await chat_sessions.delete(session_id)
+    
+    async def _get_session(self, request: ChatRequest) -> Optional[ChatSession]:
+        if not request.session_id:
+            return None
+        session = await chat_sessions.get(request.session_id)
+        if session is None:
+            raise NotFoundError(f"Chat session {request.session_id} not found")
+        return session
+    
+    async def _augment(self, request: ChatRequest,
+                       session: Optional[ChatSession]) -> Tuple[str, Optional[RagMetadata]]:
+        """Message to send upstream, with retrieved document context in RAG mode"""
+        if request.rag is None:
+            return request.message, None
+        return await rag_retriever.augment(request.message, request.rag, session)
+    
+    def _turn(self, session: Optional[ChatSession]):
+        # Turns within one session run one at a time so history stays ordered
+        return session.lock if session else nullcontext()
+    
+    def _model(self, request: ChatRequest, session: Optional[ChatSession]) -> str:
+        # A session keeps the model it was created with
+        return session.model if session else request.model
+    
+    def _start_chat(self, request: ChatRequest, session: Optional[ChatSession]):
+        model = model_registry.get(self._model(request, session))
+        
+        # Sessions send a bounded window; stateless calls send the client's history
+        history = chat_sessions.window(session) if session else request.history
+        return model.start_chat(history=[
+            {"role": msg.role, "parts": [msg.text]} 
+            for msg in history
+        ])
+    
+    async def _record_turn(self, session: ChatSession, message: str, reply: str):
+        await chat_sessions.append(session, [
+            ChatMessage(role="user", text=message),
+            ChatMessage(role="model", text=reply),
+        ])
+    
+    def _session_response(self, session: ChatSession) -> ChatSessionResponse:
+        return ChatSessionResponse(
+            session_id=session.id,
+            title=session.title,
+            model=session.model,
+            messages=session.messages
+        )
+    
     async def generate_image(self, request: ImageRequest) -> ImageResponse:
         """Generate image"""
         try:
-            model_name = self.MODELS["IMAGE_GEN_HQ"] if request.is_hq else self.MODELS["IMAGE_GEN_FAST"]
-            model = genai.GenerativeModel(model_name)
-            
-            response = model.generate_content(
-                request.prompt,
-                generation_config={
-                    "response_mime_type": "image/png",
-                }
+            images = await self._generate_images(
+                request.prompt, request.aspect_ratio, request.is_hq, request.use_cache
             )
-            
-            images = []
-            if hasattr(response, 'parts'):
-                for part in response.parts:
-                    if hasattr(part, 'inline_data'):
-                        images.append(
-                            f"data:{part.inline_data.mime_type};base64,{part.inline_data.data}"
-                        )
-            
-            return ImageResponse(images=images)
+            return ImageResponse(images=[
+                f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+                for mime_type, data in images
+            ])
         except Exception as e:
             logger.error(f"Image generation error: {e}")
             raise
@@ -86,16 +264,9 @@ class GeminiService:
     async def transcribe_audio(self, request: TranscribeRequest) -> TranscribeResponse:
         """Transcribe audio to text"""
         try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
-            
             audio_data = base64.b64decode(request.audio_base64)
-            
-            response = model.generate_content([
-                {"mime_type": request.mime_type, "data": audio_data},
-                "Transcribe this audio exactly."
-            ])
-            
-            return TranscribeResponse(text=response.text)
+            text = await self._transcribe(audio_data, request.mime_type, request.use_cache)
+            return TranscribeResponse(text=text)
         except Exception as e:
             logger.error(f"Transcription error: {e}")
             raise
@@ -103,25 +274,135 @@ class GeminiService:
     async def text_to_speech(self, request: TTSRequest) -> TTSResponse:
         """Convert text to speech"""
         try:
-            model = genai.GenerativeModel(self.MODELS["AUDIO_TTS"])
-            
-            response = model.generate_content(
-                request.text,
-                generation_config={
-                    "response_mime_type": "audio/pcm",
-                }
+            audio_data = await self._synthesize_speech(request.text, request.use_cache)
+            return TTSResponse(audio_base64=base64.b64encode(audio_data).decode("ascii"))
+        except Exception as e:
+            logger.error(f"TTS error: {e}")
+            raise
+    
+    async def generate_image_bytes(self, request: ImageRequest) -> Tuple[str, bytes]:
+        """Generate image and return the first one as (mime_type, raw bytes)"""
+        try:
+            images = await self._generate_images(
+                request.prompt, request.aspect_ratio, request.is_hq, request.use_cache
             )
+            if not images:
+                raise ValueError("No image generated")
+            return images[0]
+        except Exception as e:
+            logger.error(f"Image generation error: {e}")
+            raise
+    
+    async def transcribe_bytes(self, audio_data: bytes, mime_type: str,
+                               use_cache: bool = True) -> TranscribeResponse:
+        """Transcribe raw audio bytes"""
+        try:
+            text = await self._transcribe(audio_data, mime_type, use_cache)
+            return TranscribeResponse(text=text)
+        except Exception as e:
+            logger.error(f"Transcription error: {e}")
+            raise
+    
+    async def synthesize_speech(self, text: str, use_cache: bool = True) -> bytes:
+        """Convert text to speech as raw PCM bytes"""
+        try:
+            return await self._synthesize_speech(text, use_cache)
+        except Exception as e:
+            logger.error(f"TTS error: {e}")
+            raise
+    
+    async def _generate_images(self, prompt: str, aspect_ratio: str, is_hq: bool,
+                               use_cache: bool = True) -> List[Tuple[str, bytes]]:
+        """Generate images as (mime_type, raw bytes) pairs"""
+        model_name = self.MODELS["IMAGE_GEN_HQ"] if is_hq else self.MODELS["IMAGE_GEN_FAST"]
+        config = {"response_mime_type": "image/png"}
+        
+        async def compute() -> bytes:
+            model = model_registry.get(model_name, config)
+            response = await self._call("image", model_name, model.generate_content, prompt)
+            
+            images = []
+            if hasattr(response, 'parts'):
+                for part in response.parts:
+                    if hasattr(part, 'inline_data'):
+                        images.append({
+                            "mime_type": part.inline_data.mime_type,
+                            "data": base64.b64encode(part.inline_data.data).decode("ascii"),
+                        })
+            return json.dumps(images).encode("utf-8")
+        
+        key = response_cache.key("image", model_name, config, prompt, aspect_ratio)
+        cached = await self._shared("image", key, compute, use_cache)
+        return [(image["mime_type"], base64.b64decode(image["data"])) for image in json.loads(cached)]
+    
+    async def _transcribe(self, audio_data: bytes, mime_type: str, use_cache: bool = True) -> str:
+        """Transcribe raw audio bytes"""
+        model_name = self.MODELS["AUDIO_TRANSCRIBE"]
+        
+        async def compute() -> bytes:
+            model = model_registry.get(model_name)
+            response = await self._call("transcribe", model_name, model.generate_content, [
+                {"mime_type": mime_type, "data": audio_data},
+                "Transcribe this audio exactly."
+            ])
+            return response.text.encode("utf-8")
+        
+        key = response_cache.key("transcribe", model_name, None, mime_type, audio_data)
+        text = await self._shared("transcribe", key, compute, use_cache)
+        return text.decode("utf-8")
+    
+    async def _synthesize_speech(self, text: str, use_cache: bool = True) -> bytes:
+        """Synthesize speech as raw PCM bytes"""
+        model_name = self.MODELS["AUDIO_TTS"]
+        config = {"response_mime_type": "audio/pcm"}
+        
+        async def compute() -> bytes:
+            model = model_registry.get(model_name, config)
+            response = await self._call("tts", model_name, model.generate_content, text)
             
             if hasattr(response, 'parts') and response.parts:
-                audio_data = response.parts[0].inline_data.data
-                return TTSResponse(audio_base64=audio_data)
+                return response.parts[0].inline_data.data
             
             raise ValueError("No audio generated")
-        except Exception as e:
-            logger.error(f"TTS error: {e}")
-            raise
+        
+        key = response_cache.key("tts", model_name, config, text)
+        return await self._shared("tts", key, compute, use_cache)
+    
+    async def _shared(self, endpoint: str, key: str, compute, use_cache: bool = True) -> bytes:
+        """Serve from the response cache, coalescing identical requests already in flight.
+        
+        ``use_cache=False`` asks for a fresh response, so it bypasses both.
+        """
+        if not use_cache:
+            return await compute()
+        return await self._flights.do(
+            key, lambda: response_cache.get_or_compute(endpoint, key, compute)
+        )
+    
+    async def _call(self, endpoint: str, model_name: str, func, *args):
+        """Run a blocking SDK call under the model's rate limiter and retry policy"""
+        return await quota_guard.call(
+            model_name, lambda: gemini_executor.run(endpoint, func, *args)
+        )
+    
+    def warm_up(self):
+        """Pre-build model handles and open the upstream connection in the background"""
+        asyncio.get_running_loop().run_in_executor(
+            None, model_registry.warm, list(self.MODELS.values()), self.MODELS["CHAT_FAST"]
+        )
+    
+    def metrics(self) -> dict:
+        """Execution metrics for the Gemini module"""
+        return {
+            "executor": gemini_executor.metrics(),
+            "sessions": chat_sessions.metrics(),
+            "models": model_registry.metrics(),
+            "cache": response_cache.metrics(),
+            "quota": quota_guard.metrics(),
+            "coalescing": self._flights.metrics(),
+            "rag": rag_retriever.metrics(),
+        }
 
 
 # Service instance
 gemini_service = GeminiService()
-
@@ -0,0 +1,254 @@
+"""Server-side chat session store"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import settings
+from app.modules.gemini.schemas import ChatMessage
+from app.shared.exceptions import ServiceUnavailableError
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Gemini uses "model" for replies; chat_messages.role only allows "assistant"
+_ROLE_TO_DB = {"model": "assistant"}
+_ROLE_FROM_DB = {"assistant": "model"}
+
+# Rough per-message bookkeeping overhead used for memory accounting
+_MESSAGE_OVERHEAD = 64
+
+
+class ChatSession:
+    """A conversation held in memory"""
+    
+    def __init__(self, session_id: str, model: str, title: str = None,
+                 messages: List[ChatMessage] = None, persisted: bool = False):
+        self.id = session_id
+        self.model = model
+        self.title = title
+        self.messages: List[ChatMessage] = list(messages or [])
+        # Messages below this index are already in chat_messages
+        self.persisted_count = len(self.messages) if persisted else 0
+        self.session_persisted = persisted
+        self.lock = asyncio.Lock()
+        # Recent vector store retrievals, see rag.Retriever
+        self.retrievals: "OrderedDict[str, Any]" = OrderedDict()
+        self.size = sum(_message_size(m) for m in self.messages)
+
+
+def _message_size(message: ChatMessage) -> int:
+    return len(message.text.encode("utf-8")) + _MESSAGE_OVERHEAD
+
+
+class ChatSessionStore:
+    """LRU cache of hot chat sessions, written through to Postgres.
+    
+    Sessions are evicted least-recently-used first once the cache holds more
+    than ``max_bytes`` of message text. Writes are queued on a single
+    background thread, so a request never waits on the database and a reload
+    after eviction always sees earlier writes. If the database cannot be
+    read, lookups of sessions not in the cache fail with 503 rather than
+    reporting the session missing.
+    """
+    
+    def __init__(self, max_bytes: int, history_window: int, history_max_chars: int, persist: bool):
+        self.max_bytes = max_bytes
+        self.history_window = history_window
+        self.history_max_chars = history_max_chars
+        self.persist = persist
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._bytes = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-persist")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    async def create(self, model: str, title: str = None) -> ChatSession:
+        """Start a new session"""
+        session = ChatSession(str(uuid.uuid4()), model, title)
+        self._put(session)
+        self._schedule_persist(session)
+        return session
+    
+    async def get(self, session_id: str) -> Optional[ChatSession]:
+        """Get a session from the cache, falling back to the database"""
+        session = self._sessions.get(session_id)
+        if session:
+            self.hits += 1
+            self._sessions.move_to_end(session_id)
+            return session
+        
+        self.misses += 1
+        if not self.persist:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        try:
+            session = await loop.run_in_executor(self._writer, self._load, session_id)
+        except Exception as e:
+            logger.error(f"Chat session load error: {e}")
+            raise ServiceUnavailableError("Chat session store is unavailable", retry_after=5)
+        if session:
+            # Another request may have loaded it while we waited
+            session = self._sessions.get(session_id, session)
+            self._put(session)
+        return session
+    
+    async def append(self, session: ChatSession, messages: List[ChatMessage]):
+        """Add messages to a session and persist them in the background"""
+        session.messages.extend(messages)
+        added = sum(_message_size(m) for m in messages)
+        session.size += added
+        if session.id in self._sessions:
+            self._bytes += added
+            self._sessions.move_to_end(session.id)
+        self._evict()
+        self._schedule_persist(session)
+    
+    async def delete(self, session_id: str) -> bool:
+        """Delete a session from the cache and the database"""
+        session = self._sessions.pop(session_id, None)
+        if session:
+            self._bytes -= session.size
+        if not self.persist:
+            return session is not None
+        
+        loop = asyncio.get_running_loop()
+        try:
+            deleted = await loop.run_in_executor(self._writer, self._delete, session_id)
+        except Exception as e:
+            logger.error(f"Chat session delete error: {e}")
+            raise ServiceUnavailableError("Chat session store is unavailable", retry_after=5)
+        return deleted or session is not None
+    
+    def window(self, session: ChatSession) -> List[ChatMessage]:
+        """Recent history to send upstream, bounded by count and characters"""
+        history: List[ChatMessage] = []
+        chars = 0
+        for message in reversed(session.messages[-self.history_window:]):
+            chars += len(message.text)
+            if history and chars > self.history_max_chars:
+                break
+            history.append(message)
+        history.reverse()
+        
+        # History must open with a user turn
+        while history and history[0].role != "user":
+            history.pop(0)
+        return history
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Cache occupancy and hit/miss counters"""
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+    
+    def _put(self, session: ChatSession):
+        if session.id not in self._sessions:
+            self._sessions[session.id] = session
+            self._bytes += session.size
+        self._sessions.move_to_end(session.id)
+        self._evict()
+    
+    def _evict(self):
+        # Always keep the most recently used session
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            _, evicted = self._sessions.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+    
+    def _schedule_persist(self, session: ChatSession):
+        if not self.persist:
+            return
+        pending = session.messages[session.persisted_count:]
+        start = session.persisted_count
+        session.persisted_count = len(session.messages)
+        create = not session.session_persisted
+        session.session_persisted = True
+        self._writer.submit(self._write, session.id, session.model, session.title, create, start, pending)
+    
+    def _write(self, session_id: str, model: str, title: Optional[str], create: bool,
+               start: int, messages: List[ChatMessage]):
+        try:
+            # Imported lazily so the store works without database settings
+            # when persistence is disabled
+            from app.config.database import SessionLocal
+            from app.modules.gemini.models import ChatMessageModel, ChatSessionModel
+            db = SessionLocal()
+        except Exception as e:
+            logger.error(f"Chat session persist error: {e}")
+            return
+        try:
+            if create:
+                db.add(ChatSessionModel(id=session_id, model=model, title=title))
+            for offset, message in enumerate(messages):
+                db.add(ChatMessageModel(
+                    id=str(uuid.uuid4()),
+                    session_id=session_id,
+                    role=_ROLE_TO_DB.get(message.role, message.role),
+                    text=message.text,
+                    sequence_number=start + offset,
+                ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Chat session persist error: {e}")
+        finally:
+            db.close()
+    
+    def _load(self, session_id: str) -> Optional[ChatSession]:
+        # Errors propagate: "unreachable" must not look like "no such session"
+        from app.config.database import SessionLocal
+        from app.modules.gemini.models import ChatMessageModel, ChatSessionModel
+        
+        db = SessionLocal()
+        try:
+            row = db.get(ChatSessionModel, session_id)
+            if row is None:
+                return None
+            rows = (
+                db.query(ChatMessageModel)
+                .filter(ChatMessageModel.session_id == session_id)
+                .order_by(ChatMessageModel.sequence_number)
+                .all()
+            )
+            messages = [
+                ChatMessage(role=_ROLE_FROM_DB.get(r.role, r.role), text=r.text)
+                for r in rows
+            ]
+            return ChatSession(row.id, row.model, row.title, messages, persisted=True)
+        finally:
+            db.close()
+    
+    def _delete(self, session_id: str) -> bool:
+        from app.config.database import SessionLocal
+        from app.modules.gemini.models import ChatSessionModel
+        
+        db = SessionLocal()
+        try:
+            deleted = db.query(ChatSessionModel).filter(ChatSessionModel.id == session_id).delete()
+            db.commit()
+            return deleted > 0
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def shutdown(self):
+        """Flush queued writes"""
+        self._writer.shutdown(wait=True)
+
+
+chat_sessions = ChatSessionStore(
+    max_bytes=settings.GEMINI_CHAT_CACHE_MAX_BYTES,
+    history_window=settings.GEMINI_CHAT_HISTORY_WINDOW,
+    history_max_chars=settings.GEMINI_CHAT_HISTORY_MAX_CHARS,
+    persist=settings.GEMINI_CHAT_PERSIST and settings.database_configured,
+)
@@ -2,7 +2,7 @@
 from app.modules.notifications.schemas import NotificationRequest, NotificationResponse
 import uuid
 import time
-from typing import List, Dict
+from typing import Any, List, Dict
 
 # Active connections
 active_connections: List[Dict] = []
@@ -21,18 +21,25 @@ class NotificationService:
             timestamp=int(time.time() * 1000)
         )
         
+        await self.send_event(notification.dict(), connection_id)
+        return notification
+    
+    async def send_event(self, payload: Dict[str, Any], connection_id: str = None):
+        """Push a JSON payload to one connection, or broadcast it to all"""
         # Broadcast to all connections or specific connection
         if connection_id:
             # Send to specific connection
             for conn in active_connections:
                 if conn.get("id") == connection_id:
-                    await conn["websocket"].send_json(notification.dict())
+                    await conn["websocket"].send_json(payload)
         else:
             # Broadcast to all
-            for conn in active_connections:
-                await conn["websocket"].send_json(notification.dict())
-        
-        return notification
+            for conn in list(active_connections):
+                try:
+                    await conn["websocket"].send_json(payload)
+                except Exception:
+                    # Connection is closing; the websocket handler removes it
+                    pass
 
 
 notification_service = NotificationService()
@@ -2,7 +2,13 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 from app.modules.notifications.service import notification_service, active_connections
 from app.modules.notifications.schemas import NotificationRequest
+from app.modules.gemini.service import gemini_service
+from app.modules.gemini.batch import batch_runner
+from app.modules.gemini.jobs import job_queue
+from app.modules.gemini.schemas import ChatRequest, BatchRequest, ImageRequest
 from app.config.settings import settings
+from typing import Dict
+import asyncio
 import uuid
 import json
 
@@ -26,6 +32,30 @@ def check_origin(origin: str) -> bool:
     return False
 
 
+async def stream_chat(websocket: WebSocket, request_id: str, request: ChatRequest):
+    """Relay a streaming chat response as ``gemini_chat_*`` frames"""
+    async for frame in gemini_service.chat_stream(request):
+        await websocket.send_json({
+            **frame,
+            "type": f"gemini_chat_{frame['type']}",
+            "request_id": request_id,
+        })
+
+
+async def stream_batch(websocket: WebSocket, request_id: str, request: BatchRequest):
+    """Relay batch results as ``gemini_batch_item`` frames, then ``gemini_batch_done``"""
+    try:
+        async for item in batch_runner.run(request):
+            await websocket.send_json({
+                "type": "gemini_batch_item",
+                "request_id": request_id,
+                "data": item.model_dump(),
+            })
+        await websocket.send_json({"type": "gemini_batch_done", "request_id": request_id})
+    except ValueError as e:
+        await websocket.send_json({"type": "gemini_batch_error", "request_id": request_id, "detail": str(e)})
+
+
 @router.websocket("/")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time notifications"""
@@ -58,6 +88,9 @@ async def websocket_endpoint(websocket: WebSocket):
         "websocket": websocket
     })
     
+    # In-flight chat streams and batches for this connection, keyed by client request_id
+    streams: Dict[str, asyncio.Task] = {}
+    
     try:
         while True:
             data = await websocket.receive_text()
@@ -67,9 +100,38 @@ async def websocket_endpoint(websocket: WebSocket):
                 if message.get("type") == "send_notification":
                     request = NotificationRequest(**message.get("data", {}))
                     await notification_service.send_notification(request, connection_id)
+                elif message.get("type") in ("gemini_chat_stream", "gemini_batch"):
+                    request_id = message.get("request_id") or str(uuid.uuid4())
+                    if message["type"] == "gemini_chat_stream":
+                        request = ChatRequest(**message.get("data", {}))
+                        task = asyncio.create_task(stream_chat(websocket, request_id, request))
+                    else:
+                        request = BatchRequest(**message.get("data", {}))
+                        task = asyncio.create_task(stream_batch(websocket, request_id, request))
+                    task.add_done_callback(lambda _, rid=request_id: streams.pop(rid, None))
+                    streams[request_id] = task
+                elif message.get("type") == "gemini_job_submit":
+                    # Updates are pushed to this connection as ``gemini_job_update`` frames
+                    job = await job_queue.submit(
+                        message.get("kind"), ImageRequest(**message.get("data", {})), connection_id
+                    )
+                    await websocket.send_json({
+                        "type": "gemini_job_queued",
+                        "request_id": message.get("request_id"),
+                        "job_id": job.id,
+                        "kind": job.kind,
+                    })
+                elif message.get("type") in ("gemini_chat_cancel", "gemini_batch_cancel"):
+                    task = streams.get(message.get("request_id"))
+                    if task:
+                        task.cancel()
             except Exception as e:
                 await websocket.send_json({"error": str(e)})
     except WebSocketDisconnect:
         # Remove connection
         active_connections[:] = [c for c in active_connections if c.get("id") != connection_id]
+    finally:
+        # Stop upstream generation for anything still streaming
+        for task in list(streams.values()):
+            task.cancel()
 
@@ -1,7 +1,16 @@
 """Vector database controller"""
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from app.modules.vector.ingest import ndjson_documents, text_documents
 from app.modules.vector.service import vector_service
-from app.modules.vector.schemas import VectorSearchRequest, VectorSearchResponse, VectorAddRequest
+from app.modules.vector.schemas import (
+    VectorSearchRequest, VectorSearchResponse, VectorAddRequest, VectorBatchSearchRequest,
+    VectorBatchSearchResponse, VectorCollectionCreateRequest, VectorCollectionResponse,
+    VectorDeleteRequest, VectorSnapshot, VectorRestoreRequest, VectorCompactRequest
+)
+from typing import List, Optional
+import json
 
 router = APIRouter()
 
@@ -12,8 +21,131 @@ async def search(request: VectorSearchRequest):
     return await vector_service.search(request)
 
 
+@router.post("/search/batch", response_model=VectorBatchSearchResponse)
+async def batch_search(request: VectorBatchSearchRequest):
+    """Run many searches (each with its own filters and n_results) in one request"""
+    return await vector_service.batch_search(request)
+
+
 @router.post("/add")
 async def add_documents(request: VectorAddRequest):
     """Add documents to vector database"""
     return await vector_service.add_documents(request)
 
+
+@router.post("/delete")
+async def delete_documents(request: VectorDeleteRequest):
+    """Delete documents by ID and/or by metadata / document filter"""
+    return await vector_service.delete_documents(request)
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse that reads the request body while responding.
+    
+    The stock class listens for a client disconnect while streaming, which
+    would swallow the request body messages the generator is still reading.
+    A disconnect surfaces as a failed send instead.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def _progress_stream(documents, collection: Optional[str], user_id: Optional[str],
+                     response_class=StreamingResponse) -> StreamingResponse:
+    async def lines():
+        try:
+            async for progress in vector_service.ingest(documents, collection, user_id):
+                yield progress.model_dump_json() + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return response_class(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/add/stream")
+async def add_documents_stream(request: Request, collection: Optional[str] = None,
+                               user_id: Optional[str] = None):
+    """Bulk ingest an NDJSON request body, streaming NDJSON progress per batch"""
+    documents = ndjson_documents(request.stream())
+    return _progress_stream(documents, collection, user_id, _BodyStreamingResponse)
+
+
+@router.post("/add/upload")
+async def add_documents_upload(request: Request, collection: Optional[str] = None,
+                               user_id: Optional[str] = None):
+    """Bulk ingest an uploaded ``file`` (.ndjson/.jsonl, or text with one document per line)"""
+    async def documents():
+        # Parsed inside the response so the form (and its temp file) stays open while ingesting
+        async with request.form() as form:
+            file = form.get("file")
+            if not isinstance(file, UploadFile):
+                raise ValueError("Expected a multipart 'file' field")
+            
+            async def chunks():
+                while chunk := await file.read(64 * 1024):
+                    yield chunk
+            
+            if (file.filename or "").endswith((".ndjson", ".jsonl")):
+                parsed = ndjson_documents(chunks())
+            else:
+                parsed = text_documents(chunks())
+            async for document in parsed:
+                yield document
+    
+    return _progress_stream(documents(), collection, user_id, _BodyStreamingResponse)
+
+
+@router.get("/collections", response_model=List[VectorCollectionResponse])
+async def list_collections(user_id: Optional[str] = None):
+    """List collections (only the given user's when ``user_id`` is set)"""
+    return await vector_service.list_collections(user_id)
+
+
+@router.post("/collections", response_model=VectorCollectionResponse)
+async def create_collection(request: VectorCollectionCreateRequest):
+    """Create a collection with its own HNSW parameters"""
+    return await vector_service.create_collection(request)
+
+
+@router.delete("/collections/{name}")
+async def drop_collection(name: str, user_id: Optional[str] = None):
+    """Drop a collection and everything in it"""
+    await vector_service.drop_collection(name, user_id)
+    return {"success": True}
+
+
+@router.post("/admin/snapshot", response_model=VectorSnapshot)
+async def snapshot():
+    """Take a consistent snapshot of the vector store (tar.gz in VECTOR_SNAPSHOT_DIR)"""
+    return await vector_service.snapshot()
+
+
+@router.get("/admin/snapshots", response_model=List[VectorSnapshot])
+async def list_snapshots():
+    """List vector store snapshots, newest first"""
+    return await vector_service.list_snapshots()
+
+
+@router.post("/admin/restore")
+async def restore(request: VectorRestoreRequest):
+    """Replace the vector store with a snapshot"""
+    return await vector_service.restore(request)
+
+
+@router.post("/admin/compact")
+async def compact(request: VectorCompactRequest):
+    """Rebuild HNSW indexes from stored records and vacuum the database"""
+    return await vector_service.compact(request)
+
+
+@router.post("/admin/warm-up")
+async def warm_up():
+    """Load the embedding model and every collection's indexes into memory"""
+    return await vector_service.warm_up()
+
+
+@router.get("/metrics")
+async def metrics():
+    """Vector query metrics"""
+    return vector_service.metrics()
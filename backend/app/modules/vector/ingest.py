@@ -0,0 +1,165 @@
+"""Streaming bulk ingestion into the vector database"""
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import settings
+from app.database.vector_db import VectorDBClient, document_id, vector_db
+from app.modules.vector.schemas import VectorDocument, VectorIngestProgress
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Tuple, Union
+import asyncio
+import json
+import time
+
+
+async def _aiter(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def ndjson_documents(chunks: AsyncIterable[bytes]) -> AsyncIterator[VectorDocument]:
+    """Parse a byte stream of NDJSON lines into documents.
+    
+    Each line is either a JSON object (``{"document": ..., "id": ..., "metadata": ...}``)
+    or a bare JSON string. Blank lines are skipped.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+async def text_documents(chunks: AsyncIterable[bytes]) -> AsyncIterator[VectorDocument]:
+    """Treat every non-empty line of a plain text stream as one document"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield VectorDocument(document=line.decode("utf-8").strip())
+    if buffer.strip():
+        yield VectorDocument(document=buffer.decode("utf-8").strip())
+
+
+def _parse_line(line: bytes) -> VectorDocument:
+    value = json.loads(line)
+    if isinstance(value, str):
+        return VectorDocument(document=value)
+    return VectorDocument(**value)
+
+
+class IngestPipeline:
+    """Embeds and upserts documents batch by batch.
+    
+    Input is consumed lazily and cut into batches of ``batch_size``. Up to
+    ``workers`` batches are embedded at once on a dedicated thread pool, and
+    each batch is upserted as soon as its embeddings are ready, so the event
+    loop never runs the embedding model and only ``workers`` batches are held
+    in memory however large the input is. Documents already stored with the
+    same content are skipped before embedding, so re-syncing a corpus costs
+    time proportional to what changed.
+    """
+    
+    def __init__(self, client: VectorDBClient, batch_size: int, workers: int):
+        self.client = client
+        self.batch_size = batch_size
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vector-ingest")
+    
+    async def run(self, documents: Union[Iterable[VectorDocument], AsyncIterable[VectorDocument]],
+                  collection: str = None) -> AsyncIterator[VectorIngestProgress]:
+        """Ingest ``documents`` into ``collection``, yielding progress after every finished batch"""
+        started = time.perf_counter()
+        batches = 0
+        ingested = 0
+        skipped = 0
+        pending = set()
+        
+        def progress(done: bool = False) -> VectorIngestProgress:
+            elapsed = time.perf_counter() - started
+            return VectorIngestProgress(
+                batches=batches,
+                documents=ingested,
+                skipped=skipped,
+                elapsed_seconds=round(elapsed, 3),
+                docs_per_second=round(ingested / elapsed, 1) if elapsed > 0 else 0.0,
+                done=done,
+            )
+        
+        try:
+            batch: List[VectorDocument] = []
+            async for document in _aiter(documents):
+                if document.id is None:
+                    document.id = document_id(document.document)
+                batch.append(document)
+                if len(batch) < self.batch_size:
+                    continue
+                
+                if len(pending) >= self.workers:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        written, unchanged = task.result()
+                        batches += 1
+                        ingested += written + unchanged
+                        skipped += unchanged
+                        yield progress()
+                pending.add(asyncio.create_task(self._process(batch, collection)))
+                batch = []
+            
+            if batch:
+                pending.add(asyncio.create_task(self._process(batch, collection)))
+            for next_done in asyncio.as_completed(pending):
+                written, unchanged = await next_done
+                batches += 1
+                ingested += written + unchanged
+                skipped += unchanged
+                yield progress()
+            pending = set()
+            yield progress(done=True)
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _process(self, batch: List[VectorDocument],
+                       collection: str = None) -> Tuple[int, int]:
+        """Embed and write the new or changed documents of a batch; returns (written, skipped)"""
+        loop = asyncio.get_running_loop()
+        changed = await loop.run_in_executor(
+            self._executor,
+            self.client.changed,
+            [document.id for document in batch],
+            [document.document for document in batch],
+            [document.metadata for document in batch],
+            collection,
+        )
+        if changed:
+            batch_changed = [batch[i] for i in changed]
+            texts = [document.document for document in batch_changed]
+            embeddings = await loop.run_in_executor(self._executor, self.client.embed, texts)
+            await loop.run_in_executor(
+                self._executor,
+                self.client.upsert,
+                [document.id for document in batch_changed],
+                texts,
+                embeddings,
+                [document.metadata for document in batch_changed],
+                collection,
+            )
+        return len(changed), len(batch) - len(changed)
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+ingest_pipeline = IngestPipeline(
+    client=vector_db,
+    batch_size=settings.VECTOR_INGEST_BATCH_SIZE,
+    workers=settings.VECTOR_INGEST_WORKERS,
+)
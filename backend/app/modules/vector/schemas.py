@@ -1,18 +1,120 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import List, Dict, Any, Literal, Optional
+
+
+IncludeField = Literal["documents", "metadatas", "distances", "embeddings"]
+# "vector" = embedding similarity, "lexical" = BM25 keywords, "hybrid" = both fused with RRF
+SearchMode = Literal["vector", "lexical", "hybrid"]
 
 
 class VectorSearchRequest(BaseModel):
     query: str
+    collection: Optional[str] = None
+    user_id: Optional[str] = None
     n_results: Optional[int] = 5
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    include: List[IncludeField] = ["documents", "metadatas", "distances"]
+    mode: SearchMode = "vector"
 
 
 class VectorSearchResponse(BaseModel):
     results: List[Dict[str, Any]]
 
 
+class VectorQuery(BaseModel):
+    query: str
+    n_results: Optional[int] = None
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+
+
+class VectorBatchSearchRequest(BaseModel):
+    queries: List[VectorQuery]
+    collection: Optional[str] = None
+    user_id: Optional[str] = None
+    # Defaults for queries that do not set their own
+    n_results: int = 5
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    include: List[IncludeField] = ["documents", "metadatas", "distances"]
+    mode: SearchMode = "vector"
+
+
+class VectorQueryResult(BaseModel):
+    query: str
+    results: List[Dict[str, Any]]
+
+
+class VectorBatchSearchResponse(BaseModel):
+    results: List[VectorQueryResult]
+
+
 class VectorAddRequest(BaseModel):
     documents: List[str]
     ids: Optional[List[str]] = None
     metadatas: Optional[List[Dict]] = None
+    collection: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+class VectorDocument(BaseModel):
+    document: str
+    id: Optional[str] = None
+    metadata: Optional[Dict] = None
+
+
+class VectorIngestProgress(BaseModel):
+    batches: int
+    documents: int
+    skipped: int = 0
+    elapsed_seconds: float
+    docs_per_second: float
+    done: bool = False
+
+
+class HNSWParams(BaseModel):
+    M: Optional[int] = None
+    ef_construction: Optional[int] = None
+    ef_search: Optional[int] = None
+
+
+class VectorCollectionCreateRequest(BaseModel):
+    name: str
+    user_id: Optional[str] = None
+    space: Literal["cosine", "l2", "ip"] = "cosine"
+    hnsw: Optional[HNSWParams] = None
+
+
+class VectorCollectionResponse(BaseModel):
+    name: str
+    # The user_id the collection was created for
+    owner: Optional[str] = None
+    count: int
+    space: str
+    hnsw: HNSWParams
+
+
+class VectorDeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    collection: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+class VectorSnapshot(BaseModel):
+    name: str
+    size: int
+    created_at: datetime
+
+
+class VectorRestoreRequest(BaseModel):
+    name: str
+
 
+class VectorCompactRequest(BaseModel):
+    # Every collection when unset
+    collection: Optional[str] = None
+    user_id: Optional[str] = None
@@ -1,26 +1,267 @@
 """Vector database service"""
-from app.database.vector_db import vector_db
-from app.modules.vector.schemas import VectorSearchRequest, VectorSearchResponse, VectorAddRequest
-from typing import List, Dict, Any
+from app.config.settings import settings
+from app.database.lexical import reciprocal_rank_fusion
+from app.database.vector_db import CONTENT_HASH_KEY, collection_name, vector_db
+from app.modules.vector.ingest import ingest_pipeline
+from app.modules.vector.schemas import (
+    VectorSearchRequest, VectorSearchResponse, VectorAddRequest, VectorDocument,
+    VectorIngestProgress, VectorBatchSearchRequest, VectorBatchSearchResponse, VectorQueryResult,
+    VectorCollectionCreateRequest, VectorCollectionResponse, VectorDeleteRequest,
+    VectorSnapshot, VectorRestoreRequest, VectorCompactRequest
+)
+from app.shared.exceptions import NotFoundError, ValidationError
+from app.shared.readiness import readiness
+from app.shared.singleflight import SingleFlight
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, List, Dict, Any, Optional
+import asyncio
+import os
+
+SNAPSHOT_SUFFIX = ".tar.gz"
 
 
 class VectorService:
     """Service for vector database operations"""
     
+    def __init__(self):
+        # Identical searches in flight share one query
+        self._flights = SingleFlight("vector_search")
+    
     async def search(self, request: VectorSearchRequest) -> VectorSearchResponse:
         """Search in vector database"""
-        results = vector_db.search([request.query], n_results=request.n_results)
-        return VectorSearchResponse(results=results)
+        query = {
+            "text": request.query,
+            "n_results": request.n_results,
+            "where": request.where,
+            "where_document": request.where_document,
+        }
+        target = collection_name(request.collection, request.user_id)
+        results = await self._search_many([query], request.include, target, request.mode)
+        return VectorSearchResponse(results=results[0])
+    
+    async def batch_search(self, request: VectorBatchSearchRequest) -> VectorBatchSearchResponse:
+        """Run many queries in one round trip and one embedding batch"""
+        if len(request.queries) > settings.VECTOR_SEARCH_MAX_QUERIES:
+            raise ValidationError(
+                f"Batch search exceeds the limit of {settings.VECTOR_SEARCH_MAX_QUERIES} queries"
+            )
+        queries = [
+            {
+                "text": query.query,
+                "n_results": query.n_results or request.n_results,
+                "where": query.where if query.where is not None else request.where,
+                "where_document": (
+                    query.where_document if query.where_document is not None
+                    else request.where_document
+                ),
+            }
+            for query in request.queries
+        ]
+        target = collection_name(request.collection, request.user_id)
+        results = await self._search_many(queries, request.include, target, request.mode)
+        return VectorBatchSearchResponse(results=[
+            VectorQueryResult(query=query.query, results=hits)
+            for query, hits in zip(request.queries, results)
+        ])
+    
+    async def _search_many(self, queries: List[Dict[str, Any]], include: List[str],
+                           collection: str, mode: str = "vector") -> List[List[Dict[str, Any]]]:
+        """Query a collection and turn Chroma's column lists into one dict per hit"""
+        if not queries:
+            return []
+        key = SingleFlight.key("search", collection, queries, sorted(include), mode)
+        search = {
+            "lexical": vector_db.search_lexical,
+            "hybrid": self._hybrid,
+        }.get(mode, vector_db.search_many)
+        columns = await self._flights.do(
+            key, lambda: asyncio.to_thread(search, queries, include, collection)
+        )
+        
+        fields = {"documents": "document", "metadatas": "metadata",
+                  "distances": "distance", "embeddings": "embedding"}
+        results = []
+        for column in columns:
+            hits = []
+            for position, doc_id in enumerate(column["ids"]):
+                hit = {"id": doc_id}
+                if "scores" in column:
+                    hit["score"] = column["scores"][position]
+                for field in include:
+                    value = column[field][position]
+                    if field == "metadatas" and value:
+                        value = {k: v for k, v in value.items() if k != CONTENT_HASH_KEY} or None
+                    hit[fields[field]] = value.tolist() if hasattr(value, "tolist") else value
+                hits.append(hit)
+            results.append(hits)
+        return results
+    
+    def _hybrid(self, queries: List[Dict[str, Any]], include: List[str],
+                collection: str) -> List[Dict[str, list]]:
+        """Vector and BM25 rankings fused with reciprocal rank fusion.
+        
+        Each side contributes its top ``VECTOR_HYBRID_CANDIDATES`` (or
+        ``n_results`` if larger); ``scores`` are the fused RRF scores.
+        Documents found only lexically have no distance.
+        """
+        deep = [
+            {**query, "n_results": max(query["n_results"], settings.VECTOR_HYBRID_CANDIDATES)}
+            for query in queries
+        ]
+        vector_columns = vector_db.search_many(deep, include, collection)
+        lexical_columns = vector_db.search_lexical(deep, include, collection)
+        
+        results = []
+        for query, vector, lexical in zip(queries, vector_columns, lexical_columns):
+            fused = reciprocal_rank_fusion(
+                [vector["ids"], lexical["ids"]], settings.VECTOR_RRF_K
+            )[:query["n_results"]]
+            sources = [vector, lexical]
+            positions = [
+                {doc_id: position for position, doc_id in enumerate(source["ids"])}
+                for source in sources
+            ]
+            result: Dict[str, list] = {"ids": [], "scores": [], **{field: [] for field in include}}
+            for doc_id, score in fused:
+                result["ids"].append(doc_id)
+                result["scores"].append(score)
+                for field in include:
+                    value = None
+                    for source, position in zip(sources, positions):
+                        if doc_id in position and source[field][position[doc_id]] is not None:
+                            value = source[field][position[doc_id]]
+                            break
+                    result[field].append(value)
+            results.append(result)
+        return results
     
     async def add_documents(self, request: VectorAddRequest):
         """Add documents to vector database"""
-        vector_db.add_documents(
-            documents=request.documents,
-            ids=request.ids,
-            metadatas=request.metadatas
+        for field in ("ids", "metadatas"):
+            values = getattr(request, field)
+            if values is not None and len(values) != len(request.documents):
+                raise ValidationError(
+                    f"Got {len(values)} {field} for {len(request.documents)} documents"
+                )
+        ids = request.ids or [None] * len(request.documents)
+        metadatas = request.metadatas or [None] * len(request.documents)
+        documents = [
+            VectorDocument(document=document, id=doc_id, metadata=metadata)
+            for document, doc_id, metadata in zip(request.documents, ids, metadatas)
+        ]
+        progress = None
+        target = await self._write_target(request.collection, request.user_id)
+        async for progress in ingest_pipeline.run(documents, target):
+            pass
+        return {
+            "success": True,
+            "added": progress.documents - progress.skipped,
+            "skipped": progress.skipped,
+        }
+    
+    async def delete_documents(self, request: VectorDeleteRequest):
+        """Delete documents by ID and/or metadata and document filters"""
+        if not (request.ids or request.where or request.where_document):
+            raise ValidationError("Provide ids, where or where_document")
+        deleted = await asyncio.to_thread(
+            vector_db.delete,
+            request.ids,
+            request.where,
+            request.where_document,
+            collection_name(request.collection, request.user_id),
+        )
+        return {"success": True, "deleted": len(deleted)}
+    
+    async def ingest(self, documents: AsyncIterable[VectorDocument], collection: str = None,
+                     user_id: str = None) -> AsyncIterator[VectorIngestProgress]:
+        """Stream documents into the vector database, yielding progress per batch"""
+        target = await self._write_target(collection, user_id)
+        async for progress in ingest_pipeline.run(documents, target):
+            yield progress
+    
+    async def _write_target(self, collection: Optional[str], user_id: Optional[str]) -> str:
+        """Physical collection for a write; a user's collection records its owner when created"""
+        name = collection_name(collection, user_id)
+        if user_id:
+            await asyncio.to_thread(vector_db.get_collection, name, True, user_id)
+        return name
+    
+    async def create_collection(self, request: VectorCollectionCreateRequest
+                                ) -> VectorCollectionResponse:
+        """Create a collection with its own HNSW index"""
+        name = collection_name(request.name, request.user_id)
+        hnsw = request.hnsw.model_dump(exclude_none=True) if request.hnsw else None
+        await asyncio.to_thread(
+            vector_db.create_collection, name, hnsw, request.space, request.user_id
+        )
+        return next(
+            VectorCollectionResponse(**info)
+            for info in await asyncio.to_thread(vector_db.list_collections)
+            if info["name"] == name
         )
-        return {"success": True}
+    
+    async def list_collections(self, user_id: str = None) -> List[VectorCollectionResponse]:
+        """List collections, optionally only those belonging to one user"""
+        collections = await asyncio.to_thread(vector_db.list_collections)
+        if user_id:
+            collections = [info for info in collections if info["owner"] == user_id]
+        return [VectorCollectionResponse(**info) for info in collections]
+    
+    async def drop_collection(self, name: str, user_id: str = None) -> bool:
+        """Drop a collection and its index"""
+        await asyncio.to_thread(vector_db.drop_collection, collection_name(name, user_id))
+        return True
+    
+    async def snapshot(self) -> VectorSnapshot:
+        """Snapshot the whole vector store into the snapshot directory"""
+        name = datetime.now(timezone.utc).strftime("vectors-%Y%m%d-%H%M%S-%f") + SNAPSHOT_SUFFIX
+        path = os.path.join(settings.VECTOR_SNAPSHOT_DIR, name)
+        await asyncio.to_thread(vector_db.snapshot, path)
+        return self._snapshot_info(path)
+    
+    async def list_snapshots(self) -> List[VectorSnapshot]:
+        """Snapshots in the snapshot directory, newest first"""
+        if not os.path.isdir(settings.VECTOR_SNAPSHOT_DIR):
+            return []
+        snapshots = [
+            self._snapshot_info(os.path.join(settings.VECTOR_SNAPSHOT_DIR, name))
+            for name in os.listdir(settings.VECTOR_SNAPSHOT_DIR)
+            if name.endswith(SNAPSHOT_SUFFIX)
+        ]
+        return sorted(snapshots, key=lambda snapshot: snapshot.created_at, reverse=True)
+    
+    async def restore(self, request: VectorRestoreRequest) -> Dict[str, Any]:
+        """Replace the vector store with a snapshot; /ready reports not ready meanwhile"""
+        name = os.path.basename(request.name)
+        path = os.path.join(settings.VECTOR_SNAPSHOT_DIR, name)
+        if name != request.name or not name.endswith(SNAPSHOT_SUFFIX) or not os.path.isfile(path):
+            raise NotFoundError(f"Vector snapshot '{request.name}' not found")
+        result = await readiness.track("vector_restore", asyncio.to_thread(vector_db.restore, path))
+        return {"success": True, "name": name, "seconds": result["seconds"]}
+    
+    async def compact(self, request: VectorCompactRequest) -> Dict[str, Any]:
+        """Rebuild one collection's index (or every collection's) and reclaim disk space"""
+        name = collection_name(request.collection, request.user_id) if request.collection else None
+        return await asyncio.to_thread(vector_db.compact, name)
+    
+    def warm_up(self) -> "asyncio.Task[Dict[str, Any]]":
+        """Start preloading the embedding model and all indexes; not ready until it finishes"""
+        return readiness.track("vector_warm_up", asyncio.to_thread(vector_db.warm_up))
+    
+    def _snapshot_info(self, path: str) -> VectorSnapshot:
+        stat = os.stat(path)
+        return VectorSnapshot(
+            name=os.path.basename(path),
+            size=stat.st_size,
+            created_at=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+        )
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Coalescing and embedding cache metrics"""
+        return {
+            "coalescing": self._flights.metrics(),
+            "embeddings": vector_db.embedding_function.metrics(),
+        }
 
 
 vector_service = VectorService()
-
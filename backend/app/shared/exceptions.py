@@ -1,4 +1,5 @@
 from fastapi import HTTPException, status
+import math
 
 
 class DurgasOSException(HTTPException):
@@ -20,3 +21,40 @@ class UnauthorizedError(DurgasOSException):
     def __init__(self, detail: str = "Unauthorized"):
         super().__init__(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
 
+
+
+class ConflictError(DurgasOSException):
+    def __init__(self, detail: str = "Conflict"):
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+class PayloadTooLargeError(DurgasOSException):
+    def __init__(self, detail: str = "Payload too large"):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+class RangeNotSatisfiableError(DurgasOSException):
+    def __init__(self, size: int, detail: str = "Requested range not satisfiable"):
+        super().__init__(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=detail,
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+
+class TooManyRequestsError(DurgasOSException):
+    def __init__(self, detail: str = "Too many requests", retry_after: float = 1):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+class ServiceUnavailableError(DurgasOSException):
+    def __init__(self, detail: str = "Service unavailable", retry_after: float = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
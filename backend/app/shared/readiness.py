@@ -0,0 +1,57 @@
+"""Readiness tracking for load balancer health checks"""
+from typing import Any, Awaitable, Dict, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class Readiness:
+    """Named tasks (warm-up, restore, ...) that must finish before taking traffic.
+    
+    The app is ready while nothing is pending. A task that fails is logged
+    and reported but does not hold readiness back; serving cold beats not
+    serving at all.
+    """
+    
+    def __init__(self):
+        self._pending: Dict[str, int] = {}
+        self._failed: Dict[str, str] = {}
+    
+    def track(self, name: str, awaitable: Awaitable[T]) -> "asyncio.Task[T]":
+        """Run ``awaitable`` as a task and report not-ready until it completes"""
+        self._pending[name] = self._pending.get(name, 0) + 1
+        self._failed.pop(name, None)
+        
+        async def run() -> T:
+            try:
+                return await awaitable
+            except Exception as e:
+                logger.error(f"Readiness task {name} failed: {e}")
+                self._failed[name] = str(e)
+                raise
+            finally:
+                self._pending[name] -= 1
+                if not self._pending[name]:
+                    del self._pending[name]
+        
+        task = asyncio.ensure_future(run())
+        # Already logged; callers that await the task still get the exception
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+    
+    @property
+    def ready(self) -> bool:
+        return not self._pending
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "pending": sorted(self._pending),
+            "failed": dict(self._failed),
+        }
+
+
+readiness = Readiness()
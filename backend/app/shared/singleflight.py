@@ -0,0 +1,64 @@
+"""Single-flight coalescing of identical concurrent calls"""
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import hashlib
+import json
+
+T = TypeVar('T')
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result.
+    
+    The first caller for a key starts the call as a task and later callers
+    await the same task, so they all get the same result or exception. The
+    call is cancelled only when every caller waiting on it has gone away.
+    Nothing is remembered once the call finishes; this is not a cache.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Canonical hash of a request (dict key order does not matter)"""
+        data = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+    
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run ``func`` for ``key``, or join the call already in flight"""
+        flight = self._flights.get(key)
+        if flight is None:
+            self.calls += 1
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+    
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved when every waiter already left
+            flight.task.exception()
+    
+    def metrics(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
@@ -0,0 +1,60 @@
+"""Time and disk used by repeated uploads of the same content.
+
+Run from the backend directory:
+    
+    python -m benchmarks.dedup_upload [SIZE_MB]
+
+Stores one SIZE_MB file into a temporary ``ContentStore`` COPIES times:
+streamed in full each time (hashed, then found to be a duplicate), and
+through ``claim``, the hash fast path behind ``POST /files/upload/by-hash``,
+where nothing is transferred. Disk usage is measured after each phase.
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.modules.files.storage import ContentStore  # noqa: E402
+
+COPIES = 10
+CHUNK_SIZE = 1024 * 1024
+
+
+async def chunks(data: bytes):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+async def main(size_mb: int):
+    store = ContentStore(tempfile.mkdtemp(prefix="dedup-upload-"), CHUNK_SIZE, 3600)
+    data = os.urandom(size_mb * 1024 * 1024)
+    sha256 = hashlib.sha256(data).hexdigest()
+    print(f"{'upload':>16s} {'per copy':>10s} {'stored':>10s}")
+    
+    start = time.perf_counter()
+    stored = await store.put(chunks(data))
+    store.unpin(stored.sha256)
+    first_ms = (time.perf_counter() - start) * 1000
+    print(f"{'first':>16s} {first_ms:7.1f} ms {store.usage()[1] / 1e6:7.1f} MB")
+    
+    start = time.perf_counter()
+    for _ in range(COPIES):
+        stored = await store.put(chunks(data))
+        store.unpin(stored.sha256)
+    repeat_ms = (time.perf_counter() - start) * 1000 / COPIES
+    print(f"{'repeat, streamed':>16s} {repeat_ms:7.1f} ms {store.usage()[1] / 1e6:7.1f} MB")
+    
+    start = time.perf_counter()
+    for _ in range(COPIES):
+        store.unpin(store.claim(sha256).sha256)
+    claim_ms = (time.perf_counter() - start) * 1000 / COPIES
+    print(f"{'repeat, by hash':>16s} {claim_ms:7.3f} ms {store.usage()[1] / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
@@ -0,0 +1,79 @@
+"""File search latency and index size as the tree grows.
+
+Run from the backend directory:
+    
+    python -m benchmarks.file_search [SIZE ...]
+
+Builds a ``FileTree`` of SIZE synthetic files (desktop-style names, mime
+types, sizes and dates spread over a few years) with persistence off, then
+times typical explorer searches through ``FileTree.search``. The whole
+tree, not just the search index, is counted in the memory column (growth
+of peak RSS, so run sizes in increasing order).
+"""
+import os
+import random
+import sys
+import resource
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.modules.files.schemas import FileSearchRequest  # noqa: E402
+from app.modules.files.tree import DRIVE_ID, FileTree  # noqa: E402
+
+FOLDER_SIZE = 1000
+RUNS = 20
+WORDS = ["report", "invoice", "draft", "notes", "meeting", "budget", "photo", "backup",
+         "config", "holiday", "scan", "final", "summary", "project", "contract", "receipt"]
+TYPES = [("pdf", "application/pdf"), ("txt", "text/plain"), ("jpg", "image/jpeg"),
+         ("png", "image/png"), ("docx", "application/msword"), ("mp4", "video/mp4")]
+QUERIES = {
+    "exact name": dict(query="contract-budget-424242"),
+    "substring": dict(query="udget-4242"),
+    "prefix": dict(query="receipt-final-99", match="prefix"),
+    "fuzzy": dict(query="recipt fnial", match="fuzzy"),
+    "images > 1 MB": dict(mime_type="image/*", min_size=1 << 20, limit=50),
+    "pdf, one month": dict(query="pdf", modified_after="2023-03-01",
+                           modified_before="2023-03-31"),
+}
+
+
+def build(size: int, rng: random.Random) -> FileTree:
+    tree = FileTree(persist=False)
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    folder = None
+    for i in range(size):
+        if i % FOLDER_SIZE == 0:
+            folder = tree.add(f"folder-{i // FOLDER_SIZE}", "folder", DRIVE_ID)
+        extension, mime_type = rng.choice(TYPES)
+        modified = (start + timedelta(minutes=rng.randrange(3 * 525600))).isoformat()
+        # Spread modified dates over three years instead of "now"
+        tree._now = lambda: modified
+        tree.add(f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i}.{extension}", "file",
+                 folder.id, size=rng.randrange(1 << 24), mime_type=mime_type)
+    return tree
+
+
+def main(sizes):
+    rng = random.Random(0)
+    print(f"{'files':>8s} {'memory':>9s} " + " ".join(f"{name:>15s}" for name in QUERIES))
+    
+    for size in sizes:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tree = build(size, rng)
+        memory_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_kb) / 1e3
+        
+        timings = []
+        for query in QUERIES.values():
+            request = FileSearchRequest(**query)
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                tree.search(request)
+            timings.append((time.perf_counter() - start) / RUNS * 1000)
+        print(f"{size:8d} {memory_mb:6.0f} MB " + " ".join(f"{ms:12.2f} ms" for ms in timings))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,70 @@
+"""Folder listing latency as the total number of files grows.
+
+Run from the backend directory:
+    
+    python -m benchmarks.file_tree [SIZE ...]
+
+For each total size the files are spread over folders of FOLDER_SIZE items,
+plus one folder of LISTED items that is listed repeatedly. "scan" is the
+previous approach (filtering one flat list by ``parent_id``); "indexed" is
+``FileTree.list``, and "cursor page" fetches a page from the middle of the
+drive, which grows with the number of folders, through its cursor. Persistence is off, so only the
+in-memory index is measured.
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.modules.files.tree import DRIVE_ID, FileTree, encode_cursor  # noqa: E402
+
+FOLDER_SIZE = 1000
+LISTED = 100
+PAGE = 100
+QUERIES = 200
+
+
+def build(size: int) -> FileTree:
+    tree = FileTree(persist=False)
+    target = tree.add("listed", "folder", DRIVE_ID)
+    for i in range(LISTED):
+        tree.add(f"file-{i}.txt", "file", target.id, size=i)
+    folder = None
+    for i in range(size - LISTED):
+        if i % FOLDER_SIZE == 0:
+            folder = tree.add(f"folder-{i // FOLDER_SIZE}", "folder", DRIVE_ID)
+        tree.add(f"file-{i}.txt", "file", folder.id, size=i)
+    return tree
+
+
+def mean_ms(func, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main(sizes):
+    print(f"{'files':>8s} {'build':>9s} {'scan':>11s} {'indexed':>10s} {'cursor page':>12s}")
+    
+    for size in sizes:
+        start = time.perf_counter()
+        tree = build(size)
+        build_s = time.perf_counter() - start
+        
+        target = tree.list(DRIVE_ID, 1)[0][0].id
+        flat = list(tree._nodes.values())
+        scan_ms = mean_ms(lambda: [node for node in flat if node.parent_id == target], 5)
+        indexed_ms = mean_ms(lambda: tree.list(target, PAGE), QUERIES)
+        
+        middle = tree._children[DRIVE_ID][len(tree._children[DRIVE_ID]) // 2]
+        cursor = encode_cursor(middle)
+        cursor_ms = mean_ms(lambda: tree.list(DRIVE_ID, PAGE, cursor), QUERIES)
+        print(f"{size:8d} {build_s:7.2f} s {scan_ms:8.3f} ms {indexed_ms:7.3f} ms "
+              f"{cursor_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 1000000])
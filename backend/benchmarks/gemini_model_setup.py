@@ -0,0 +1,57 @@
+"""Per-call setup overhead: fresh GenerativeModel per request vs. the model registry.
+
+Run from the backend directory:
+    
+    python -m benchmarks.gemini_model_setup [--network]
+
+Offline it measures the one-off client creation that start-up warm-up moves
+out of the first request, and the per-call handle setup. With ``--network``
+(and a valid GEMINI_API_KEY) it also times a cold ``count_tokens`` call
+against a warm one, which is the connection setup and TLS handshake share.
+"""
+from google.generativeai import client as genai_client
+from app.modules.gemini.registry import model_registry
+import google.generativeai as genai
+import sys
+import time
+import timeit
+
+ITERATIONS = 20000
+MODEL = "gemini-2.5-flash-preview-tts"
+CONFIG = {"response_mime_type": "audio/pcm"}
+
+
+def per_request():
+    # What each service call used to do before sending anything
+    model = genai.GenerativeModel(MODEL, generation_config=CONFIG)
+    model._client = genai_client.get_default_generative_client()
+
+
+def registry():
+    model_registry.get(MODEL, CONFIG)
+
+
+def timed_ms(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'cold client creation':30s} {timed_ms(model_registry.configure):8.2f} ms (once, at warm-up)")
+    
+    for name, func in (("per-request GenerativeModel", per_request), ("model registry", registry)):
+        func()
+        seconds = timeit.timeit(func, number=ITERATIONS)
+        print(f"{name:30s} {seconds / ITERATIONS * 1e6:8.2f} us/call")
+    
+    if "--network" in sys.argv:
+        model = model_registry.get("gemini-2.5-flash-lite")
+        cold = timed_ms(lambda: model.count_tokens("ping"))
+        warm = min(timed_ms(lambda: model.count_tokens("ping")) for _ in range(5))
+        print(f"{'first request (cold channel)':30s} {cold:8.2f} ms")
+        print(f"{'request on warm channel':30s} {warm:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
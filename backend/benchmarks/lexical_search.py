@@ -0,0 +1,54 @@
+"""Keyword query latency of the in-memory BM25 index as the corpus grows.
+
+Run from the backend directory:
+    
+    python -m benchmarks.lexical_search [SIZE ...]
+
+Synthetic desktop-style documents (file names, error codes, prose) are
+indexed with ``BM25Index`` and queried for an exact identifier and for a
+common word. No embeddings are computed on this path, so this is the whole
+cost of a ``mode="lexical"`` search apart from HTTP handling.
+"""
+import random
+import sys
+import time
+
+from app.database.lexical import BM25Index
+
+QUERIES = 1000
+N_RESULTS = 10
+WORDS = ["report", "invoice", "draft", "notes", "meeting", "budget", "photo", "backup",
+         "config", "error", "upload", "failed", "review", "final", "summary", "project"]
+
+
+def document(i: int, rng: random.Random) -> str:
+    words = " ".join(rng.choice(WORDS) for _ in range(12))
+    return f"{rng.choice(WORDS)}-{i}.pdf ERR_{i:06d} {words}"
+
+
+def mean_query_ms(index: BM25Index, query: str) -> float:
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        index.search(query, N_RESULTS)
+    return (time.perf_counter() - start) / QUERIES * 1000
+
+
+def main(sizes):
+    rng = random.Random(0)
+    print(f"{'corpus':>8s} {'build':>10s} {'identifier':>12s} {'common word':>13s}")
+    
+    for size in sizes:
+        documents = [document(i, rng) for i in range(size)]
+        index = BM25Index()
+        start = time.perf_counter()
+        for i, text in enumerate(documents):
+            index.add(f"doc_{i}", text)
+        build_s = time.perf_counter() - start
+        
+        identifier_ms = mean_query_ms(index, f"ERR_{size // 2:06d}")
+        common_ms = mean_query_ms(index, "budget")
+        print(f"{size:8d} {build_s:8.2f} s {identifier_ms:9.3f} ms {common_ms:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
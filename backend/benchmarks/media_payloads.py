@@ -0,0 +1,81 @@
+"""Base64-in-JSON vs. binary request paths for a 10 MB audio clip.
+
+Run from the backend directory:
+    
+    python -m benchmarks.media_payloads
+
+The Gemini SDK is replaced with a stub, so only the API's own handling of the
+payload is measured: request parsing, base64 decoding, and handing the bytes to
+the service. Peak memory comes from tracemalloc and is measured separately
+from wall time.
+"""
+import google.generativeai as genai
+import asyncio
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+CLIP_BYTES = 10 * 1024 * 1024
+ROUNDS = 5
+
+
+class _Response:
+    text = "stub transcript"
+
+
+class _StubModel:
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def generate_content(self, *args, **kwargs):
+        return _Response()
+
+
+genai.GenerativeModel = _StubModel
+
+from app.main import app  # noqa: E402  (imported after stubbing the SDK)
+import httpx  # noqa: E402
+
+
+def build_requests(audio: bytes):
+    json_body = json.dumps({"audio_base64": base64.b64encode(audio).decode("ascii"),
+                            "mime_type": "audio/wav", "use_cache": False}).encode("utf-8")
+    return {
+        "json (base64)": dict(url="/api/v1/gemini/transcribe", content=json_body,
+                              headers={"content-type": "application/json"}),
+        "multipart": dict(url="/api/v1/gemini/transcribe/upload",
+                          files={"file": ("clip.wav", audio, "audio/wav")},
+                          data={"use_cache": "false"}),
+        "raw bytes": dict(url="/api/v1/gemini/transcribe/raw?use_cache=false", content=audio,
+                          headers={"content-type": "audio/wav"}),
+    }
+
+
+async def run():
+    audio = os.urandom(CLIP_BYTES)
+    requests = build_requests(audio)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, kwargs in requests.items():
+            response = await client.post(**kwargs)
+            response.raise_for_status()
+            
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                await client.post(**kwargs)
+            elapsed_ms = (time.perf_counter() - start) / ROUNDS * 1000
+            
+            tracemalloc.start()
+            await client.post(**kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            body_bytes = len(kwargs.get("content") or audio)
+            print(f"{name:15s} body {body_bytes / 2**20:6.1f} MB  "
+                  f"{elapsed_ms:8.1f} ms/request  peak {peak / 2**20:6.1f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
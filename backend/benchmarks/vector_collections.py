@@ -0,0 +1,82 @@
+"""Search latency as the corpus grows: one shared collection vs. per-user collections.
+
+Run from the backend directory:
+    
+    python -m benchmarks.vector_collections [SIZE ...]
+
+For each total corpus size the documents are spread over USERS users and
+stored twice in a temporary directory: once in a single collection tagged
+with ``user_id`` metadata (queried with a ``where`` filter, as before), and
+once in one collection per user. Random unit vectors stand in for real
+embeddings, so no model is loaded and only index cost is measured.
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.chdir(tempfile.mkdtemp(prefix="vector-collections-"))
+
+from app.database.vector_db import VectorDBClient, collection_name  # noqa: E402
+import numpy as np  # noqa: E402
+
+USERS = 10
+DIMENSIONS = 384
+QUERIES = 200
+N_RESULTS = 10
+
+
+def vectors(count: int, rng) -> list:
+    data = rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data.tolist()
+
+
+def fill(collection, ids, embeddings, metadatas=None, batch=5000):
+    for start in range(0, len(ids), batch):
+        end = start + batch
+        collection.add(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            metadatas=metadatas[start:end] if metadatas else None
+        )
+
+
+def mean_query_ms(collection, queries, where=None) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        collection.query(query_embeddings=[query], n_results=N_RESULTS, where=where, include=[])
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    client = VectorDBClient()
+    queries = vectors(QUERIES, rng)
+    print(f"{'corpus':>8s} {'shared + where':>16s} {'per-user':>10s}")
+    
+    for size in sizes:
+        embeddings = vectors(size, rng)
+        ids = [f"doc_{i}" for i in range(size)]
+        owners = [f"user{i % USERS}" for i in range(size)]
+        
+        shared = client.create_collection(f"shared_{size}")
+        fill(shared, ids, embeddings, [{"user_id": owner} for owner in owners])
+        
+        user_collections = {}
+        for user in range(USERS):
+            owner = f"user{user}"
+            indexes = [i for i, value in enumerate(owners) if value == owner]
+            collection = client.create_collection(collection_name(f"bench_{size}", owner))
+            fill(collection, [ids[i] for i in indexes], [embeddings[i] for i in indexes])
+            user_collections[owner] = collection
+        
+        shared_ms = mean_query_ms(shared, queries, where={"user_id": "user0"})
+        per_user_ms = mean_query_ms(user_collections["user0"], queries)
+        print(f"{size:8d} {shared_ms:13.2f} ms {per_user_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
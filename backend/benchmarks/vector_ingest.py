@@ -0,0 +1,93 @@
+"""Bulk ingest: one ``collection.add`` call vs. the batched embedding pipeline.
+
+Run from the backend directory:
+    
+    python -m benchmarks.vector_ingest [DOCUMENTS]
+
+Both paths use Chroma's default ONNX embedding model (downloaded on first
+use) and write to throwaway collections in a temporary directory. Besides
+documents per second it reports the longest event-loop stall seen by a 10 ms
+heartbeat, which is what other API requests wait for during an ingest. The
+pipeline is then run twice more with the embedding cache on: once to fill it
+and once re-ingesting the unchanged corpus.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.chdir(tempfile.mkdtemp(prefix="vector-ingest-"))
+
+from app.config.settings import settings  # noqa: E402  (imported inside the temp directory)
+from app.database.embeddings import EmbeddingCache  # noqa: E402
+from app.database.vector_db import vector_db  # noqa: E402
+from app.modules.vector.ingest import IngestPipeline  # noqa: E402
+from app.modules.vector.schemas import VectorDocument  # noqa: E402
+
+WORDS = ("desktop window file folder vector search note image audio settings theme "
+         "terminal browser music video photo calendar mail backup sync user").split()
+
+
+def corpus(count: int):
+    for i in range(count):
+        words = [WORDS[(i * 7 + j * 3) % len(WORDS)] for j in range(40)]
+        yield f"document {i}: " + " ".join(words)
+
+
+async def heartbeat(stalls: list):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - start - 0.01)
+
+
+async def measure(name: str, count: int, ingest):
+    stalls = []
+    beat = asyncio.create_task(heartbeat(stalls))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await ingest()
+    elapsed = time.perf_counter() - start
+    # Let the heartbeat that was blocked by the ingest record its stall
+    await asyncio.sleep(0.02)
+    beat.cancel()
+    stall_ms = max(stalls or [0]) * 1000
+    print(f"{name:34s} {count / elapsed:8.1f} docs/s  max loop stall {stall_ms:8.1f} ms")
+
+
+async def run(count: int):
+    documents = list(corpus(count))
+    embedding_function = vector_db.embedding_function
+    cache = embedding_function.cache
+    embedding_function.cache = None
+    # Load the ONNX model outside the timings
+    vector_db.embed(["warm up"])
+    
+    async def single_add():
+        collection = vector_db.create_collection("bench_single_add")
+        # The old request path: one synchronous add on the event loop
+        collection.add(documents=documents, ids=[f"doc_{i}" for i in range(count)])
+    
+    async def pipeline():
+        ingest = IngestPipeline(
+            vector_db, settings.VECTOR_INGEST_BATCH_SIZE, settings.VECTOR_INGEST_WORKERS
+        )
+        stream = (VectorDocument(document=text) for text in documents)
+        async for _ in ingest.run(stream, "bench_pipeline"):
+            pass
+        ingest.shutdown()
+    
+    await measure("single collection.add", count, single_add)
+    await measure(f"pipeline (batch {settings.VECTOR_INGEST_BATCH_SIZE}, "
+                  f"{settings.VECTOR_INGEST_WORKERS} workers)", count, pipeline)
+    
+    embedding_function.cache = cache or EmbeddingCache(settings.VECTOR_EMBEDDING_CACHE_PATH)
+    await measure("pipeline, cold embedding cache", count, pipeline)
+    await measure("pipeline, unchanged re-ingest", count, pipeline)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
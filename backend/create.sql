@@ -3,6 +3,7 @@
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- ============================================
 -- DESKTOP MODULE
@@ -48,17 +49,27 @@ CREATE TABLE IF NOT EXISTS file_items (
     user_id UUID, -- Optional: for multi-user support
     file_path TEXT, -- Full path to the file
     mime_type VARCHAR(255), -- MIME type for files
+    content_hash CHAR(64), -- SHA-256 of the content; names the blob in the content store
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT file_items_type_check CHECK (type IN ('file', 'directory')),
     CONSTRAINT file_items_size_check CHECK (type = 'directory' OR size IS NOT NULL)
 );
 
+-- Brings databases created before content_hash existed up to date
+ALTER TABLE file_items ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+
 -- Indexes for file_items
 CREATE INDEX IF NOT EXISTS idx_file_items_parent_id ON file_items(parent_id);
 CREATE INDEX IF NOT EXISTS idx_file_items_user_id ON file_items(user_id);
 CREATE INDEX IF NOT EXISTS idx_file_items_type ON file_items(type);
 CREATE INDEX IF NOT EXISTS idx_file_items_name ON file_items(name);
+CREATE INDEX IF NOT EXISTS idx_file_items_content_hash ON file_items(content_hash);
+CREATE INDEX IF NOT EXISTS idx_file_items_mime_type ON file_items(mime_type);
+CREATE INDEX IF NOT EXISTS idx_file_items_size ON file_items(size);
+CREATE INDEX IF NOT EXISTS idx_file_items_date_modified ON file_items(date_modified);
+-- Substring / similarity search on names (name ILIKE '%term%', name % 'term')
+CREATE INDEX IF NOT EXISTS idx_file_items_name_trgm ON file_items USING gin (name gin_trgm_ops);
 
 -- ============================================
 -- SETTINGS MODULE
@@ -152,12 +163,22 @@ CREATE TABLE IF NOT EXISTS gemini_image_generations (
     is_hq BOOLEAN DEFAULT false,
     image_urls TEXT[], -- Array of image URLs
     user_id UUID,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- Background job status
+    error TEXT, -- Failure reason when status = 'failed'
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    CONSTRAINT gemini_image_status_check CHECK (status IN ('queued', 'running', 'succeeded', 'failed'))
 );
 
+-- Job status columns for databases created before background generation jobs
+ALTER TABLE gemini_image_generations ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'queued';
+ALTER TABLE gemini_image_generations ADD COLUMN IF NOT EXISTS error TEXT;
+ALTER TABLE gemini_image_generations ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
 -- Indexes for gemini_image_generations
 CREATE INDEX IF NOT EXISTS idx_gemini_image_user_id ON gemini_image_generations(user_id);
 CREATE INDEX IF NOT EXISTS idx_gemini_image_created_at ON gemini_image_generations(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_gemini_image_status ON gemini_image_generations(status);
 
 -- Gemini Video Generations Table
 -- Stores video generation requests and results
@@ -168,12 +189,22 @@ CREATE TABLE IF NOT EXISTS gemini_video_generations (
     image_base64 TEXT, -- Optional: base64 encoded image
     video_url TEXT,
     user_id UUID,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- Background job status
+    error TEXT, -- Failure reason when status = 'failed'
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    CONSTRAINT gemini_video_status_check CHECK (status IN ('queued', 'running', 'succeeded', 'failed'))
 );
 
+-- Job status columns for databases created before background generation jobs
+ALTER TABLE gemini_video_generations ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'queued';
+ALTER TABLE gemini_video_generations ADD COLUMN IF NOT EXISTS error TEXT;
+ALTER TABLE gemini_video_generations ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
 -- Indexes for gemini_video_generations
 CREATE INDEX IF NOT EXISTS idx_gemini_video_user_id ON gemini_video_generations(user_id);
 CREATE INDEX IF NOT EXISTS idx_gemini_video_created_at ON gemini_video_generations(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_gemini_video_status ON gemini_video_generations(status);
 
 -- Gemini Transcriptions Table
 -- Stores audio transcription requests and results
@@ -0,0 +1,62 @@
+"""Settings for importing app modules under test: placeholder keys, no database writes"""
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+for name in ("GEMINI_JOBS_PERSIST", "GEMINI_CHAT_PERSIST", "FILES_TREE_PERSIST"):
+    os.environ[name] = "false"
+
+from app.database.embeddings import CachedEmbeddingFunction, EmbeddingProvider  # noqa: E402
+from app.database.vector_db import VectorDBClient  # noqa: E402
+from app.modules.files import service as files_service  # noqa: E402
+from app.modules.files.previews import PreviewPipeline  # noqa: E402
+from app.modules.files.storage import ContentStore  # noqa: E402
+from app.modules.files.tree import FileTree  # noqa: E402
+import hashlib  # noqa: E402
+import pytest  # noqa: E402
+
+DIMENSIONS = 32
+
+
+class FakeEmbeddings(EmbeddingProvider):
+    """Bag-of-words vectors: texts sharing words are close, and no model is loaded"""
+    
+    name = "fake"
+    
+    def __init__(self):
+        self.calls = []
+    
+    def embed_documents(self, input):
+        self.calls.append(list(input))
+        vectors = []
+        for text in input:
+            vector = [0.0] * DIMENSIONS
+            for word in text.lower().split():
+                vector[hashlib.sha256(word.encode("utf-8")).digest()[0] % DIMENSIONS] += 1.0
+            vector[0] += 0.01
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture
+def vector_store(tmp_path):
+    """A VectorDBClient on a temporary directory with fake embeddings"""
+    store = VectorDBClient(str(tmp_path / "chroma"))
+    store._embedding_function = CachedEmbeddingFunction(FakeEmbeddings(), None)
+    yield store
+    store._close()
+
+
+@pytest.fixture
+def file_store(tmp_path, monkeypatch):
+    """The files service on a temporary content store and an in-memory tree, without previews"""
+    store = ContentStore(str(tmp_path / "files"), chunk_size=4, upload_expiry=3600)
+    tree = FileTree(persist=False)
+    previews = PreviewPipeline(str(tmp_path / "previews"), workers=1, size=64,
+                               max_bytes=1 << 20, enabled=False)
+    monkeypatch.setattr(files_service, "content_store", store)
+    monkeypatch.setattr(files_service, "file_tree", tree)
+    monkeypatch.setattr(files_service, "preview_pipeline", previews)
+    yield store
+    tree.shutdown()
@@ -0,0 +1,105 @@
+"""BatchRunner: bounded fan-out, per-model caps, completion order and per-job errors"""
+from app.modules.gemini.batch import BatchRunner
+from app.modules.gemini.schemas import BatchRequest, ChatRequest, ImageRequest, TranscribeResponse
+import asyncio
+import pytest
+
+
+class Handler:
+    """Records how many calls overlap; a message of "fail" raises"""
+    
+    def __init__(self, delay: float = 0.02, delays=None):
+        self.delay = delay
+        self.delays = delays or {}
+        self.active = 0
+        self.peak = 0
+    
+    async def __call__(self, request):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            text = getattr(request, "message", None) or getattr(request, "prompt", "")
+            await asyncio.sleep(self.delays.get(text, self.delay))
+            if text == "fail":
+                raise RuntimeError("upstream refused")
+            return TranscribeResponse(text=text)
+        finally:
+            self.active -= 1
+
+
+def make_runner(handler: Handler, **options) -> BatchRunner:
+    config = dict(max_jobs=50, max_concurrency=4, model_limits={}, default_model_limit=10)
+    config.update(options)
+    runner = BatchRunner(**config)
+    runner.HANDLERS = {"chat": (ChatRequest, handler), "image": (ImageRequest, handler)}
+    return runner
+
+
+def chat_jobs(*messages: str):
+    return [{"type": "chat", "payload": {"message": m, "model": "m"}} for m in messages]
+
+
+def collect(runner: BatchRunner, request: BatchRequest):
+    async def run():
+        return [item async for item in runner.run(request)]
+    return asyncio.run(run())
+
+
+def test_concurrency_is_capped_by_the_request_and_the_runner():
+    handler = Handler()
+    collect(make_runner(handler), BatchRequest(jobs=chat_jobs(*"abcdefgh"), concurrency=2))
+    assert handler.peak == 2
+    
+    handler = Handler()
+    collect(make_runner(handler), BatchRequest(jobs=chat_jobs(*"abcdefgh"), concurrency=100))
+    assert handler.peak == 4
+
+
+def test_each_model_has_its_own_cap():
+    handler = Handler()
+    runner = make_runner(handler, model_limits={"m": 1})
+    collect(runner, BatchRequest(jobs=chat_jobs(*"abcd")))
+    assert handler.peak == 1
+
+
+def test_results_arrive_in_completion_order_with_errors_inline():
+    handler = Handler(delays={"slow": 0.2})
+    jobs = chat_jobs("slow", "fail", "fast")
+    jobs[0]["id"] = "first"
+    items = collect(make_runner(handler), BatchRequest(jobs=jobs))
+    
+    assert [item.index for item in items][-1] == 0
+    by_index = {item.index: item for item in items}
+    assert by_index[0].id == "first" and by_index[0].result["text"] == "slow"
+    assert by_index[1].status == "error" and by_index[1].error == "upstream refused"
+    assert by_index[2].id == "2" and by_index[2].status == "ok"
+
+
+def test_invalid_payloads_fail_only_their_job():
+    handler = Handler()
+    jobs = chat_jobs("ok") + [{"type": "image", "payload": {}}]
+    items = sorted(collect(make_runner(handler), BatchRequest(jobs=jobs)), key=lambda i: i.index)
+    assert [item.status for item in items] == ["ok", "error"]
+
+
+def test_oversized_batches_are_refused():
+    with pytest.raises(ValueError):
+        collect(make_runner(Handler(), max_jobs=2), BatchRequest(jobs=chat_jobs(*"abc")))
+
+
+def test_closing_the_stream_cancels_unfinished_jobs():
+    handler = Handler(delay=10)
+    
+    async def scenario():
+        runner = make_runner(handler)
+        stream = runner.run(BatchRequest(jobs=chat_jobs("a", "b")))
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        assert handler.active == 2
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return handler.active
+    
+    assert asyncio.run(scenario()) == 0
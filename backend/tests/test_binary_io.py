@@ -0,0 +1,107 @@
+"""Binary Gemini routes: raw/multipart audio uploads under a size cap, WAV/PCM and PNG bodies"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.config.settings import settings
+from app.modules.gemini import controller
+from app.modules.gemini.schemas import TranscribeResponse
+from app.modules.gemini.service import TTS_SAMPLE_RATE
+from app.shared.exceptions import PayloadTooLargeError
+import asyncio
+import pytest
+import struct
+
+
+class FakeService:
+    def __init__(self):
+        self.transcribed = []
+    
+    async def transcribe_bytes(self, audio_data, mime_type, use_cache=True):
+        self.transcribed.append((audio_data, mime_type, use_cache))
+        return TranscribeResponse(text=f"{len(audio_data)} bytes")
+    
+    async def synthesize_speech(self, text, use_cache=True):
+        return b"\x01\x00" * 8
+    
+    async def generate_image_bytes(self, request):
+        return "image/png", b"\x89PNG fake"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeService()
+    monkeypatch.setattr(controller, "gemini_service", fake)
+    monkeypatch.setattr(settings, "GEMINI_MAX_AUDIO_BYTES", 1000)
+    return fake
+
+
+@pytest.fixture
+def client(service):
+    app = FastAPI()
+    app.include_router(controller.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_raw_audio_is_passed_through_as_bytes(client, service):
+    response = client.post("/transcribe/raw?use_cache=false", content=b"\x00" * 600,
+                           headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 200
+    assert service.transcribed == [(b"\x00" * 600, "audio/wav", False)]
+
+
+def test_oversized_audio_is_refused(client, service):
+    response = client.post("/transcribe/raw", content=b"\x00" * 1001)
+    assert response.status_code == 413
+    
+    def chunked():
+        for _ in range(10):
+            yield b"\x00" * 200
+    
+    # Without a Content-Length the cap applies while reading
+    response = client.post("/transcribe/raw", content=chunked())
+    assert response.status_code == 413
+    
+    response = client.post("/transcribe/upload", files={"file": ("a.mp3", b"\x00" * 1001)})
+    assert response.status_code == 413
+    assert service.transcribed == []
+
+
+def test_multipart_audio_uses_the_form_mime_type(client, service):
+    response = client.post("/transcribe/upload", files={"file": ("a.ogg", b"\x00" * 10)},
+                           data={"mime_type": "audio/ogg"})
+    assert response.json()["text"] == "10 bytes"
+    assert service.transcribed == [(b"\x00" * 10, "audio/ogg", True)]
+
+
+def test_read_audio_stops_at_the_first_chunk_past_the_cap(service):
+    consumed = []
+    
+    async def chunks():
+        for i in range(5):
+            consumed.append(i)
+            yield b"\x00" * 400
+    
+    with pytest.raises(PayloadTooLargeError):
+        asyncio.run(controller._read_audio(chunks()))
+    assert consumed == [0, 1, 2]
+
+
+def test_speech_is_returned_as_wav_or_pcm(client):
+    wav = client.post("/tts/audio", json={"text": "hi"})
+    assert wav.headers["content-type"] == "audio/wav"
+    assert wav.content[:4] == b"RIFF" and wav.content[8:12] == b"WAVE"
+    assert struct.unpack("<I", wav.content[24:28])[0] == TTS_SAMPLE_RATE
+    assert struct.unpack("<I", wav.content[40:44])[0] == 16
+    assert int(wav.headers["content-length"]) == 44 + 16
+    
+    pcm = client.post("/tts/audio?format=pcm", json={"text": "hi"})
+    assert pcm.content == b"\x01\x00" * 8
+    assert pcm.headers["content-type"].startswith("audio/pcm")
+    
+    assert client.post("/tts/audio?format=mp3", json={"text": "hi"}).status_code == 400
+
+
+def test_images_can_be_fetched_as_raw_bytes(client):
+    response = client.post("/image/png", json={"prompt": "a cat"})
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == b"\x89PNG fake"
@@ -0,0 +1,99 @@
+"""ResponseCache: content-addressed keys, memory and disk tiers, TTLs and eviction"""
+from app.modules.gemini import cache
+from app.modules.gemini.cache import ResponseCache
+import asyncio
+import os
+
+
+def make_cache(tmp_path, **options) -> ResponseCache:
+    config = dict(enabled=True, directory=str(tmp_path / "cache"), memory_max_bytes=1024,
+                  disk_max_bytes=4096, ttls={"tts": 60, "image": 0})
+    config.update(options)
+    return ResponseCache(**config)
+
+
+class Upstream:
+    def __init__(self, value: bytes = b"audio"):
+        self.value = value
+        self.calls = 0
+    
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        return self.value
+
+
+def fetch(response_cache: ResponseCache, key: str, upstream: Upstream, endpoint: str = "tts",
+          use_cache: bool = True) -> bytes:
+    return asyncio.run(response_cache.get_or_compute(endpoint, key, upstream, use_cache))
+
+
+def test_keys_cover_model_config_and_every_input():
+    key = ResponseCache.key("tts", "model", {"voice": "Kore"}, "hello")
+    assert key == ResponseCache.key("tts", "model", {"voice": "Kore"}, "hello")
+    assert key != ResponseCache.key("tts", "model", {"voice": "Puck"}, "hello")
+    assert key != ResponseCache.key("tts", "other", {"voice": "Kore"}, "hello")
+    key = ResponseCache.key
+    assert key("t", "m", None, "ab", "c") != key("t", "m", None, "a", "bc")
+    assert key("t", "m", None, b"\x00") != key("t", "m", None, b"\x00\x00")
+
+
+def test_repeat_requests_are_served_from_memory_then_disk(tmp_path):
+    upstream = Upstream()
+    first = make_cache(tmp_path)
+    assert fetch(first, "k" * 64, upstream) == b"audio"
+    assert fetch(first, "k" * 64, upstream) == b"audio"
+    assert first.metrics()["endpoints"]["tts"] == {"memory_hits": 1, "disk_hits": 0, "misses": 1}
+    
+    # A fresh process finds the response on disk
+    second = make_cache(tmp_path)
+    assert fetch(second, "k" * 64, upstream) == b"audio"
+    assert second.metrics()["endpoints"]["tts"]["disk_hits"] == 1
+    assert upstream.calls == 1
+
+
+def test_uncached_endpoints_and_fresh_requests_skip_the_cache(tmp_path):
+    upstream = Upstream()
+    response_cache = make_cache(tmp_path)
+    for _ in range(2):
+        fetch(response_cache, "a" * 64, upstream, endpoint="image")
+        fetch(response_cache, "b" * 64, upstream, use_cache=False)
+    assert upstream.calls == 4
+    assert not os.path.exists(tmp_path / "cache")
+
+
+def test_expired_entries_are_recomputed(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    upstream = Upstream()
+    response_cache = make_cache(tmp_path)
+    fetch(response_cache, "c" * 64, upstream)
+    os.utime(response_cache._path("c" * 64), (now[0], now[0]))
+    now[0] += 61
+    fetch(response_cache, "c" * 64, upstream)
+    assert upstream.calls == 2
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    response_cache = make_cache(tmp_path, memory_max_bytes=250)
+    for key in ("a", "b", "c"):
+        fetch(response_cache, key * 64, Upstream(key.encode() * 100))
+    assert response_cache.metrics()["memory_entries"] == 2
+    assert response_cache._memory_get("a" * 64) is None
+    assert response_cache._memory_get("c" * 64) == b"c" * 100
+
+
+def test_disk_tier_is_trimmed_to_its_budget(tmp_path):
+    response_cache = make_cache(tmp_path, disk_max_bytes=1000, memory_max_bytes=0)
+    for i in range(6):
+        fetch(response_cache, f"{i:064d}", Upstream(bytes(300)))
+    assert response_cache.metrics()["disk_bytes"] <= 900
+    # The newest response survives
+    assert response_cache._disk_get(f"{5:064d}", 60) == bytes(300)
+
+
+def test_a_disabled_cache_always_computes(tmp_path):
+    upstream = Upstream()
+    response_cache = make_cache(tmp_path, enabled=False)
+    fetch(response_cache, "d" * 64, upstream)
+    fetch(response_cache, "d" * 64, upstream)
+    assert upstream.calls == 2
@@ -0,0 +1,110 @@
+"""Streaming chat: chunk/done/error frames from GeminiService.chat_stream and the SSE route"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.modules.gemini import controller
+from app.modules.gemini import service as service_module
+from app.modules.gemini.schemas import ChatRequest
+from app.modules.gemini.sessions import ChatSessionStore
+import asyncio
+import json
+import pytest
+
+
+class Chunk:
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = []
+        self.usage_metadata = None
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = history
+    
+    def send_message(self, message, stream=False):
+        self.model.sent.append((message, self.history))
+        if self.model.error:
+            raise self.model.error
+        return iter([Chunk(part) for part in self.model.reply])
+
+
+class FakeModel:
+    def __init__(self):
+        self.reply = ["Hel", "lo", " there"]
+        self.error = None
+        self.sent = []
+    
+    def start_chat(self, history):
+        return FakeChat(self, history)
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.model = FakeModel()
+    
+    def get(self, name):
+        return self.model
+
+
+@pytest.fixture
+def model(monkeypatch):
+    registry = FakeRegistry()
+    monkeypatch.setattr(service_module, "model_registry", registry)
+    sessions = ChatSessionStore(max_bytes=1 << 20, history_window=20,
+                                history_max_chars=10000, persist=False)
+    monkeypatch.setattr(service_module, "chat_sessions", sessions)
+    return registry.model
+
+
+def frames(request: ChatRequest):
+    async def collect():
+        return [frame async for frame in service_module.gemini_service.chat_stream(request)]
+    return asyncio.run(collect())
+
+
+def test_stream_yields_chunks_then_done(model):
+    result = frames(ChatRequest(message="hi", model="gemini-2.5-flash-lite"))
+    assert [f["type"] for f in result] == ["chunk", "chunk", "chunk", "done"]
+    assert "".join(f["text"] for f in result[:-1]) == "Hello there"
+    assert result[-1]["session_id"] is None
+
+
+def test_stream_records_the_turn_in_its_session(model):
+    async def scenario():
+        session = await service_module.chat_sessions.create("gemini-2.5-flash-lite")
+        request = ChatRequest(message="hi", session_id=session.id)
+        first = [f async for f in service_module.gemini_service.chat_stream(request)]
+        second = [f async for f in service_module.gemini_service.chat_stream(request)]
+        return session, first, second
+    
+    session, first, second = asyncio.run(scenario())
+    assert first[-1]["session_id"] == session.id
+    assert [(m.role, m.text) for m in session.messages] == [
+        ("user", "hi"), ("model", "Hello there"), ("user", "hi"), ("model", "Hello there"),
+    ]
+    # The second turn is sent the first as history, not the client's copy
+    assert [m["parts"] for m in model.sent[1][1]] == [["hi"], ["Hello there"]]
+
+
+def test_stream_reports_failures_as_an_error_frame(model):
+    model.error = RuntimeError("upstream down")
+    result = frames(ChatRequest(message="hi", model="gemini-2.5-flash-lite"))
+    assert result == [{"type": "error", "detail": "upstream down", "status_code": 500}]
+
+
+def test_unknown_session_is_an_error_frame(model):
+    result = frames(ChatRequest(message="hi", session_id="missing"))
+    assert result[0]["type"] == "error"
+    assert result[0]["status_code"] == 404
+
+
+def test_sse_route_sends_one_event_per_frame(model):
+    app = FastAPI()
+    app.include_router(controller.router)
+    with TestClient(app) as client:
+        response = client.post("/chat/stream", json={"message": "hi"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [event[0] for event in events] == ["event: chunk"] * 3 + ["event: done"]
+    assert json.loads(events[0][1][len("data: "):]) == {"type": "chunk", "text": "Hel"}
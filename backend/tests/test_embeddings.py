@@ -0,0 +1,75 @@
+"""CachedEmbeddingFunction and EmbeddingCache: only unseen texts reach the model"""
+from app.config.settings import settings
+from app.database.embeddings import (
+    CachedEmbeddingFunction, EmbeddingCache, EmbeddingProvider, create_embedding_function
+)
+import pytest
+
+
+class CountingProvider(EmbeddingProvider):
+    """Vectors derived from text length; queries are embedded differently from documents"""
+    
+    def __init__(self, name: str = "counting"):
+        self.name = name
+        self.documents = []
+        self.queries = []
+    
+    def embed_documents(self, input):
+        self.documents.append(list(input))
+        return [[float(len(text)), 0.5] for text in input]
+    
+    def embed_queries(self, input):
+        self.queries.append(list(input))
+        return [[float(len(text)), -0.5] for text in input]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+
+
+def test_only_unseen_texts_are_embedded(cache):
+    provider = CountingProvider()
+    embed = CachedEmbeddingFunction(provider, cache)
+    assert embed(["a", "bb", "a"]) == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert embed(["bb", "ccc"]) == [[2.0, 0.5], [3.0, 0.5]]
+    # Duplicates within a call are embedded once
+    assert provider.documents == [["a", "bb"], ["ccc"]]
+    assert embed.metrics()["hits"] == 2
+    assert embed.metrics()["misses"] == 3
+
+
+def test_vectors_survive_a_restart(tmp_path, cache):
+    CachedEmbeddingFunction(CountingProvider(), cache)(["persisted"])
+    provider = CountingProvider()
+    reopened = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    assert CachedEmbeddingFunction(provider, reopened)(["persisted"]) == [[9.0, 0.5]]
+    assert provider.documents == []
+    assert reopened.count() == 1
+
+
+def test_queries_and_other_models_never_share_vectors(cache):
+    provider = CountingProvider()
+    embed = CachedEmbeddingFunction(provider, cache)
+    embed(["text"])
+    assert embed.embed_queries(["text"]) == [[4.0, -0.5]]
+    assert provider.queries == [["text"]]
+    
+    other = CountingProvider("other-model")
+    CachedEmbeddingFunction(other, cache)(["text"])
+    assert other.documents == [["text"]]
+
+
+def test_without_a_cache_every_call_reaches_the_model():
+    provider = CountingProvider()
+    embed = CachedEmbeddingFunction(provider, None)
+    embed(["a"])
+    embed(["a"])
+    assert provider.documents == [["a"], ["a"]]
+    assert embed.metrics()["cache_enabled"] is False
+
+
+def test_unknown_providers_are_refused(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_EMBEDDING_PROVIDER", "nope")
+    with pytest.raises(ValueError):
+        create_embedding_function()
@@ -0,0 +1,115 @@
+"""GeminiExecutor: per-endpoint limits, metrics and streamed iteration off the event loop"""
+from app.modules.gemini.executor import GeminiExecutor
+import asyncio
+import pytest
+import threading
+import time
+
+
+@pytest.fixture
+def executor():
+    executor = GeminiExecutor(max_workers=4, endpoint_limits={"chat": 1})
+    yield executor
+    executor.shutdown()
+
+
+def test_calls_run_off_the_event_loop(executor):
+    async def scenario():
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        
+        task = asyncio.create_task(ticker())
+        def slow():
+            time.sleep(0.2)
+            return threading.current_thread().name
+        
+        result = await executor.run("generate", slow)
+        task.cancel()
+        return result, ticks
+    
+    thread, ticks = asyncio.run(scenario())
+    assert thread.startswith("gemini")
+    # The loop kept running while the call blocked its worker thread
+    assert ticks >= 5
+
+
+def test_endpoint_limit_queues_callers(executor):
+    release = threading.Event()
+    
+    async def scenario():
+        first = asyncio.create_task(executor.run("chat", release.wait, 5))
+        second = asyncio.create_task(executor.run("chat", lambda: "second"))
+        other = await executor.run("generate", lambda: "other")
+        await asyncio.sleep(0.05)
+        metrics = executor.metrics()
+        release.set()
+        return other, metrics, await first, await second
+    
+    other, metrics, first, second = asyncio.run(scenario())
+    # A saturated endpoint doesn't hold up a different one
+    assert other == "other"
+    assert metrics["endpoints"]["chat"] == {
+        "limit": 1, "queued": 1, "in_flight": 1, "completed": 0, "failed": 0,
+    }
+    assert metrics["endpoints"]["generate"]["limit"] == 4
+    assert (first, second) == (True, "second")
+    assert executor.metrics()["endpoints"]["chat"]["completed"] == 2
+
+
+def test_failures_are_counted_and_raised(executor):
+    def fail():
+        raise RuntimeError("boom")
+    
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(executor.run("chat", fail))
+    stats = executor.metrics()["endpoints"]["chat"]
+    assert (stats["failed"], stats["in_flight"]) == (1, 0)
+
+
+def test_stream_yields_items_and_surfaces_errors(executor):
+    def tokens():
+        yield "a"
+        yield "b"
+        raise ValueError("cut off")
+    
+    async def scenario():
+        received = []
+        with pytest.raises(ValueError, match="cut off"):
+            async for item in executor.stream("chat", tokens):
+                received.append(item)
+        return received
+    
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert executor.metrics()["endpoints"]["chat"]["failed"] == 1
+
+
+def test_closing_a_stream_stops_the_upstream_iterator(executor):
+    produced = []
+    closed = threading.Event()
+    
+    def tokens():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                time.sleep(0.005)
+                yield i
+        finally:
+            closed.set()
+    
+    async def scenario():
+        stream = executor.stream("chat", tokens)
+        first = await stream.__anext__()
+        await stream.aclose()
+        assert await asyncio.to_thread(closed.wait, 2)
+        await asyncio.sleep(0.05)
+        return first
+    
+    assert asyncio.run(scenario()) == 0
+    assert len(produced) < 1000
+    # The slot is given back once the worker returns
+    assert executor.metrics()["endpoints"]["chat"]["in_flight"] == 0
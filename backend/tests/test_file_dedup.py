@@ -0,0 +1,81 @@
+"""Deduplicated uploads: one blob per content, dropped with the last file referencing it"""
+from app.modules.files.schemas import HashUploadRequest
+from app.modules.files.service import file_service
+from app.modules.files.tree import DRIVE_ID
+from app.shared.exceptions import NotFoundError
+import asyncio
+import hashlib
+import os
+import pytest
+import time
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def upload(name: str, data: bytes):
+    return asyncio.run(file_service.upload_file(name, stream(data), DRIVE_ID))
+
+
+def test_identical_uploads_share_one_blob(file_store):
+    first = upload("a.txt", b"same bytes")
+    second = upload("b.txt", b"same bytes")
+    assert (first.deduplicated, second.deduplicated) == (False, True)
+    assert first.sha256 == second.sha256
+    
+    usage = asyncio.run(file_service.storage_usage())
+    assert (usage.files, usage.blobs) == (2, 1)
+    assert (usage.logical_bytes, usage.stored_bytes) == (20, 10)
+
+
+def test_the_blob_goes_with_its_last_file(file_store):
+    first = upload("a.txt", b"shared")
+    second = upload("b.txt", b"shared")
+    assert asyncio.run(file_service.delete_file(first.file_id))
+    assert file_store.exists(first.sha256)
+    assert asyncio.run(file_service.delete_file(second.file_id))
+    assert not file_store.exists(first.sha256)
+    assert not file_store.is_pinned(first.sha256)
+
+
+def test_upload_by_hash_adds_a_reference_without_the_bytes(file_store):
+    original = upload("a.txt", b"known content")
+    request = HashUploadRequest(sha256=original.sha256.upper(), filename="copy.txt",
+                                parent_id=DRIVE_ID)
+    copy = asyncio.run(file_service.upload_by_hash(request))
+    assert copy.deduplicated and copy.size == len(b"known content")
+    
+    asyncio.run(file_service.delete_file(original.file_id))
+    assert file_store.exists(original.sha256)
+    
+    missing = HashUploadRequest(sha256=hashlib.sha256(b"never").hexdigest(), filename="x",
+                                parent_id=DRIVE_ID)
+    with pytest.raises(NotFoundError):
+        asyncio.run(file_service.upload_by_hash(missing))
+
+
+def test_probing_does_not_touch_the_blob(file_store):
+    stored = upload("a.txt", b"probe me")
+    path = file_store.path(stored.sha256)
+    old = time.time() - 7200
+    os.utime(path, (old, old))
+    
+    assert asyncio.run(file_service.has_blob(stored.sha256))
+    assert not asyncio.run(file_service.has_blob(hashlib.sha256(b"other").hexdigest()))
+    assert os.path.getmtime(path) == pytest.approx(old)
+
+
+def test_garbage_collection_spares_referenced_blobs(file_store):
+    kept = upload("kept.txt", b"referenced")
+    orphan = asyncio.run(file_store.put(stream(b"orphaned")))
+    file_store.unpin(orphan.sha256)
+    old = time.time() - 7200
+    for sha256 in (kept.sha256, orphan.sha256):
+        os.utime(file_store.path(sha256), (old, old))
+    
+    result = asyncio.run(file_service.collect_garbage())
+    assert (result.deleted, result.freed_bytes) == (1, len(b"orphaned"))
+    assert file_store.exists(kept.sha256)
+    assert not file_store.exists(orphan.sha256)
@@ -0,0 +1,66 @@
+"""FileIndex on its own: postings survive removals and compaction"""
+from app.modules.files import search
+from app.modules.files.schemas import FileSearchRequest
+from app.modules.files.search import FileIndex
+from app.modules.files.tree import DRIVE_ID, FileNode
+from datetime import datetime, timezone
+
+
+def node(node_id: str, name: str, **fields) -> FileNode:
+    fields.setdefault("date_modified", "2024-05-10T12:00:00+00:00")
+    return FileNode(node_id, name, "file", DRIVE_ID, **fields)
+
+
+def ids(index: FileIndex, **request):
+    nodes, _ = index.search(FileSearchRequest(**request))
+    return [found.id for found in nodes]
+
+
+def test_substring_matches_inside_words():
+    index = FileIndex()
+    index.add(node("1", "budget-2024.xlsx"))
+    index.add(node("2", "notes.txt"))
+    assert ids(index, query="dget-20") == ["1"]
+    assert ids(index, query="BUDGET") == ["1"]
+    assert ids(index, query="missing") == []
+
+
+def test_fuzzy_tolerates_typos():
+    index = FileIndex()
+    index.add(node("1", "invoice march.pdf"))
+    index.add(node("2", "invitation.pdf"))
+    assert ids(index, query="invoise", match="fuzzy") == ["1"]
+
+
+def test_date_filters():
+    index = FileIndex()
+    index.add(node("old", "a.txt", date_modified="2023-01-15T00:00:00+00:00"))
+    index.add(node("new", "b.txt", date_modified="2024-06-01T00:00:00+00:00"))
+    after = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert ids(index, modified_after=after) == ["new"]
+    assert ids(index, modified_before=after) == ["old"]
+
+
+def test_update_replaces_the_old_terms():
+    index = FileIndex()
+    renamed = node("1", "draft.txt")
+    index.add(renamed)
+    renamed.name = "final.txt"
+    index.update(renamed)
+    assert ids(index, query="draft") == []
+    assert ids(index, query="final") == ["1"]
+    assert len(index) == 1
+
+
+def test_compaction_keeps_live_items(monkeypatch):
+    monkeypatch.setattr(search, "COMPACT_AFTER", 2)
+    index = FileIndex()
+    for i in range(10):
+        index.add(node(str(i), f"report {i}.txt"))
+    for i in range(7):
+        index.remove(str(i))
+    # Dead slots outnumbered live ones, so the postings were rebuilt
+    assert len(index._slots) < 10
+    assert sorted(ids(index, query="report")) == ["7", "8", "9"]
+    index.remove("missing")
+    assert len(index) == 3
@@ -0,0 +1,120 @@
+"""In-memory file tree: cursor paging, subtree moves and deletes, and name search"""
+from app.modules.files.schemas import FileSearchRequest
+from app.modules.files.tree import DRIVE_ID, FileTree, encode_cursor
+from app.shared.exceptions import NotFoundError, ValidationError
+import pytest
+
+
+@pytest.fixture
+def tree():
+    tree = FileTree(persist=False)
+    yield tree
+    tree.shutdown()
+
+
+def list_all(tree: FileTree, parent_id: str, limit: int):
+    names, cursor = [], None
+    while True:
+        page, cursor = tree.list(parent_id, limit, cursor)
+        names.extend(node.name for node in page)
+        if cursor is None:
+            return names
+
+
+def test_pages_cover_a_folder_once_folders_first(tree):
+    for i in range(23):
+        tree.add(f"File {i:02d}.txt", "file", DRIVE_ID, size=i)
+    tree.add("zeta", "folder", DRIVE_ID)
+    tree.add("Alpha", "folder", DRIVE_ID)
+    
+    names = list_all(tree, DRIVE_ID, limit=10)
+    assert names[:2] == ["Alpha", "zeta"]
+    assert names[2:] == [f"File {i:02d}.txt" for i in range(23)]
+
+
+def test_exact_last_page_has_no_cursor(tree):
+    for i in range(10):
+        tree.add(f"{i}.txt", "file", DRIVE_ID)
+    page, cursor = tree.list(DRIVE_ID, 10)
+    assert len(page) == 10
+    assert cursor is None
+
+
+def test_cursor_survives_changes_before_it(tree):
+    nodes = [tree.add(f"{i:02d}.txt", "file", DRIVE_ID) for i in range(20)]
+    first, cursor = tree.list(DRIVE_ID, 5)
+    tree.remove(nodes[0].id)
+    tree.add("00a.txt", "file", DRIVE_ID)
+    rest, _ = tree.list(DRIVE_ID, 100, cursor)
+    assert [node.name for node in first + rest] == [f"{i:02d}.txt" for i in range(20)]
+
+
+def test_cursor_still_works_after_its_item_is_deleted(tree):
+    nodes = [tree.add(f"{i:02d}.txt", "file", DRIVE_ID) for i in range(6)]
+    _, cursor = tree.list(DRIVE_ID, 3)
+    tree.remove(nodes[2].id)
+    rest, _ = tree.list(DRIVE_ID, 100, cursor)
+    assert [node.name for node in rest] == ["03.txt", "04.txt", "05.txt"]
+
+
+def test_bad_cursor_and_parent(tree):
+    with pytest.raises(ValidationError):
+        tree.list(DRIVE_ID, 10, "not a cursor")
+    with pytest.raises(NotFoundError):
+        tree.list("missing", 10)
+    # A well-formed cursor past the end is just an empty page
+    assert tree.list(DRIVE_ID, 10, encode_cursor((9, "", ""))) == ([], None)
+
+
+def test_move_and_delete_carry_the_subtree(tree):
+    docs = tree.add("docs", "folder", DRIVE_ID)
+    inner = tree.add("inner", "folder", docs.id)
+    note = tree.add("note.txt", "file", inner.id, size=5, sha256="abc")
+    archive = tree.add("archive", "folder", DRIVE_ID)
+    
+    tree.move(docs.id, archive.id)
+    assert list_all(tree, archive.id, 10) == ["docs"]
+    assert list_all(tree, DRIVE_ID, 10) == ["archive"]
+    with pytest.raises(ValidationError):
+        tree.move(archive.id, inner.id)
+    
+    removed = tree.remove(archive.id)
+    assert {node.id for node in removed} == {archive.id, docs.id, inner.id, note.id}
+    assert tree.references("abc") == 0
+    with pytest.raises(NotFoundError):
+        tree.get(note.id)
+
+
+def test_search_follows_moves_and_deletes(tree):
+    docs = tree.add("docs", "folder", DRIVE_ID)
+    report = tree.add("Quarterly Report.pdf", "file", docs.id, mime_type="application/pdf")
+    tree.add("holiday photo.jpg", "file", DRIVE_ID, size=2048, mime_type="image/jpeg")
+    
+    def names(**request):
+        nodes, total = tree.search(FileSearchRequest(**request))
+        assert total == len(nodes)
+        return [node.name for node in nodes]
+    
+    assert names(query="report") == ["Quarterly Report.pdf"]
+    assert names(query="quart", match="prefix") == ["Quarterly Report.pdf"]
+    assert names(query="repotr", match="fuzzy") == ["Quarterly Report.pdf"]
+    assert names(mime_type="image/*") == ["holiday photo.jpg"]
+    assert names(type="folder") == ["docs"]
+    assert names(min_size=1024, max_size=4096) == ["holiday photo.jpg"]
+    assert names(query="report", parent_id=docs.id) == ["Quarterly Report.pdf"]
+    
+    tree.move(report.id, DRIVE_ID, name="Annual summary.pdf")
+    assert names(query="report") == []
+    assert names(query="summary") == ["Annual summary.pdf"]
+    assert names(query="summary", parent_id=docs.id) == []
+    
+    tree.remove(report.id)
+    assert names(query="summary") == []
+
+
+def test_search_pages(tree):
+    for i in range(12):
+        tree.add(f"log {i:02d}.txt", "file", DRIVE_ID)
+    nodes, total = tree.search(FileSearchRequest(query="log", limit=5, offset=10))
+    assert total == 12
+    assert len(nodes) == 2
@@ -0,0 +1,68 @@
+"""Upload routes: streamed multipart uploads and resumable uploads written straight to disk"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.modules.files import controller
+from app.modules.files.tree import DRIVE_ID
+import hashlib
+import os
+import pytest
+
+
+@pytest.fixture
+def client(file_store):
+    app = FastAPI()
+    app.include_router(controller.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_multipart_upload_lands_in_the_store(client, file_store):
+    data = os.urandom(1000)
+    response = client.post("/upload", files={"file": ("notes.bin", data, "application/x-test")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert body["size"] == 1000
+    
+    with open(file_store.path(body["sha256"]), "rb") as file:
+        assert file.read() == data
+    listed = client.get("/", params={"parent_id": DRIVE_ID}).json()["files"]
+    assert [f["name"] for f in listed] == ["notes.bin"]
+    assert client.get(f"/{body['file_id']}/content").content == data
+
+
+def test_upload_into_a_missing_folder_is_refused(client, file_store):
+    response = client.post("/upload", params={"parent_id": "nowhere"},
+                           files={"file": ("a.txt", b"abc")})
+    assert response.status_code == 404
+    assert file_store.usage() == (0, 0)
+
+
+def test_resumable_upload_continues_from_the_reported_offset(client, file_store):
+    data = b"0123456789abcdef"
+    upload = client.post("/uploads", json={"filename": "big.bin", "size": len(data)}).json()
+    upload_id = upload["upload_id"]
+    
+    first = client.patch(f"/uploads/{upload_id}", content=data[:6], headers={"Upload-Offset": "0"})
+    assert first.json()["offset"] == 6
+    # A retry of the same part is refused; the client resumes from the server's offset
+    stale = client.patch(f"/uploads/{upload_id}", content=data[:6], headers={"Upload-Offset": "0"})
+    assert stale.status_code == 409
+    offset = client.get(f"/uploads/{upload_id}").json()["offset"]
+    client.patch(f"/uploads/{upload_id}", content=data[offset:],
+                 headers={"Upload-Offset": str(offset)})
+    
+    digest = hashlib.sha256(data).hexdigest()
+    done = client.post(f"/uploads/{upload_id}/complete", json={"sha256": digest})
+    assert done.status_code == 200
+    assert done.json()["size"] == len(data)
+    assert client.get(f"/{done.json()['file_id']}/content").content == data
+    assert client.get(f"/uploads/{upload_id}").status_code == 404
+
+
+def test_aborted_uploads_leave_nothing_behind(client, file_store):
+    upload_id = client.post("/uploads", json={"filename": "x.bin"}).json()["upload_id"]
+    client.patch(f"/uploads/{upload_id}", content=b"partial", headers={"Upload-Offset": "0"})
+    assert client.delete(f"/uploads/{upload_id}").status_code == 200
+    assert client.get(f"/uploads/{upload_id}").status_code == 404
+    assert os.listdir(file_store.uploads_dir) == []
@@ -0,0 +1,65 @@
+"""Chunking of indexed text files"""
+from app.modules.files.indexing import chunk_text, read_chunks, read_text
+import asyncio
+import itertools
+
+TEXT = " ".join(f"word{i}" for i in range(500))
+
+
+def test_chunks_fit_and_overlap():
+    chunks = list(chunk_text([TEXT], size=100, overlap=20))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        # Consecutive chunks share text, and cuts fall between words
+        assert previous[-10:] in current[:40]
+        assert previous.split()[-1] in TEXT.split()
+    # Every word appears whole in some chunk
+    words = set(" ".join(chunks).split())
+    assert set(TEXT.split()) <= words
+
+
+def test_block_boundaries_do_not_change_the_chunks():
+    whole = list(chunk_text([TEXT], size=100, overlap=20))
+    assert list(chunk_text(list(TEXT), size=100, overlap=20)) == whole
+    assert list(chunk_text([TEXT[:333], TEXT[333:]], size=100, overlap=20)) == whole
+
+
+def test_words_longer_than_a_chunk_are_split():
+    chunks = list(chunk_text(["x" * 250], size=100, overlap=0))
+    assert chunks == ["x" * 100, "x" * 100, "x" * 50]
+
+
+def test_overlap_is_capped_below_half_a_chunk():
+    chunks = list(chunk_text(["x" * 300], size=100, overlap=500))
+    # Each cut moves on 51 characters: a 49 character overlap
+    assert [len(chunk) for chunk in chunks] == [100, 100, 100, 100, 96]
+
+
+def test_cut_at_half_a_chunk_still_moves_forward():
+    text = "a" * 500 + " " + "b" * 600
+    chunks = list(itertools.islice(chunk_text([text], size=1001, overlap=500), 10))
+    assert len(chunks) < 10
+    assert chunks[0] == "a" * 500
+    assert chunks[-1].endswith("b" * 100)
+
+
+def test_blank_text_has_no_chunks():
+    assert list(chunk_text(["", "   \n  "], size=100, overlap=20)) == []
+
+
+def test_read_text_drops_undecodable_bytes_and_keeps_split_characters(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes("café ".encode("utf-8") * 30000 + b"\xff end")
+    text = "".join(read_text(str(path)))
+    assert text == "café " * 30000 + " end"
+
+
+def test_read_chunks_matches_chunk_text(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text(TEXT)
+    
+    async def collect():
+        return [chunk async for chunk in read_chunks(str(path), 100, 20)]
+    
+    assert asyncio.run(collect()) == list(chunk_text([TEXT], size=100, overlap=20))
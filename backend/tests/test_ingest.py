@@ -0,0 +1,61 @@
+"""IngestPipeline: NDJSON/text parsing, batched embedding and skipping unchanged documents"""
+from app.modules.vector.ingest import IngestPipeline, ndjson_documents, text_documents
+from app.modules.vector.schemas import VectorDocument
+import asyncio
+import pytest
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def collect(stream):
+    async def run():
+        return [item async for item in stream]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def pipeline(vector_store):
+    pipeline = IngestPipeline(vector_store, batch_size=3, workers=2)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_ndjson_lines_split_across_chunks_are_parsed():
+    data = b'{"document": "one", "id": "a", "metadata": {"k": 1}}\n\n"two"\n{"document": "three"}'
+    documents = collect(ndjson_documents(chunked(data, 7)))
+    assert [d.document for d in documents] == ["one", "two", "three"]
+    assert documents[0].id == "a" and documents[0].metadata == {"k": 1}
+
+
+def test_text_lines_become_documents():
+    documents = collect(text_documents(chunked("first\n  \nsecond line\nthird".encode(), 4)))
+    assert [d.document for d in documents] == ["first", "second line", "third"]
+
+
+def test_documents_are_embedded_in_batches(pipeline, vector_store):
+    documents = [VectorDocument(document=f"doc number {i}") for i in range(7)]
+    progress = collect(pipeline.run(documents, "bulk"))
+    
+    embedded = vector_store._embedding_function.provider.calls
+    assert sorted(len(call) for call in embedded) == [1, 3, 3]
+    assert [p.batches for p in progress] == [1, 2, 3, 3]
+    assert progress[-1].done and progress[-1].documents == 7
+    assert vector_store.get_collection("bulk").count() == 7
+
+
+def test_reingesting_skips_unchanged_documents(pipeline, vector_store):
+    async def documents(texts):
+        for text in texts:
+            yield VectorDocument(document=text)
+    
+    collect(pipeline.run(documents(["alpha", "beta", "gamma", "delta"]), "sync"))
+    calls = len(vector_store._embedding_function.provider.calls)
+    final = collect(pipeline.run(documents(["alpha", "beta", "gamma", "epsilon"]), "sync"))[-1]
+    
+    assert (final.documents, final.skipped) == (4, 3)
+    # Only the new document was embedded again
+    assert vector_store._embedding_function.provider.calls[calls:] == [["epsilon"]]
+    assert vector_store.get_collection("sync").count() == 5
@@ -0,0 +1,186 @@
+"""JobQueue against a fake Gemini backend, a recording notifier and an in-memory store"""
+from app.modules.gemini.jobs import Job, JobQueue
+from app.modules.gemini.schemas import ImageRequest
+from app.shared.exceptions import ServiceUnavailableError, TooManyRequestsError
+import asyncio
+import pytest
+
+
+class FakeStore:
+    def __init__(self, fail_loads: bool = False):
+        self.saved = []
+        self.jobs = {}
+        self.fail_loads = fail_loads
+    
+    def save(self, job: Job):
+        self.saved.append((job.id, job.status))
+        self.jobs[job.id] = job
+    
+    def load(self, job_id: str):
+        if self.fail_loads:
+            raise ConnectionError("database unreachable")
+        return self.jobs.get(job_id)
+
+
+def make_queue(handler, store=None, **options):
+    notifications = []
+    
+    async def notifier(payload, connection_id):
+        notifications.append((payload["data"]["status"], connection_id))
+    
+    queue = JobQueue({"image": handler}, notifier, store, **options)
+    return queue, notifications
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_job_runs_and_reports_every_status():
+    async def handler(request):
+        return {"images": [request.prompt]}
+    
+    store = FakeStore()
+    queue, notifications = make_queue(handler, store)
+    
+    async def scenario():
+        await queue.start()
+        job = await queue.submit("image", ImageRequest(prompt="a cat"), connection_id="c1")
+        await queue.join()
+        await queue.stop()
+        return job
+    
+    job = run(scenario())
+    assert job.status == "succeeded"
+    assert job.result == {"images": ["a cat"]}
+    assert job.completed_at is not None
+    assert notifications == [("running", "c1"), ("succeeded", "c1")]
+    # Rows are written in order, each with the status it had when queued for writing
+    assert store.saved == [(job.id, "queued"), (job.id, "running"), (job.id, "succeeded")]
+
+
+def test_failed_handler_marks_the_job_failed():
+    async def handler(request):
+        raise RuntimeError("upstream broke")
+    
+    queue, notifications = make_queue(handler)
+    
+    async def scenario():
+        await queue.start()
+        job = await queue.submit("image", ImageRequest(prompt="a cat"), connection_id="c1")
+        await queue.join()
+        await queue.stop()
+        return job
+    
+    job = run(scenario())
+    assert job.status == "failed"
+    assert job.error == "upstream broke"
+    assert [status for status, _ in notifications] == ["running", "failed"]
+
+
+def test_jobs_without_a_connection_are_never_pushed():
+    async def handler(request):
+        return {"images": ["data:image/png;base64,..."]}
+    
+    queue, notifications = make_queue(handler)
+    
+    async def scenario():
+        await queue.start()
+        job = await queue.submit("image", ImageRequest(prompt="a cat"))
+        await queue.join()
+        await queue.stop()
+        return job
+    
+    assert run(scenario()).status == "succeeded"
+    assert notifications == []
+
+
+def test_full_queue_is_refused():
+    async def handler(request):
+        return {}
+    
+    queue, _ = make_queue(handler, workers=0, max_queued=1)
+    
+    async def scenario():
+        await queue.start()
+        await queue.submit("image", ImageRequest(prompt="first"))
+        try:
+            await queue.submit("image", ImageRequest(prompt="second"))
+        finally:
+            await queue.stop()
+    
+    with pytest.raises(TooManyRequestsError):
+        run(scenario())
+
+
+def test_unknown_kind_is_rejected():
+    async def handler(request):
+        return {}
+    
+    queue, _ = make_queue(handler)
+    
+    async def scenario():
+        await queue.start()
+        try:
+            await queue.submit("video", ImageRequest(prompt="a cat"))
+        finally:
+            await queue.stop()
+    
+    with pytest.raises(ValueError):
+        run(scenario())
+
+
+def test_get_falls_back_to_the_store():
+    async def handler(request):
+        return {}
+    
+    store = FakeStore()
+    stored = Job("image", ImageRequest(prompt="old"), job_id="old-job")
+    store.jobs[stored.id] = stored
+    queue, _ = make_queue(handler, store)
+    
+    async def scenario():
+        await queue.start()
+        try:
+            return await queue.get("old-job"), await queue.get("missing")
+        finally:
+            await queue.stop()
+    
+    found, missing = run(scenario())
+    assert found is stored
+    assert missing is None
+
+
+def test_unreachable_store_is_a_503_not_a_404():
+    async def handler(request):
+        return {}
+    
+    queue, _ = make_queue(handler, FakeStore(fail_loads=True))
+    
+    async def scenario():
+        await queue.start()
+        try:
+            await queue.get("any")
+        finally:
+            await queue.stop()
+    
+    with pytest.raises(ServiceUnavailableError):
+        run(scenario())
+
+
+def test_oldest_jobs_leave_memory_first():
+    async def handler(request):
+        return {}
+    
+    queue, _ = make_queue(handler, max_retained=2)
+    
+    async def scenario():
+        await queue.start()
+        jobs = [await queue.submit("image", ImageRequest(prompt=str(i))) for i in range(3)]
+        await queue.join()
+        found = [await queue.get(job.id) for job in jobs]
+        await queue.stop()
+        return jobs, found
+    
+    jobs, found = run(scenario())
+    assert found == [None, jobs[1], jobs[2]]
@@ -0,0 +1,74 @@
+"""BM25 keyword index and reciprocal rank fusion"""
+from app.database.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def make_index() -> BM25Index:
+    index = BM25Index()
+    index.add("a", "the quick brown fox", {"n": 1})
+    index.add("b", "the lazy dog sleeps all day")
+    index.add("c", "fox fox fox hunting at night")
+    index.add("d", "connection failed with ERR_CONN_RESET in report-2024.pdf")
+    return index
+
+
+def ids(hits):
+    return [doc_id for doc_id, _ in hits]
+
+
+def test_tokens_keep_identifiers_whole_and_split():
+    assert tokenize("ERR_CONN_RESET report-2024.pdf.") == [
+        "err_conn_reset", "err", "conn", "reset", "report-2024.pdf", "report", "2024", "pdf"
+    ]
+
+
+def test_more_frequent_terms_rank_higher():
+    hits = make_index().search("fox", 10)
+    assert ids(hits) == ["c", "a"]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_rare_terms_outweigh_common_ones():
+    assert ids(make_index().search("the dog", 1)) == ["b"]
+
+
+def test_identifier_queries_match_whole_or_in_part():
+    index = make_index()
+    assert ids(index.search("err_conn_reset", 5)) == ["d"]
+    assert ids(index.search("reset", 5)) == ["d"]
+    assert ids(index.search("report-2024.pdf", 5)) == ["d"]
+
+
+def test_limit_and_allowed_ids():
+    index = make_index()
+    assert ids(index.search("fox", 1)) == ["c"]
+    assert ids(index.search("fox", 10, allowed={"a"})) == ["a"]
+    assert index.search("fox", 0) == []
+    assert index.search("unicorn", 10) == []
+
+
+def test_removed_and_replaced_documents():
+    index = make_index()
+    index.remove("c")
+    assert ids(index.search("fox", 10)) == ["a"]
+    assert len(index) == 3
+    index.add("a", "nothing in common")
+    assert index.search("fox", 10) == []
+    assert index.get("a") == ("nothing in common", None)
+
+
+def test_documents_are_kept_with_their_metadata():
+    assert make_index().get("a") == ("the quick brown fox", {"n": 1})
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "x", "w"]], k=60)
+    assert [doc_id for doc_id, _ in fused][:2] in (["x", "y"], ["y", "x"])
+    assert [doc_id for doc_id, _ in fused][2:] == ["z", "w"]
+    scores = dict(fused)
+    assert scores["x"] == scores["y"] == 1 / 61 + 1 / 62
+    assert scores["z"] == 1 / 63
+
+
+def test_rrf_of_nothing_is_empty():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
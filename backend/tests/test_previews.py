@@ -0,0 +1,106 @@
+"""Preview generation: waveforms, text snippets and recorded failures, off the event loop"""
+from app.modules.files.previews import (
+    SNIPPET_CHARS, WAVEFORM_BINS, PreviewPipeline, generate, preview_kind
+)
+import asyncio
+import json
+import math
+import pytest
+import struct
+import wave
+
+
+def write_wav(path, seconds: float, rate: int = 8000):
+    frames = int(seconds * rate)
+    # Silence for the first half, a full-scale tone for the second
+    samples = [0 if i < frames // 2 else int(32767 * math.sin(i / 3)) for i in range(frames)]
+    with wave.open(str(path), "wb") as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(rate)
+        audio.writeframes(struct.pack(f"<{frames}h", *samples))
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    pipeline = PreviewPipeline(str(tmp_path / "previews"), workers=1, size=64,
+                               max_bytes=1 << 20, enabled=True)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_mime_types_map_to_preview_kinds():
+    assert preview_kind("image/PNG") == "image"
+    assert preview_kind("image/svg+xml") is None
+    assert preview_kind("audio/wav") == "audio"
+    assert preview_kind("audio/mpeg") is None
+    assert preview_kind("text/markdown") == "text"
+    assert preview_kind("application/json") == "text"
+    assert preview_kind(None) is None
+
+
+def test_wav_files_get_a_bounded_waveform(tmp_path):
+    source = tmp_path / "clip.wav"
+    write_wav(source, seconds=2)
+    metadata = generate("audio", str(source), str(tmp_path / "out"), 64)
+    
+    assert metadata["kind"] == "audio"
+    assert (metadata["duration"], metadata["sample_rate"], metadata["channels"]) == (2.0, 8000, 1)
+    waveform = metadata["waveform"]
+    assert len(waveform) == WAVEFORM_BINS
+    assert max(waveform[:WAVEFORM_BINS // 2]) == 0
+    assert min(waveform[WAVEFORM_BINS // 2 + 1:]) > 0.9
+    with open(tmp_path / "out.json") as file:
+        assert json.load(file) == metadata
+
+
+def test_text_snippets_are_cut_at_a_character_limit(tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("é" * (SNIPPET_CHARS + 10), encoding="utf-8")
+    metadata = generate("text", str(source), str(tmp_path / "out"), 64)
+    assert metadata["snippet"] == "é" * SNIPPET_CHARS
+
+
+def test_failures_are_recorded_not_raised(tmp_path):
+    source = tmp_path / "broken.wav"
+    source.write_bytes(b"not a wav file")
+    metadata = generate("audio", str(source), str(tmp_path / "out"), 64)
+    assert metadata["kind"] == "audio" and metadata["error"]
+    with open(tmp_path / "out.json") as file:
+        assert "error" in json.load(file)
+
+
+def test_pipeline_generates_in_a_worker_process_once(pipeline, tmp_path):
+    source = tmp_path / "readme.txt"
+    source.write_text("hello preview")
+    sha256 = "ab" * 32
+    
+    async def scenario():
+        pipeline.schedule(sha256, "text/plain", str(source))
+        pending = pipeline.pending(sha256)
+        # A second request while it runs does not start another job
+        pipeline.schedule(sha256, "text/plain", str(source))
+        await asyncio.wait_for(asyncio.shield(pipeline._pending[sha256]), 60)
+        await asyncio.sleep(0)
+        return pending
+    
+    assert asyncio.run(scenario())
+    assert pipeline.get(sha256) == {"snippet": "hello preview", "kind": "text"}
+    assert not pipeline.pending(sha256)
+    
+    pipeline.discard(sha256)
+    assert pipeline.get(sha256) is None
+
+
+def test_unsupported_or_oversized_files_are_skipped(pipeline, tmp_path):
+    pipeline.max_bytes = 4
+    source = tmp_path / "big.txt"
+    source.write_text("too large")
+    
+    async def scenario():
+        pipeline.schedule("cd" * 32, "text/plain", str(source))
+        pipeline.schedule("ef" * 32, "application/zip", str(source))
+    
+    asyncio.run(scenario())
+    assert pipeline.metrics()["pending"] == 0
+    assert pipeline._pool is None
@@ -0,0 +1,102 @@
+"""Retriever: deduped, budgeted context and per-session retrieval caching"""
+from app.modules.gemini import rag
+from app.modules.gemini.rag import Retriever, estimate_tokens
+from app.modules.gemini.schemas import RagOptions
+from app.modules.gemini.sessions import ChatSession
+from app.modules.vector.schemas import VectorSearchResponse
+import asyncio
+import pytest
+
+
+class FakeVectorService:
+    def __init__(self, hits):
+        self.hits = hits
+        self.requests = []
+    
+    async def search(self, request):
+        self.requests.append(request)
+        return VectorSearchResponse(results=self.hits)
+
+
+def hit(doc_id, text, **metadata):
+    return {"id": doc_id, "document": text, "metadata": metadata or None, "score": 0.5}
+
+
+@pytest.fixture
+def search(monkeypatch):
+    service = FakeVectorService([
+        hit("a", "Paris is the capital of France.", source="atlas.txt"),
+        hit("b", "paris is the  capital of france."),
+        hit("c", "x" * 400),
+        hit("d", "France uses the euro.", filename="money.md"),
+        hit("e", ""),
+    ])
+    monkeypatch.setattr(rag, "vector_service", service)
+    return service
+
+
+def make_retriever(**options) -> Retriever:
+    config = dict(top_k=3, max_context_tokens=50, cache_size=2, cache_ttl=60)
+    config.update(options)
+    return Retriever(**config)
+
+
+def test_prompt_carries_numbered_unique_chunks_within_budget(search):
+    prompt, metadata = asyncio.run(make_retriever().augment("capital?", RagOptions()))
+    
+    assert [chunk.id for chunk in metadata.chunks] == ["a", "d"]
+    assert [chunk.source for chunk in metadata.chunks] == ["atlas.txt", "money.md"]
+    # The near-duplicate, the oversized chunk and the empty one are left out
+    assert metadata.dropped == 3
+    assert metadata.context_tokens == sum(estimate_tokens(t) for t in (
+        "Paris is the capital of France.", "France uses the euro."
+    ))
+    assert "[1] atlas.txt\nParis is the capital of France." in prompt
+    assert "[2] money.md\nFrance uses the euro." in prompt
+    assert prompt.endswith("Question: capital?")
+    assert search.requests[0].n_results == 6
+
+
+def test_request_options_override_server_defaults(search):
+    options = RagOptions(collection="notes", user_id="u1", top_k=1, max_context_tokens=500,
+                         mode="lexical", where={"kind": "atlas"})
+    _, metadata = asyncio.run(make_retriever().augment("capital?", options))
+    assert [chunk.id for chunk in metadata.chunks] == ["a"]
+    request = search.requests[0]
+    assert (request.collection, request.user_id, request.mode) == ("notes", "u1", "lexical")
+    assert request.where == {"kind": "atlas"} and request.n_results == 2
+
+
+def test_no_hits_sends_the_bare_message(monkeypatch):
+    monkeypatch.setattr(rag, "vector_service", FakeVectorService([]))
+    prompt, metadata = asyncio.run(make_retriever().augment("hello", RagOptions()))
+    assert prompt == "hello"
+    assert metadata.chunks == []
+
+
+def test_sessions_reuse_recent_retrievals(search):
+    retriever = make_retriever()
+    session = ChatSession("s1", "m")
+    
+    async def ask(message):
+        return (await retriever.augment(message, RagOptions(), session))[1].cached
+    
+    async def scenario():
+        return [await ask(m) for m in ("capital?", "  capital? ", "euro?", "other?", "capital?")]
+    
+    # Whitespace differences hit the cache; the cache holds two retrievals
+    assert asyncio.run(scenario()) == [False, True, False, False, False]
+    assert len(search.requests) == 4
+    assert retriever.metrics() == {"retrievals": 5, "cache_hits": 1}
+
+
+def test_stale_retrievals_are_fetched_again(search, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rag.time, "monotonic", lambda: now[0])
+    retriever = make_retriever(cache_ttl=10)
+    session = ChatSession("s1", "m")
+    asyncio.run(retriever.augment("capital?", RagOptions(), session))
+    now[0] += 11
+    _, metadata = asyncio.run(retriever.augment("capital?", RagOptions(), session))
+    assert not metadata.cached
+    assert len(search.requests) == 2
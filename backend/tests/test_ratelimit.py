@@ -0,0 +1,143 @@
+"""TokenBucket, CircuitBreaker and QuotaGuard admission on a fake clock"""
+from google.api_core import exceptions as google_exceptions
+from app.modules.gemini import ratelimit
+from app.modules.gemini.ratelimit import CircuitBreaker, QuotaGuard, TokenBucket
+from app.shared.exceptions import ServiceUnavailableError, TooManyRequestsError
+import asyncio
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_queues(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve(max_wait=10) for _ in range(3)] == [0, 0, 0]
+    # Each further caller waits one more token's worth
+    assert bucket.reserve(max_wait=10) == pytest.approx(0.5)
+    assert bucket.reserve(max_wait=10) == pytest.approx(1.0)
+    assert bucket.throttled == 2
+
+
+def test_bucket_refills_over_time_up_to_the_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket.reserve(max_wait=0)
+    clock.now += 1
+    assert bucket.reserve(max_wait=0) == 0
+    clock.now += 3600
+    assert bucket.reserve(max_wait=0) == 0
+    assert bucket.tokens == pytest.approx(2)
+
+
+def test_bucket_rejects_waits_over_the_budget(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.reserve(max_wait=0)
+    with pytest.raises(TooManyRequestsError) as error:
+        bucket.reserve(max_wait=0.5)
+    assert error.value.headers["Retry-After"] == "1"
+    assert bucket.rejected == 1
+    # A rejected caller does not hold a place in line
+    assert bucket.reserve(max_wait=1) == pytest.approx(1)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.check()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(ServiceUnavailableError) as error:
+        breaker.check()
+    assert error.value.headers["Retry-After"] == "30"
+
+
+def test_half_open_breaker_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half_open"
+    breaker.check()
+    with pytest.raises(ServiceUnavailableError):
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.check()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    clock.now += 29
+    with pytest.raises(ServiceUnavailableError):
+        breaker.check()
+
+
+def make_guard() -> QuotaGuard:
+    return QuotaGuard(
+        rate_limits={}, default_rpm=60, burst=1, max_wait=0.05, max_attempts=1,
+        base_delay=0, max_delay=0, breaker_threshold=1, breaker_reset=0.1,
+    )
+
+
+def test_rate_limited_half_open_trial_frees_the_slot(clock):
+    guard = make_guard()
+    breaker = guard.breaker("m")
+    asyncio.run(guard.admit("m"))
+    guard.record("m", google_exceptions.ServiceUnavailable("down"))
+    clock.now += 0.1
+    assert breaker.state == "half_open"
+    
+    # The trial is refused by the limiter, so it never reaches upstream
+    with pytest.raises(TooManyRequestsError):
+        asyncio.run(guard.admit("m"))
+    assert not breaker.trial_in_flight
+    
+    clock.now += 1
+    asyncio.run(guard.admit("m"))
+    assert breaker.trial_in_flight
+    guard.record("m")
+    assert breaker.state == "closed"
+
+
+def test_cancelled_wait_frees_the_half_open_trial(clock):
+    guard = make_guard()
+    guard.max_wait = 10
+    breaker = guard.breaker("m")
+    breaker.record_failure()
+    clock.now += 0.1
+    guard._bucket("m").tokens = 0
+    
+    async def cancel_while_waiting():
+        task = asyncio.create_task(guard.admit("m"))
+        await asyncio.sleep(0)
+        assert breaker.trial_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(cancel_while_waiting())
+    assert not breaker.trial_in_flight
+    breaker.check()
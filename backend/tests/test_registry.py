@@ -0,0 +1,55 @@
+"""ModelRegistry: one SDK configuration and one handle per model and generation config"""
+from app.modules.gemini import registry
+from app.modules.gemini.registry import ModelRegistry
+import pytest
+
+
+class FakeModel:
+    def __init__(self, name, generation_config=None):
+        self.name = name
+        self.generation_config = generation_config
+    
+    def count_tokens(self, text):
+        raise ConnectionError("offline")
+
+
+@pytest.fixture
+def sdk(monkeypatch):
+    calls = {"configure": 0, "client": 0}
+    
+    def configure(**kwargs):
+        calls["configure"] += 1
+    
+    def client():
+        calls["client"] += 1
+    
+    monkeypatch.setattr(registry.genai, "configure", configure)
+    monkeypatch.setattr(registry.genai_client, "get_default_generative_client", client)
+    monkeypatch.setattr(registry.genai, "GenerativeModel", FakeModel)
+    return calls
+
+
+def test_handles_are_reused_and_the_sdk_configured_once(sdk):
+    models = ModelRegistry(api_key="test", transport="grpc")
+    first = models.get("gemini-2.5-flash")
+    assert models.get("gemini-2.5-flash") is first
+    assert models.get("gemini-2.5-flash", {"temperature": 0}) is not first
+    assert models.get("gemini-2.5-flash", {"temperature": 0}) is models.get(
+        "gemini-2.5-flash", {"temperature": 0}
+    )
+    assert sdk == {"configure": 1, "client": 1}
+    assert models.metrics() == {"transport": "grpc", "models": 2}
+
+
+def test_nested_generation_configs_are_cached_too(sdk):
+    models = ModelRegistry(api_key="test", transport="rest")
+    config = {"response_modalities": ["AUDIO"], "speech_config": {"voice": {"name": "Kore"}}}
+    handle = models.get("gemini-2.5-flash-preview-tts", config)
+    assert models.get("gemini-2.5-flash-preview-tts", dict(config)) is handle
+    assert handle.generation_config == config
+
+
+def test_warm_builds_handles_and_tolerates_a_failed_probe(sdk):
+    models = ModelRegistry(api_key="test", transport="grpc")
+    models.warm(["a", "b", "a"], probe_model="a")
+    assert models.metrics()["models"] == 2
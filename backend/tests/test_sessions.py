@@ -0,0 +1,110 @@
+"""ChatSessionStore: LRU eviction by size, history windows and database failures"""
+from app.modules.gemini.schemas import ChatMessage
+from app.modules.gemini.sessions import ChatSession, ChatSessionStore, _MESSAGE_OVERHEAD
+from app.shared.exceptions import ServiceUnavailableError
+import asyncio
+import pytest
+
+
+def make_store(**options) -> ChatSessionStore:
+    config = dict(max_bytes=1 << 20, history_window=20, history_max_chars=10000, persist=False)
+    config.update(options)
+    return ChatSessionStore(**config)
+
+
+def turn(user: str, reply: str):
+    return [ChatMessage(role="user", text=user), ChatMessage(role="model", text=reply)]
+
+
+def test_sessions_are_kept_in_memory():
+    store = make_store()
+    
+    async def scenario():
+        session = await store.create("gemini-2.5-flash", "Trip")
+        await store.append(session, turn("hi", "hello"))
+        return session, await store.get(session.id), await store.get("missing")
+    
+    session, found, missing = asyncio.run(scenario())
+    assert found is session
+    assert [m.text for m in found.messages] == ["hi", "hello"]
+    assert missing is None
+    assert store.metrics()["hits"] == 1
+    assert store.metrics()["misses"] == 1
+
+
+def test_least_recently_used_sessions_are_evicted_by_size():
+    size = 2 * (10 + _MESSAGE_OVERHEAD)
+    store = make_store(max_bytes=2 * size)
+    
+    async def scenario():
+        sessions = [await store.create("m") for _ in range(3)]
+        await store.append(sessions[0], turn("a" * 10, "b" * 10))
+        await store.append(sessions[1], turn("a" * 10, "b" * 10))
+        # Touch the oldest so the second becomes least recently used
+        await store.get(sessions[0].id)
+        await store.append(sessions[2], turn("a" * 10, "b" * 10))
+        return [await store.get(s.id) is not None for s in sessions]
+    
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert store.metrics()["evictions"] == 1
+    assert store.metrics()["bytes"] == 2 * size
+
+
+def test_the_newest_session_is_kept_even_when_over_budget():
+    store = make_store(max_bytes=10)
+    
+    async def scenario():
+        session = await store.create("m")
+        await store.append(session, turn("x" * 100, "y" * 100))
+        return await store.get(session.id)
+    
+    assert asyncio.run(scenario()) is not None
+
+
+def test_window_is_bounded_and_opens_with_a_user_turn():
+    store = make_store(history_window=3, history_max_chars=1000)
+    
+    async def scenario():
+        session = await store.create("m")
+        await store.append(session, turn("one", "two") + turn("three", "four"))
+        return session
+    
+    session = asyncio.run(scenario())
+    # The last three messages start with a reply, which is dropped
+    assert [m.text for m in store.window(session)] == ["three", "four"]
+    
+    store.history_window = 20
+    store.history_max_chars = 12
+    assert [m.text for m in store.window(session)] == ["three", "four"]
+
+
+def test_database_failures_are_unavailable_not_missing(monkeypatch):
+    store = make_store(persist=True)
+    
+    def unreachable(session_id):
+        raise ConnectionError("database is down")
+    
+    monkeypatch.setattr(store, "_load", unreachable)
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(store.get("not-cached"))
+    store.shutdown()
+
+
+def test_sessions_loaded_from_the_database_are_cached(monkeypatch):
+    store = make_store(persist=True)
+    loads = []
+    
+    def load(session_id):
+        loads.append(session_id)
+        return ChatSession(session_id, "m", None, turn("hi", "hello"), persisted=True)
+    
+    monkeypatch.setattr(store, "_load", load)
+    
+    async def scenario():
+        return await store.get("s1"), await store.get("s1")
+    
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert loads == ["s1"]
+    assert first.persisted_count == 2
+    store.shutdown()
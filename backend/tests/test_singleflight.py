@@ -0,0 +1,108 @@
+"""SingleFlight: identical concurrent calls share one execution, result and failure"""
+from app.shared.singleflight import SingleFlight
+import asyncio
+
+
+class Call:
+    def __init__(self, result="value", error: Exception = None, delay: float = 0.05):
+        self.result = result
+        self.error = error
+        self.delay = delay
+        self.started = 0
+        self.cancelled = False
+    
+    async def __call__(self):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_key_ignores_dict_order():
+    assert SingleFlight.key("q", {"a": 1, "b": 2}) == SingleFlight.key("q", {"b": 2, "a": 1})
+    assert SingleFlight.key("q", {"a": 1}) != SingleFlight.key("q", {"a": 2})
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight("test")
+    call = Call()
+    
+    async def scenario():
+        return await asyncio.gather(*(flights.do("k", call) for _ in range(5)))
+    
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert call.started == 1
+    assert flights.metrics() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_nothing_is_remembered_after_the_call():
+    flights = SingleFlight("test")
+    call = Call()
+    
+    async def scenario():
+        await flights.do("k", call)
+        await flights.do("k", call)
+    
+    asyncio.run(scenario())
+    assert call.started == 2
+
+
+def test_every_caller_sees_the_failure():
+    flights = SingleFlight("test")
+    call = Call(error=RuntimeError("quota"))
+    
+    async def scenario():
+        return await asyncio.gather(*(flights.do("k", call) for _ in range(3)),
+                                    return_exceptions=True)
+    
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert call.started == 1
+
+
+def test_one_caller_leaving_does_not_cancel_the_others():
+    flights = SingleFlight("test")
+    call = Call(delay=0.1)
+    
+    async def scenario():
+        leaving = asyncio.create_task(flights.do("k", call))
+        staying = asyncio.create_task(flights.do("k", call))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        return await staying
+    
+    assert asyncio.run(scenario()) == "value"
+    assert not call.cancelled
+
+
+def test_the_call_is_cancelled_once_every_caller_leaves():
+    flights = SingleFlight("test")
+    call = Call(delay=10)
+    
+    async def scenario():
+        callers = [asyncio.create_task(flights.do("k", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flights.metrics()["in_flight"]
+    
+    assert asyncio.run(scenario()) == 0
+    assert call.cancelled
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test")
+    call = Call()
+    
+    async def scenario():
+        return await asyncio.gather(flights.do("a", call), flights.do("b", call))
+    
+    asyncio.run(scenario())
+    assert call.started == 2
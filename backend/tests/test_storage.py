@@ -0,0 +1,141 @@
+"""ContentStore: streamed puts, resumable uploads, pins and garbage collection"""
+from app.modules.files.storage import ContentStore
+from app.shared.exceptions import ConflictError, ValidationError
+import asyncio
+import hashlib
+import os
+import pytest
+import time
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(str(tmp_path / "store"), chunk_size=4, upload_expiry=3600)
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_put_stores_by_hash_and_pins(store):
+    stored = run(store.put(stream(b"hello ", b"world")))
+    assert stored.sha256 == hashlib.sha256(b"hello world").hexdigest()
+    assert stored.size == 11
+    assert not stored.deduplicated
+    with open(store.path(stored.sha256), "rb") as file:
+        assert file.read() == b"hello world"
+    assert store.is_pinned(stored.sha256)
+    assert os.listdir(store.uploads_dir) == []
+
+
+def test_cancelled_commit_releases_its_pin(store, monkeypatch):
+    commit = store._commit
+    
+    def slow_commit(temp, sha256):
+        time.sleep(0.2)
+        return commit(temp, sha256)
+    
+    monkeypatch.setattr(store, "_commit", slow_commit)
+    
+    async def cancel_while_committing():
+        task = asyncio.create_task(store.put(stream(b"data")))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    run(cancel_while_committing())
+    assert not store.is_pinned(hashlib.sha256(b"data").hexdigest())
+
+
+def test_resumable_upload_checks_offset_size_and_checksum(store):
+    data = b"0123456789"
+    digest = hashlib.sha256(data).hexdigest()
+    
+    async def scenario():
+        session = await store.create_upload("a.bin", "c_drive", size=len(data))
+        await store.append(session.id, 0, stream(data[:4]))
+        with pytest.raises(ConflictError):
+            await store.append(session.id, 0, stream(data[4:]))
+        with pytest.raises(ValidationError):
+            await store.append(session.id, 4, stream(data[4:8], data[8:] + b"!"))
+        # The chunk that fitted before the overflow is kept
+        assert session.offset == 8
+        with pytest.raises(ConflictError):
+            await store.complete(session.id)
+        
+        # A restart forgets the session; the part file still has the progress
+        store._sessions.clear()
+        session = await store.get_upload(session.id)
+        assert session.offset == 8
+        await store.append(session.id, 8, stream(data[8:]))
+        with pytest.raises(ValidationError):
+            await store.complete(session.id, "0" * 64)
+        return await store.complete(session.id, digest)
+    
+    session, stored = run(scenario())
+    assert stored.sha256 == digest
+    assert stored.size == len(data)
+    assert os.listdir(store.uploads_dir) == []
+
+
+def test_cancelled_append_keeps_offset_and_hash_in_step(store, monkeypatch):
+    write_chunk = store._write_chunk
+    
+    def slow_write(file, session, chunk):
+        time.sleep(0.1)
+        write_chunk(file, session, chunk)
+    
+    monkeypatch.setattr(store, "_write_chunk", slow_write)
+    
+    async def scenario():
+        session = await store.create_upload("a.bin", "c_drive")
+        task = asyncio.create_task(store.append(session.id, 0, stream(*[b"x" * 10] * 5)))
+        await asyncio.sleep(0.15)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return session
+    
+    session = run(scenario())
+    assert 0 < session.offset < 50
+    assert os.path.getsize(store._part_path(session.id)) == session.offset
+    assert session.hasher.hexdigest() == hashlib.sha256(b"x" * session.offset).hexdigest()
+
+
+def test_probing_for_a_blob_leaves_it_collectable(store):
+    stored = run(store.put(stream(b"orphan")))
+    store.unpin(stored.sha256)
+    old = time.time() - 7200
+    os.utime(store.path(stored.sha256), (old, old))
+    
+    assert store.exists(stored.sha256.upper())
+    assert not store.exists("0" * 64)
+    with pytest.raises(ValidationError):
+        store.exists("../../etc/passwd")
+    assert not store.is_pinned(stored.sha256)
+    
+    deleted, freed = run(store.collect(lambda sha256: False, grace=3600))
+    assert deleted == [stored.sha256]
+    assert freed == 6
+
+
+def test_claimed_and_recent_blobs_survive_collection(store):
+    claimed = run(store.put(stream(b"claimed")))
+    recent = run(store.put(stream(b"recent")))
+    store.unpin(recent.sha256)
+    old = time.time() - 7200
+    os.utime(store.path(claimed.sha256), (old, old))
+    
+    # Pinned (a file is about to reference it) or touched within the grace period
+    assert run(store.collect(lambda sha256: False, grace=3600)) == ([], 0)
+    store.unpin(claimed.sha256)
+    reclaimed = store.claim(claimed.sha256)
+    assert reclaimed.deduplicated and reclaimed.size == 7
+    store.unpin(claimed.sha256)
+    assert run(store.collect(lambda sha256: False, grace=3600)) == ([], 0)
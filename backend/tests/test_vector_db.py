@@ -0,0 +1,31 @@
+"""VectorDBClient on a temporary Chroma store with fake embeddings"""
+from app.database import vector_db
+from app.database.lexical import BM25Index
+import threading
+import time
+
+
+def lexical_ids(store, text, n_results=10, collection=None):
+    [result] = store.search_lexical([{"text": text, "n_results": n_results}], [], collection)
+    return result["ids"]
+
+
+def test_writes_during_a_lexical_build_reach_the_index(vector_store, monkeypatch):
+    vector_store.add_documents(["alpha one", "alpha two"], ids=["a1", "a2"])
+    writer = threading.Thread(target=lambda: (
+        vector_store.add_documents(["alpha late"], ids=["late"]),
+        vector_store.delete(ids=["a1"]),
+    ))
+    
+    class SlowIndex(BM25Index):
+        def add(self, doc_id, text, metadata=None):
+            # The build has read its page; a writer gets in before it finishes
+            if not writer.is_alive() and not writer.ident:
+                writer.start()
+                time.sleep(0.3)
+            super().add(doc_id, text, metadata)
+    
+    monkeypatch.setattr(vector_db, "BM25Index", SlowIndex)
+    vector_store.lexical_index()
+    writer.join()
+    assert sorted(lexical_ids(vector_store, "alpha")) == ["a2", "late"]
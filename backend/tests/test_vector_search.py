@@ -0,0 +1,72 @@
+"""Multi-query vector search: one embedding batch, per-query limits and metadata filters"""
+from app.modules.vector import service as vector_service_module
+from app.modules.vector.schemas import VectorBatchSearchRequest, VectorSearchRequest
+from app.modules.vector.service import vector_service
+from app.shared.exceptions import ValidationError
+import asyncio
+import pytest
+
+DOCUMENTS = {
+    "cat": ("cats purr and sleep", {"kind": "pet"}),
+    "dog": ("dogs bark and fetch", {"kind": "pet"}),
+    "oak": ("oak trees grow acorns", {"kind": "plant"}),
+    "fern": ("ferns grow in shade", {"kind": "plant"}),
+}
+
+
+@pytest.fixture
+def store(vector_store, monkeypatch):
+    ids = list(DOCUMENTS)
+    vector_store.add_documents(
+        [DOCUMENTS[i][0] for i in ids], ids, [DOCUMENTS[i][1] for i in ids], "search"
+    )
+    monkeypatch.setattr(vector_service_module, "vector_db", vector_store)
+    vector_store.embedding_function.provider.calls.clear()
+    return vector_store
+
+
+def test_queries_share_one_embedding_batch(store):
+    queries = [
+        {"text": "cats purr", "n_results": 1},
+        {"text": "trees grow", "n_results": 2, "where": {"kind": "plant"}},
+        {"text": "dogs bark", "n_results": 3, "where": {"kind": "pet"}},
+    ]
+    results = store.search_many(queries, ["metadatas"], "search")
+    
+    assert store.embedding_function.provider.calls == [["cats purr", "trees grow", "dogs bark"]]
+    assert results[0]["ids"] == ["cat"]
+    assert sorted(results[1]["ids"]) == ["fern", "oak"]
+    # Filters hold even when the query asks for more results than match
+    assert sorted(results[2]["ids"]) == ["cat", "dog"]
+    assert all(m["kind"] == "pet" for m in results[2]["metadatas"])
+
+
+def test_batch_search_applies_request_defaults(store):
+    request = VectorBatchSearchRequest(
+        collection="search",
+        n_results=1,
+        where={"kind": "plant"},
+        include=["documents"],
+        queries=[{"query": "acorns"}, {"query": "purr", "where": {"kind": "pet"}, "n_results": 2}],
+    )
+    response = asyncio.run(vector_service.batch_search(request))
+    
+    assert [r.query for r in response.results] == ["acorns", "purr"]
+    assert [hit["id"] for hit in response.results[0].results] == ["oak"]
+    assert response.results[0].results[0]["document"] == "oak trees grow acorns"
+    assert {hit["id"] for hit in response.results[1].results} == {"cat", "dog"}
+
+
+def test_single_search_hides_internal_metadata(store):
+    request = VectorSearchRequest(query="ferns shade", collection="search", n_results=1)
+    hit = asyncio.run(vector_service.search(request)).results[0]
+    assert hit["id"] == "fern"
+    assert hit["metadata"] == {"kind": "plant"}
+    assert isinstance(hit["distance"], float)
+
+
+def test_batch_search_refuses_too_many_queries(store, monkeypatch):
+    monkeypatch.setattr(vector_service_module.settings, "VECTOR_SEARCH_MAX_QUERIES", 2)
+    request = VectorBatchSearchRequest(collection="search", queries=[{"query": "q"}] * 3)
+    with pytest.raises(ValidationError):
+        asyncio.run(vector_service.batch_search(request))
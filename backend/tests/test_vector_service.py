@@ -0,0 +1,76 @@
+"""VectorService over a temporary vector store"""
+from app.database.vector_db import collection_name
+from app.modules.vector import service as vector_service_module
+from app.modules.vector.ingest import ingest_pipeline
+from app.modules.vector.schemas import (
+    VectorAddRequest, VectorCollectionCreateRequest, VectorSearchRequest
+)
+from app.modules.vector.service import vector_service
+from app.shared.exceptions import NotFoundError
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def service(vector_store, monkeypatch):
+    monkeypatch.setattr(vector_service_module, "vector_db", vector_store)
+    monkeypatch.setattr(ingest_pipeline, "client", vector_store)
+    return vector_service
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_collections_are_listed_by_exact_owner(service):
+    run(service.create_collection(VectorCollectionCreateRequest(name="notes", user_id="b")))
+    run(service.create_collection(VectorCollectionCreateRequest(name="notes", user_id="a__b")))
+    # Implicitly created by a write
+    run(service.add_documents(
+        VectorAddRequest(documents=["hello"], collection="drafts", user_id="b")
+    ))
+    run(service.create_collection(VectorCollectionCreateRequest(name="shared")))
+    
+    def names(user_id):
+        return sorted(info.name for info in run(service.list_collections(user_id)))
+    
+    assert names("b") == ["drafts__b", "notes__b"]
+    assert names("a__b") == ["notes__a__b"]
+    assert names("nobody") == []
+    assert "shared" in names(None)
+
+
+def test_collection_names_are_valid_chroma_names():
+    assert collection_name("notes", "u1") == "notes__u1"
+    assert collection_name("my notes!", "a@b.c") == "my-notes-__a-b-c"
+    assert len(collection_name("x")) == 3
+    long = collection_name("n" * 80, "user")
+    assert len(long) == 63
+    assert long != collection_name("n" * 80, "other")
+
+
+def test_users_only_search_their_own_documents(service):
+    for user_id, text in (("alice", "alice likes tea"), ("bob", "bob likes tea")):
+        run(service.add_documents(
+            VectorAddRequest(documents=[text], collection="notes", user_id=user_id)
+        ))
+    
+    def found(user_id):
+        request = VectorSearchRequest(query="likes tea", collection="notes", user_id=user_id)
+        return [hit["document"] for hit in run(service.search(request)).results]
+    
+    assert found("alice") == ["alice likes tea"]
+    assert found("bob") == ["bob likes tea"]
+    with pytest.raises(NotFoundError):
+        found("carol")
+
+
+def test_collections_keep_their_own_index_settings(service):
+    created = run(service.create_collection(VectorCollectionCreateRequest(
+        name="tuned", user_id="u1", space="ip", hnsw={"M": 32, "ef_search": 50}
+    )))
+    assert (created.name, created.owner, created.space) == ("tuned__u1", "u1", "ip")
+    assert (created.hnsw.M, created.hnsw.ef_search) == (32, 50)
+    
+    assert run(service.drop_collection("tuned", "u1"))
+    assert [info.name for info in run(service.list_collections("u1"))] == []
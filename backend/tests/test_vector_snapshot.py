@@ -0,0 +1,61 @@
+"""Vector store snapshot/restore, compaction and warm-up"""
+from app.shared.exceptions import ValidationError
+import pytest
+
+
+def search_ids(store, text, collection="notes"):
+    results = store.search_many([{"text": text, "n_results": 1}], [], collection)
+    return results[0]["ids"]
+
+
+def test_restore_brings_back_the_snapshot(vector_store, tmp_path):
+    vector_store.add_documents(["apples are red", "bananas are yellow"], ids=["a", "b"],
+                               collection="notes")
+    snapshot = vector_store.snapshot(str(tmp_path / "backup" / "store.tar.gz"))
+    assert snapshot["size"] > 0
+    
+    vector_store.add_documents(["cherries are dark"], ids=["c"], collection="notes")
+    vector_store.delete(ids=["a"], collection="notes")
+    vector_store.restore(snapshot["path"])
+    
+    stored = vector_store.get_collection("notes", create=False).get()
+    assert sorted(stored["ids"]) == ["a", "b"]
+    assert search_ids(vector_store, "apples red") == ["a"]
+    # Keyword indexes are rebuilt from the restored documents
+    lexical = vector_store.search_lexical([{"text": "cherries", "n_results": 5}], [], "notes")
+    assert lexical[0]["ids"] == []
+
+
+def test_a_bad_snapshot_leaves_the_store_alone(vector_store, tmp_path):
+    vector_store.add_documents(["kept"], ids=["k"], collection="notes")
+    bogus = tmp_path / "bogus.tar.gz"
+    bogus.write_bytes(b"not an archive")
+    with pytest.raises(ValidationError):
+        vector_store.restore(str(bogus))
+    assert vector_store.get_collection("notes", create=False).get()["ids"] == ["k"]
+
+
+def test_compaction_keeps_every_live_document(vector_store):
+    documents = [f"document {i} about topic {i % 3}" for i in range(20)]
+    ids = [f"d{i}" for i in range(20)]
+    vector_store.add_documents(documents, ids=ids, metadatas=[{"n": i} for i in range(20)],
+                               collection="notes")
+    vector_store.delete(ids=ids[:10], collection="notes")
+    
+    result = vector_store.compact("notes")
+    
+    assert result["collections"] == ["notes"]
+    target = vector_store.get_collection("notes", create=False)
+    stored = target.get(include=["metadatas"])
+    assert sorted(stored["ids"]) == sorted(ids[10:])
+    assert all(m["n"] >= 10 for m in stored["metadatas"])
+    assert search_ids(vector_store, "document 15 about topic 0") == ["d15"]
+    # Adding after compaction goes to the rebuilt collection
+    vector_store.add_documents(["late arrival"], ids=["late"], collection="notes")
+    assert vector_store.get_collection("notes").count() == 11
+
+
+def test_warm_up_touches_every_collection(vector_store):
+    vector_store.add_documents(["one"], collection="first")
+    vector_store.add_documents(["two"], collection="second")
+    assert sorted(vector_store.warm_up()["collections"]) == ["first", "second"]
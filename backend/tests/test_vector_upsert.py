@@ -0,0 +1,43 @@
+"""Idempotent adds: content-derived IDs and skipping documents stored unchanged"""
+from app.database.vector_db import CONTENT_HASH_KEY, content_hash, document_id
+
+
+def test_ids_and_hashes_are_derived_from_content():
+    assert document_id("hello") == document_id("hello")
+    assert document_id("hello") != document_id("hello!")
+    assert content_hash("text", {"a": 1, "b": 2}) == content_hash("text", {"b": 2, "a": 1})
+    assert content_hash("text", {"a": 1}) != content_hash("text", {"a": 2})
+    # A stored hash in the metadata never feeds back into the hash
+    assert content_hash("text", {"a": 1, CONTENT_HASH_KEY: "x"}) == content_hash("text", {"a": 1})
+
+
+def test_adding_the_same_corpus_twice_writes_once(vector_store):
+    calls = vector_store.embedding_function.provider.calls
+    assert vector_store.add_documents(["alpha", "beta"], collection="docs") == 2
+    assert vector_store.add_documents(["alpha", "beta"], collection="docs") == 0
+    assert len(calls) == 1
+    
+    stored = vector_store.get_collection("docs").get()
+    assert sorted(stored["ids"]) == sorted([document_id("alpha"), document_id("beta")])
+
+
+def test_only_changed_documents_are_rewritten(vector_store):
+    calls = vector_store.embedding_function.provider.calls
+    vector_store.add_documents(["one", "two"], ids=["a", "b"], metadatas=[{"v": 1}, {"v": 1}],
+                               collection="docs")
+    written = vector_store.add_documents(["one", "two, edited"], ids=["a", "b"],
+                                         metadatas=[{"v": 2}, {"v": 1}], collection="docs")
+    
+    assert written == 2
+    assert vector_store.add_documents(["one"], ids=["a"], metadatas=[{"v": 2}],
+                                      collection="docs") == 0
+    assert calls[-1] == ["one", "two, edited"]
+    stored = vector_store.get_collection("docs").get(ids=["a", "b"])
+    assert dict(zip(stored["ids"], stored["documents"])) == {"a": "one", "b": "two, edited"}
+
+
+def test_duplicate_ids_in_one_call_keep_the_last(vector_store):
+    written = vector_store.add_documents(["first", "second"], ids=["same", "same"],
+                                         collection="docs")
+    assert written == 1
+    assert vector_store.get_collection("docs").get(ids=["same"])["documents"] == ["second"]